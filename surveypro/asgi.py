@@ -0,0 +1,12 @@
+"""ASGI config for SurveyPro.
+
+Serves the respondent and results views in their async versions (see
+``surveypro.urls_async``), e.g. ``uvicorn surveypro.asgi:application``.
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'surveypro.settings')
+os.environ.setdefault('SURVEY_ASYNC_VIEWS', 'True')
+
+application = get_asgi_application()
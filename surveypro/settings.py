@@ -26,11 +26,16 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'surveys.middleware.MetricsMiddleware',
+    'surveys.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'surveypro.urls'
+# surveypro/asgi.py turns SURVEY_ASYNC_VIEWS on: the respondent and results
+# views are then served by their async versions (surveys/async_views.py).
+SURVEY_ASYNC_VIEWS = os.getenv("SURVEY_ASYNC_VIEWS", "False") == "True"
+ROOT_URLCONF = 'surveypro.urls_async' if SURVEY_ASYNC_VIEWS else 'surveypro.urls'
 
 TEMPLATES = [
     {
@@ -49,6 +54,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'surveypro.wsgi.application'
+ASGI_APPLICATION = 'surveypro.asgi.application'
 
 DATABASES = {
     'default': {
@@ -57,6 +63,68 @@ DATABASES = {
     }
 }
 
+# DB_PROFILE=production tunes SQLite for many concurrent respondents: WAL
+# journaling, a busy timeout, per-connection pragmas, persistent connections
+# and writes queued per process instead of failing with "database is locked".
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+SQLITE_PRAGMAS: dict[str, str] = {}
+SURVEY_SERIALIZE_WRITES = False
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "600")),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 30},
+        # A file database, so tests see the same locking as production.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    })
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': '30000',
+        'cache_size': '-65536',
+        'temp_store': 'MEMORY',
+        'mmap_size': '268435456',
+    }
+    SURVEY_SERIALIZE_WRITES = True
+
+# Compiled survey schemas live in their own cache so they can be moved to a
+# file-based store shared by all worker processes.
+SURVEY_CACHE_BACKEND = os.getenv("SURVEY_CACHE_BACKEND", "locmem")
+SURVEY_CACHE_ALIAS = 'surveys'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    SURVEY_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'surveys',
+        'TIMEOUT': None,
+    } if SURVEY_CACHE_BACKEND == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'surveys',
+        'TIMEOUT': None,
+    },
+}
+
+# "spool" acknowledges respondents after appending to a local spool file;
+# run `manage.py drain_spool --loop` to move submissions into the database.
+SURVEY_INGEST_MODE = os.getenv("SURVEY_INGEST_MODE", "sync")
+SURVEY_SPOOL_PATH = Path(os.getenv("SURVEY_SPOOL_PATH", BASE_DIR / 'spool.sqlite3'))
+# Upper bound on the responses in one POST to /api/responses/.
+SURVEY_API_MAX_BATCH = int(os.getenv("SURVEY_API_MAX_BATCH", "1000"))
+
+# Staff can profile a request with the X-Profile header or ?profile=1; a
+# fraction SURVEY_PROFILE_SAMPLE_RATE of those requests is actually profiled
+# and the newest SURVEY_PROFILE_KEEP .pstats files are kept.
+SURVEY_PROFILE_DIR = Path(os.getenv("SURVEY_PROFILE_DIR", BASE_DIR / 'profiles'))
+SURVEY_PROFILE_SAMPLE_RATE = float(os.getenv("SURVEY_PROFILE_SAMPLE_RATE", "1.0"))
+SURVEY_PROFILE_KEEP = int(os.getenv("SURVEY_PROFILE_KEEP", "50"))
+
+# Archive files of closed surveys (see the archive_surveys command).
+SURVEY_ARCHIVE_DIR = Path(os.getenv("SURVEY_ARCHIVE_DIR", BASE_DIR / 'archive'))
+
+SURVEY_ANSWERS_PER_PAGE = int(os.getenv("SURVEY_ANSWERS_PER_PAGE", "50"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -4,6 +4,8 @@ from django.urls import include, path
 from surveys import views as survey_views
 
 urlpatterns = [
+    path('admin/profiles/', survey_views.profile_list, name='profile_list'),
+    path('admin/profiles/<str:name>', survey_views.profile_download, name='profile_download'),
     path('admin/', admin.site.urls),
     path('', survey_views.home, name='home'),
     path('surveys/', survey_views.SurveyListView.as_view(), name='survey_list'),
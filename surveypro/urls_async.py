@@ -0,0 +1,14 @@
+"""URL configuration of the ASGI deployment.
+
+The same URLs as ``surveypro.urls``, with the respondent and results views
+replaced by their async versions.
+"""
+from django.urls import path
+from surveys import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('respond/<uuid_str>/', async_views.respond, name='respond'),
+    path('survey/<int:survey_id>/results/', async_views.results, name='results'),
+    path('survey/<int:survey_id>/results/csv/', async_views.results_csv, name='results_csv'),
+] + sync_urlpatterns
@@ -1,6 +1,12 @@
 """Admin registrations for surveys."""
-from django.contrib import admin
-from .models import Survey, Question, Option, Invitation, Answer
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.utils.html import format_html_join
+from .definitions import clone_survey
+from .models import Survey, Question, Option, Invitation, Answer, PackedResponse
+from .pagination import EstimatedCountPaginator
+from .schema import AnswerFormatter, get_schema
+from .storage import unpack
 
 
 class OptionInline(admin.TabularInline):
@@ -8,13 +14,78 @@ class OptionInline(admin.TabularInline):
     extra = 1
 
 
+class SurveyAdmin(admin.ModelAdmin):
+    actions = ['clone']
+
+    @admin.action(description='Geselecteerde enquêtes kopiëren')
+    def clone(self, request, queryset) -> None:
+        for survey in queryset:
+            try:
+                copy = clone_survey(survey)
+            except ValidationError as exc:
+                self.message_user(request, f'{survey}: {" ".join(exc.messages)}', messages.ERROR)
+            else:
+                self.message_user(request, f'{survey} gekopieerd naar "{copy}".')
+
+
 class QuestionAdmin(admin.ModelAdmin):
     inlines = [OptionInline]
     list_display = ('survey', 'number', 'title', 'question_type')
     list_filter = ('survey',)
 
 
-admin.site.register(Survey)
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables with millions of rows.
+
+    No exact counts, no facet counts and no foreign-key dropdowns; list
+    filters should use indexed columns.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+class InvitationAdmin(LargeTableAdmin):
+    list_display = ('uuid', 'survey', 'created_at', 'responded_at')
+    list_filter = ('survey', 'created_at')
+    list_select_related = ('survey',)
+    raw_id_fields = ('survey',)
+    search_fields = ('=uuid',)
+
+
+class AnswerAdmin(LargeTableAdmin):
+    list_display = ('question', 'invitation', 'text', 'option', 'scale', 'created_at')
+    list_filter = ('question__survey', 'created_at')
+    list_select_related = ('question', 'invitation', 'option')
+    raw_id_fields = ('invitation', 'question', 'option')
+
+
+class PackedResponseAdmin(LargeTableAdmin):
+    """Read-only view of packed answers, rendered like answer rows."""
+    list_display = ('invitation', 'survey', 'created_at')
+    list_filter = ('survey', 'created_at')
+    list_select_related = ('invitation', 'survey')
+    fields = ('invitation', 'survey', 'created_at', 'answer_list')
+    readonly_fields = fields
+
+    @admin.display(description='Antwoorden')
+    def answer_list(self, obj: PackedResponse) -> str:
+        schema = get_schema(obj.survey)
+        formatter = AnswerFormatter(schema)
+        return format_html_join(
+            '\n', '<p><strong>{}</strong>: {}</p>',
+            (
+                (formatter.title(qid), formatter.value(qid, text, option_id, scale))
+                for qid, text, option_id, scale in unpack(schema, obj.answers)
+            ),
+        )
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+
+admin.site.register(Survey, SurveyAdmin)
 admin.site.register(Question, QuestionAdmin)
-admin.site.register(Invitation)
-admin.site.register(Answer)
+admin.site.register(Invitation, InvitationAdmin)
+admin.site.register(Answer, AnswerAdmin)
+admin.site.register(PackedResponse, PackedResponseAdmin)
@@ -6,3 +6,9 @@ class SurveysConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'surveys'
     verbose_name = 'Enquêtes'
+
+    def ready(self) -> None:
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401
+        from .db import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='surveys_sqlite_pragmas')
@@ -0,0 +1,296 @@
+"""Cold storage of the invitations and answers of closed surveys.
+
+An archive is one file per survey: zlib-compressed blocks of respondent
+records, followed by a JSON footer with a block index and an 8-byte
+trailer holding the footer offset. Readers memory-map the file and only
+decompress the blocks they touch.
+
+Each record is ``[invitation_id, uuid, created, responded, answers]`` and
+each answer ``[id, question_id, text, option_id, scale, created]``, with
+timestamps in microseconds since the epoch. For packed surveys the answer
+id is the id of the packed response. Records are ordered by response time,
+so the last blocks hold the newest answers.
+"""
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+from uuid import UUID
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from .db import write_transaction
+from .models import Survey, Invitation, Answer, PackedResponse
+from .pagination import KeysetPage, decode_cursor, encode_cursor
+from .schema import SurveySchema, get_schema
+from .storage import pack, unpack
+
+MAGIC = b'SURVEYARCHIVE1\n'
+TRAILER = struct.Struct('<Q')
+RECORDS_PER_BLOCK = 500
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ArchivedAnswer = tuple[int, str, int | None, Decimal | None, datetime]
+
+
+class ArchiveError(Exception):
+    """The archive is unreadable or no longer matches the database."""
+
+
+def archive_path(survey_id: int) -> Path:
+    return Path(settings.SURVEY_ARCHIVE_DIR) / f'survey_{survey_id}.archive'
+
+
+def _micros(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _datetime(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+class SurveyArchive:
+    """Read access to an archive file through a memory map."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._map[:len(MAGIC)] != MAGIC:
+                raise ArchiveError(f'{path} is not a survey archive')
+            end = len(self._map) - TRAILER.size
+            (offset,) = TRAILER.unpack_from(self._map, end)
+            self.footer = json.loads(self._map[offset:end])
+        except (ValueError, struct.error) as exc:
+            self.close()
+            raise ArchiveError(f'{path} is damaged') from exc
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> SurveyArchive:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+        self._file.close()
+
+    @property
+    def last_id(self) -> int:
+        return self.footer['last_id']
+
+    def block(self, index: int) -> list[list]:
+        offset, length = self.footer['blocks'][index][:2]
+        return json.loads(zlib.decompress(self._map[offset:offset + length]))
+
+    def records(self) -> Iterator[list]:
+        for index in range(len(self.footer['blocks'])):
+            yield from self.block(index)
+
+    def respondents(self, since: int = 0, until: int | None = None) -> Iterator[tuple[str, datetime | None, list[ArchivedAnswer]]]:
+        """Respondents with answers ``since < id <= until``, oldest first."""
+        for _, uuid, _, responded, entries in self.records():
+            answers = [
+                (question_id, text, option_id, None if scale is None else Decimal(scale), _datetime(created))
+                for answer_id, question_id, text, option_id, scale, created in entries
+                if answer_id > since and (until is None or answer_id <= until)
+            ]
+            if answers:
+                yield str(UUID(uuid)), None if responded is None else _datetime(responded), answers
+
+    def answer_page(self, question_id: int | None, since: datetime | None, until: datetime | None,
+                    cursor: str | None, size: int) -> KeysetPage:
+        """A page of the answer browser, newest first.
+
+        The cursor holds the position of the last answer shown; blocks after
+        it, and blocks outside the ``since``/``until`` window, are skipped
+        without decompressing them.
+        """
+        start = decode_cursor(cursor)[1] if cursor else self.footer['answers']
+        since_us = since and _micros(since)
+        until_us = until and _micros(until)
+        rows = []
+        for index in reversed(range(len(self.footer['blocks']))):
+            _, _, first, count, oldest, newest = self.footer['blocks'][index]
+            if not count or first >= start:
+                continue
+            if (since_us and newest < since_us) or (until_us and oldest >= until_us):
+                continue
+            entries = [entry for record in self.block(index) for entry in record[4]]
+            for position in reversed(range(first, min(first + count, start))):
+                _, qid, text, option_id, scale, created = entries[position - first]
+                if (question_id and qid != question_id) or (since_us and created < since_us) \
+                        or (until_us and created >= until_us):
+                    continue
+                rows.append({
+                    'question_id': qid, 'text': text, 'option_id': option_id,
+                    'scale': None if scale is None else Decimal(scale),
+                    'created_at': _datetime(created), 'position': position,
+                })
+                if len(rows) > size:
+                    rows = rows[:size]
+                    return KeysetPage(rows, encode_cursor(rows[-1]['created_at'], rows[-1]['position']))
+        return KeysetPage(rows, None)
+
+
+def open_archive(survey_id: int) -> SurveyArchive:
+    return SurveyArchive(archive_path(survey_id))
+
+
+def _blocks(survey: Survey, schema: SurveySchema) -> Iterator[tuple[list[list], int]]:
+    """Records of ``survey`` per block, with the number of stored rows."""
+    invitations = (
+        Invitation.objects.filter(survey=survey)
+        .order_by(F('responded_at').asc(nulls_first=True), 'id')
+        .values_list('id', 'uuid', 'created_at', 'responded_at')
+        .iterator(chunk_size=RECORDS_PER_BLOCK)
+    )
+    while chunk := list(islice(invitations, RECORDS_PER_BLOCK)):
+        ids = [row[0] for row in chunk]
+        entries: dict[int, list] = {}
+        if schema.packed:
+            stored = PackedResponse.objects.filter(invitation_id__in=ids).values_list(
+                'id', 'invitation_id', 'answers', 'created_at')
+            rows = 0
+            for packed_id, invitation_id, answers, created_at in stored:
+                rows += 1
+                entries[invitation_id] = [
+                    [packed_id, qid, text, option_id, None if scale is None else str(scale), _micros(created_at)]
+                    for qid, text, option_id, scale in unpack(schema, answers)
+                ]
+        else:
+            stored = Answer.objects.filter(invitation_id__in=ids).order_by('id').values_list(
+                'id', 'invitation_id', 'question_id', 'text', 'option_id', 'scale', 'created_at')
+            rows = 0
+            for answer_id, invitation_id, qid, text, option_id, scale, created_at in stored:
+                rows += 1
+                entries.setdefault(invitation_id, []).append(
+                    [answer_id, qid, text, option_id, None if scale is None else str(scale), _micros(created_at)]
+                )
+        records = [
+            [pk, uuid.hex, _micros(created_at), None if responded_at is None else _micros(responded_at), entries.get(pk, [])]
+            for pk, uuid, created_at, responded_at in chunk
+        ]
+        yield records, rows
+
+
+def write_archive(survey: Survey, schema: SurveySchema) -> dict:
+    """Write the archive file of ``survey`` and return its footer.
+
+    The file is written next to its final name and moved into place once
+    complete, so readers never see a partial archive.
+    """
+    path = archive_path(survey.pk)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    footer = {
+        'survey': survey.pk, 'storage': survey.answer_storage,
+        'invitations': 0, 'answers': 0, 'stored_rows': 0, 'last_id': 0, 'blocks': [],
+    }
+    partial = path.with_suffix('.partial')
+    with partial.open('wb') as f:
+        f.write(MAGIC)
+        for records, rows in _blocks(survey, schema):
+            entries = [entry for record in records for entry in record[4]]
+            created = [entry[5] for entry in entries]
+            payload = zlib.compress(json.dumps(records, separators=(',', ':')).encode())
+            footer['blocks'].append([f.tell(), len(payload), footer['answers'], len(entries),
+                                     min(created, default=0), max(created, default=0)])
+            f.write(payload)
+            footer['invitations'] += len(records)
+            footer['answers'] += len(entries)
+            footer['stored_rows'] += rows
+            footer['last_id'] = max([footer['last_id']] + [entry[0] for entry in entries])
+        offset = f.tell()
+        f.write(json.dumps(footer).encode())
+        f.write(TRAILER.pack(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+    return footer
+
+
+def archive_survey(survey: Survey) -> dict:
+    """Move the invitations and answers of ``survey`` into its archive.
+
+    The rows are deleted only if nothing was added while the file was being
+    written; otherwise :class:`ArchiveError` is raised and the database is
+    left untouched. Tallies stay in the database.
+    """
+    schema = get_schema(survey)
+    footer = write_archive(survey, schema)
+    stored = PackedResponse.objects.filter(survey=survey) if schema.packed else Answer.objects.filter(question__survey=survey)
+    try:
+        with write_transaction():
+            survey.archived_at = timezone.now()
+            survey.save(update_fields=['archived_at'])
+            counts = Invitation.objects.filter(survey=survey).count(), stored.count()
+            if counts != (footer['invitations'], footer['stored_rows']):
+                raise ArchiveError(f'Survey {survey.pk} changed while it was archived')
+            Answer.objects.filter(question__survey=survey).delete()
+            PackedResponse.objects.filter(survey=survey).delete()
+            Invitation.objects.filter(survey=survey).delete()
+    except BaseException:
+        survey.archived_at = None
+        archive_path(survey.pk).unlink(missing_ok=True)
+        raise
+    return footer
+
+
+def restore_survey(survey: Survey) -> dict:
+    """Put the archived invitations and answers back and remove the archive.
+
+    Rows keep their ids and timestamps, so export cursors stay valid.
+    Answers to questions deleted in the meantime are dropped.
+    """
+    schema = get_schema(survey)
+    question_ids = {q.id for q in schema.questions}
+    option_ids = {option_id for q in schema.questions for option_id, _ in q.choices}
+    with open_archive(survey.pk) as archive, write_transaction():
+        packed = archive.footer['storage'] == Survey.PACKED
+        for index in range(len(archive.footer['blocks'])):
+            records = archive.block(index)
+            Invitation.objects.bulk_create([
+                Invitation(
+                    id=pk, survey=survey, uuid=UUID(uuid), created_at=_datetime(created),
+                    responded_at=None if responded is None else _datetime(responded),
+                )
+                for pk, uuid, created, responded, _ in records
+            ])
+            answers = [
+                Answer(
+                    id=answer_id, invitation_id=record[0], question_id=qid, text=text,
+                    option_id=option_id if option_id in option_ids else None,
+                    scale=None if scale is None else Decimal(scale), created_at=_datetime(created),
+                )
+                for record in records
+                for answer_id, qid, text, option_id, scale, created in record[4]
+                if qid in question_ids
+            ]
+            if packed:
+                by_invitation: dict[int, list[Answer]] = {}
+                for answer in answers:
+                    by_invitation.setdefault(answer.invitation_id, []).append(answer)
+                PackedResponse.objects.bulk_create([
+                    PackedResponse(
+                        id=group[0].id, invitation_id=invitation_id, survey=survey,
+                        answers=pack(group), created_at=group[0].created_at,
+                    )
+                    for invitation_id, group in by_invitation.items()
+                ])
+            else:
+                Answer.objects.bulk_create(answers)
+        survey.archived_at = None
+        survey.save(update_fields=['archived_at'])
+        footer = archive.footer
+    archive_path(survey.pk).unlink()
+    return footer
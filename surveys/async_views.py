@@ -0,0 +1,89 @@
+"""Async versions of the respondent and results views for the ASGI entry point.
+
+Lookups use the async ORM; the shared helpers (schema cache, ingest,
+tallies, export) run through ``sync_to_async``, so a request only holds a
+thread while it is actually talking to the database. CSV downloads are
+async streams and leave the event loop free between chunks.
+"""
+from __future__ import annotations
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_protect
+from .export import WIDE, astream_csv, export_etag, long_rows, watermark, wide_rows
+from .forms import DynamicResponseForm
+from .ingest import save_response
+from .models import Survey, Invitation
+from .schema import get_schema
+from .spool import get_spool
+from .views import _csv_export, _csv_response, _respond_paged, _results_context, survey_closed
+
+
+def alogin_required(view):
+    """``login_required`` for async views.
+
+    Also loads ``request.user`` up front, so templates can use it without
+    a database query inside the event loop.
+    """
+    @wraps(view)
+    async def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@csrf_protect
+async def respond(request: HttpRequest, uuid_str: str) -> HttpResponse:
+    invitation = await aget_object_or_404(Invitation.objects.select_related('survey'), uuid=uuid_str)
+    survey = invitation.survey
+    if survey.archived_at is not None:
+        return survey_closed(request, survey)
+    schema = await sync_to_async(get_schema)(survey)
+    if survey.questions_per_page:
+        return await sync_to_async(_respond_paged)(request, invitation, schema)
+    questions = schema.questions
+    if request.method == 'POST':
+        form = DynamicResponseForm(request.POST, questions=questions)
+        if form.is_valid():
+            if settings.SURVEY_INGEST_MODE == 'spool':
+                await sync_to_async(get_spool().enqueue)(invitation.pk, form.cleaned_data, timezone.now())
+            else:
+                await sync_to_async(save_response)(invitation, questions, form.cleaned_data)
+            return render(request, 'surveys/thanks.html', {'survey': survey})
+    else:
+        form = DynamicResponseForm(questions=questions)
+    return render(request, 'surveys/response_form.html', {'form': form, 'survey': survey})
+
+
+@alogin_required
+async def results(request: HttpRequest, survey_id: int) -> HttpResponse:
+    survey = await aget_object_or_404(Survey, pk=survey_id)
+    schema = await sync_to_async(get_schema)(survey)
+    context = await sync_to_async(_results_context)(request, survey, schema)
+    return render(request, 'surveys/results.html', context)
+
+
+@alogin_required
+async def results_csv(request: HttpRequest, survey_id: int) -> HttpResponse:
+    """Stream the answers as CSV; see :func:`surveys.views.results_csv`."""
+    survey = await aget_object_or_404(Survey, pk=survey_id)
+    export = _csv_export(request)
+    if isinstance(export, HttpResponse):
+        return export
+    layout, since = export
+    schema = await sync_to_async(get_schema)(survey)
+    until = await sync_to_async(watermark)(schema, since)
+    tag = export_etag(schema, layout, since, until, survey.answer_deletions)
+    not_modified = get_conditional_response(request, etag=tag)
+    if not_modified is not None:
+        not_modified['X-Next-Cursor'] = str(until)
+        return not_modified
+    rows = (wide_rows if layout == WIDE else long_rows)(survey, schema, since, until)
+    return _csv_response(StreamingHttpResponse(astream_csv(rows), content_type='text/csv'), survey_id, layout, since, until, tag)
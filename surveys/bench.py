@@ -0,0 +1,208 @@
+"""Load-test driver measuring latency and SQL queries per endpoint."""
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from .metrics import QueryRecorder
+
+
+@dataclass
+class EndpointStats:
+    """Samples collected for one endpoint."""
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    errors: int = 0
+    wall_time: float = 0.0
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            'requests': len(latencies) + self.errors,
+            'errors': self.errors,
+            'throughput_rps': round(len(latencies) / self.wall_time, 1) if self.wall_time else 0.0,
+            'latency_ms': {
+                'p50': _ms(percentile(latencies, 50)),
+                'p95': _ms(percentile(latencies, 95)),
+                'p99': _ms(percentile(latencies, 99)),
+                'max': _ms(latencies[-1] if latencies else 0.0),
+            },
+            'queries': {
+                'mean': round(sum(self.queries) / len(self.queries), 1) if self.queries else 0.0,
+                'max': max(self.queries, default=0),
+            },
+        }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted ``values``."""
+    if not values:
+        return 0.0
+    rank = -(-len(values) * pct // 100)  # ceil
+    return values[max(int(rank), 1) - 1]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def bench_host() -> str:
+    """A host name accepted by ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+Request = Callable[[Client], HttpResponse]
+AsyncRequest = Callable[[AsyncClient], Awaitable[HttpResponse]]
+
+
+class LoadDriver:
+    """Sends requests through the test client from a pool of threads.
+
+    Each thread keeps its own client (logged in as ``user`` when given) and
+    its own database connection, as a WSGI worker thread would.
+    """
+
+    def __init__(self, concurrency: int, user=None) -> None:
+        self.concurrency = concurrency
+        self.user = user
+        self.stats: dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def run(self, tasks: list[list[tuple[str, Request]]]) -> None:
+        """Run each task (a sequence of named requests) on the pool.
+
+        The phase duration is added to every endpoint used in it, so
+        throughput is requests per second of wall-clock time.
+        """
+        names = {name for task in tasks for name, _ in task}
+        started = time.perf_counter()
+        self._execute(tasks)
+        elapsed = time.perf_counter() - started
+        for name in names:
+            self.stats[name].wall_time += elapsed
+
+    def report(self) -> dict[str, dict]:
+        return {name: stats.summary() for name, stats in sorted(self.stats.items())}
+
+    def _execute(self, tasks: list[list[tuple[str, Request]]]) -> None:
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            for future in [pool.submit(self._run_task, task) for task in tasks]:
+                future.result()
+
+    def _add(self, name: str, ok: bool, elapsed: float, queries: int) -> None:
+        with self._lock:
+            stats = self.stats[name]
+            if ok:
+                stats.latencies.append(elapsed)
+                stats.queries.append(queries)
+            else:
+                stats.errors += 1
+
+    def _client(self) -> Client:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = Client(HTTP_HOST=bench_host(), raise_request_exception=False)
+            if self.user is not None:
+                client.force_login(self.user)
+            self._local.client = client
+        return client
+
+    def _run_task(self, task: list[tuple[str, Request]]) -> None:
+        try:
+            for name, request in task:
+                self._measure(name, request)
+        finally:
+            connection.close()
+
+    def _measure(self, name: str, request: Request) -> None:
+        client = self._client()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            try:
+                response = request(client)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                ok = response.status_code < 400
+            except Exception:  # noqa: BLE001 - counted as an error sample
+                ok = False
+            elapsed = time.perf_counter() - started
+        self._add(name, ok, elapsed, len(queries))
+
+
+class AsyncLoadDriver(LoadDriver):
+    """Sends requests through the async test client from one event loop.
+
+    At most ``concurrency`` tasks are in flight, each with a client from a
+    shared pool. The async client always sends ``Host: testserver``, so
+    that host has to be allowed. Like a request under an ASGI server, every task runs in
+    its own ``ThreadSensitiveContext``, so the sync parts of the views get
+    a thread and a database connection per task only while they run.
+    """
+
+    def _execute(self, tasks: list[list[tuple[str, AsyncRequest]]]) -> None:
+        asyncio.run(self._execute_async(tasks))
+
+    async def _execute_async(self, tasks: list[list[tuple[str, AsyncRequest]]]) -> None:
+        clients: asyncio.Queue[AsyncClient] = asyncio.Queue()
+        for _ in range(min(self.concurrency, len(tasks))):
+            client = AsyncClient(raise_request_exception=False)
+            if self.user is not None:
+                await client.aforce_login(self.user)
+            clients.put_nowait(client)
+        try:
+            await asyncio.gather(*(self._run_task_async(clients, task) for task in tasks))
+        finally:
+            await sync_to_async(_close_connection)()
+
+    async def _run_task_async(self, clients: asyncio.Queue[AsyncClient], task: list[tuple[str, AsyncRequest]]) -> None:
+        client = await clients.get()
+        try:
+            async with ThreadSensitiveContext():
+                try:
+                    for name, request in task:
+                        await self._measure_async(client, name, request)
+                finally:
+                    await sync_to_async(_close_connection)()
+        finally:
+            clients.put_nowait(client)
+
+    async def _measure_async(self, client: AsyncClient, name: str, request: AsyncRequest) -> None:
+        # Queries run on the thread of the task's context, so count them there.
+        recorder = QueryRecorder()
+        counting = ExitStack()
+        await sync_to_async(lambda: counting.enter_context(connection.execute_wrapper(recorder)))()
+        started = time.perf_counter()
+        try:
+            response = await request(client)
+            if response.streaming:
+                if response.is_async:
+                    async for _ in response.streaming_content:
+                        pass
+                else:
+                    await sync_to_async(list)(response.streaming_content)
+            ok = response.status_code < 400
+        except Exception:  # noqa: BLE001 - counted as an error sample
+            ok = False
+        elapsed = time.perf_counter() - started
+        await sync_to_async(counting.close)()
+        self._add(name, ok, elapsed, recorder.count)
+
+
+def _close_connection() -> None:
+    # Looked up in the worker thread: connections are per thread.
+    connection.close()
@@ -0,0 +1,73 @@
+"""Per-survey counters of questions, invitations and responses.
+
+``Survey.question_count``, ``invitation_count`` and ``response_count`` are
+kept up to date by triggers on the question and invitation tables (see
+migration 0009), so bulk inserts, spool drains and cascading deletes are
+covered without signals. A response counts once its invitation has a
+``responded_at``. The invitation triggers skip archived surveys, whose
+counters keep the totals of the archive. Migrations that make SQLite
+rebuild ``surveys_survey`` have to drop and recreate these triggers around
+the change, as 0011 and 0012 do.
+
+This module recomputes the counters for the ``reconcile_counters``
+command, which repairs drift after raw SQL or restored backups.
+"""
+from __future__ import annotations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .archive import open_archive
+from .db import write_transaction
+from .models import Survey, Question, Invitation
+
+
+def _count(queryset) -> Coalesce:
+    rows = queryset.filter(survey=OuterRef('pk')).order_by().values('survey').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(rows), 0)
+
+
+def _database_counts(archived: bool) -> dict[str, Coalesce]:
+    counts = {'question_count': _count(Question.objects.all())}
+    if not archived:
+        counts['invitation_count'] = _count(Invitation.objects.all())
+        counts['response_count'] = _count(Invitation.objects.filter(responded_at__isnull=False))
+    return counts
+
+
+def _archive_counts(survey: Survey) -> dict[str, int]:
+    with open_archive(survey.pk) as archive:
+        responses = sum(1 for record in archive.records() if record[3] is not None)
+        return {'invitation_count': archive.footer['invitations'], 'response_count': responses}
+
+
+def expected_counts(survey: Survey) -> dict[str, int]:
+    """The counters of ``survey`` recomputed from the rows and its archive."""
+    archived = survey.archived_at is not None
+    counts = Survey.objects.filter(pk=survey.pk).values(**{
+        f'expected_{name}': expression for name, expression in _database_counts(archived).items()
+    }).get()
+    counts = {name.removeprefix('expected_'): value for name, value in counts.items()}
+    if archived:
+        counts.update(_archive_counts(survey))
+    return counts
+
+
+def counter_drift(survey: Survey) -> dict[str, tuple[int, int]]:
+    """``{counter: (stored, expected)}`` for the counters that are off."""
+    return {
+        name: (getattr(survey, name), value)
+        for name, value in expected_counts(survey).items()
+        if getattr(survey, name) != value
+    }
+
+
+def reconcile_counters(survey: Survey) -> None:
+    """Overwrite the counters of ``survey`` with freshly computed values.
+
+    The database counts are taken inside the UPDATE itself, so rows added
+    while it runs cannot slip between counting and writing.
+    """
+    archived = survey.archived_at is not None
+    values = {**_database_counts(archived), **(_archive_counts(survey) if archived else {})}
+    with write_transaction():
+        Survey.objects.filter(pk=survey.pk).update(**values)
+    survey.refresh_from_db(fields=Survey.COUNTERS)
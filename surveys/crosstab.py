@@ -0,0 +1,202 @@
+"""Cross-tabulation of survey questions over respondent bitmaps.
+
+For every question and answer bucket (the option id for ``mc``, the scale
+value in tenths for ``scale``, 0 for an answered ``open`` question) the
+respondents are kept as a bitmap in a Python int. Respondents get a dense
+position in the order they are first seen, so a bitmap is as wide as the
+number of respondents rather than the span of their invitation ids.
+Segmenting one question by another is then an ``&`` plus a
+``bit_count()`` per cell, independent of the answer table.
+
+The bitmaps live in the survey cache and are brought up to date with the
+answers stored after their watermark, the highest answer id they include.
+Like the export cursor this relies on answer ids being committed in order,
+which SQLite's single writer guarantees. Deleted or edited answers cannot be
+taken out bit by bit; triggers count them in ``Survey.answer_deletions``
+and sets built under an older count are rebuilt from scratch.
+"""
+from __future__ import annotations
+from array import array
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Iterable, Iterator
+from django.conf import settings
+from django.core.cache import caches
+from .archive import open_archive
+from .models import Question, Answer
+from .schema import QuestionSpec, SurveySchema
+from .storage import packed_responses, unpack
+from .tallies import SCALE_STEPS, scale_bucket
+
+# Bump when the layout of RespondentSets changes.
+RESPONDENT_SETS_VERSION = 2
+UPDATE_CHUNK_SIZE = 5000
+
+
+@dataclass
+class RespondentSets:
+    """Per-bucket respondent bitmaps of one survey.
+
+    ``invitations`` holds the invitation id of every bit position; the
+    reverse lookup is rebuilt after unpickling rather than cached.
+    """
+    survey_id: int
+    deletions: int = 0
+    watermark: int = 0
+    invitations: array = field(default_factory=lambda: array('q'))
+    bitmaps: dict[tuple[int, int], int] = field(default_factory=dict)
+    _positions: dict[int, int] | None = field(default=None, repr=False, compare=False)
+
+    def __getstate__(self) -> dict:
+        return {**self.__dict__, '_positions': None}
+
+    def positions(self) -> dict[int, int]:
+        if self._positions is None:
+            self._positions = {invitation_id: i for i, invitation_id in enumerate(self.invitations)}
+        return self._positions
+
+    def position(self, invitation_id: int) -> int:
+        """Bit position of a respondent, assigning the next free one if new."""
+        positions = self.positions()
+        position = positions.get(invitation_id)
+        if position is None:
+            position = positions[invitation_id] = len(self.invitations)
+            self.invitations.append(invitation_id)
+        return position
+
+    def add(self, question_id: int, bucket: int, invitation_ids: Iterable[int]) -> None:
+        """Add respondents to one bucket.
+
+        The new bits are set in a bytearray and merged with a single ``|``;
+        or-ing them in one by one would copy the whole int every time.
+        """
+        offsets = [self.position(invitation_id) for invitation_id in invitation_ids]
+        if not offsets:
+            return
+        buffer = bytearray(max(offsets) // 8 + 1)
+        for offset in offsets:
+            buffer[offset >> 3] |= 1 << (offset & 7)
+        key = (question_id, bucket)
+        self.bitmaps[key] = self.bitmaps.get(key, 0) | int.from_bytes(buffer, 'little')
+
+    def members(self, question_id: int, bucket: int) -> int:
+        return self.bitmaps.get((question_id, bucket), 0)
+
+    def answered(self, question: QuestionSpec) -> int:
+        """Everyone who answered ``question``."""
+        bits = 0
+        for bucket in buckets(question):
+            bits |= self.members(question.id, bucket)
+        return bits
+
+    def update(self, schema: SurveySchema) -> bool:
+        """Add the answers stored after the watermark; True if any were."""
+        pending: dict[tuple[int, int], list[int]] = {}
+        for answer_id, invitation_id, question_id, option_id, scale in _answers_after(schema, self.watermark):
+            if option_id is not None:
+                bucket = option_id
+            elif scale is not None:
+                bucket = scale_bucket(scale)
+            else:
+                bucket = 0
+            pending.setdefault((question_id, bucket), []).append(invitation_id)
+            self.watermark = max(self.watermark, answer_id)
+        for (question_id, bucket), invitation_ids in pending.items():
+            self.add(question_id, bucket, invitation_ids)
+        return bool(pending)
+
+
+def buckets(question: QuestionSpec) -> list[int]:
+    if question.question_type == Question.MULTIPLE_CHOICE:
+        return [option_id for option_id, _ in question.choices]
+    if question.question_type == Question.SCALE:
+        return list(range(SCALE_STEPS))
+    return [0]
+
+
+def bucket_labels(question: QuestionSpec) -> list[str]:
+    if question.question_type == Question.MULTIPLE_CHOICE:
+        return [text for _, text in question.choices]
+    if question.question_type == Question.SCALE:
+        return [f'{step / 10:.1f}' for step in range(SCALE_STEPS)]
+    return ['Beantwoord']
+
+
+def _answers_after(schema: SurveySchema, watermark: int) -> Iterator[tuple[int, int, int, int | None, Decimal | str | None]]:
+    """``(id, invitation_id, question_id, option_id, scale)`` after ``watermark``."""
+    if schema.archived:
+        with open_archive(schema.survey_id) as archive:
+            if archive.last_id <= watermark:
+                return
+            for invitation_id, _, _, _, entries in archive.records():
+                for answer_id, question_id, _, option_id, scale, _ in entries:
+                    if answer_id > watermark:
+                        yield answer_id, invitation_id, question_id, option_id, scale
+        return
+    if schema.packed:
+        responses = packed_responses(schema, watermark).order_by('id').values_list('id', 'invitation_id', 'answers')
+        for packed_id, invitation_id, packed in responses.iterator(chunk_size=UPDATE_CHUNK_SIZE):
+            for question_id, _, option_id, scale in unpack(schema, packed):
+                yield packed_id, invitation_id, question_id, option_id, scale
+        return
+    answers = (
+        Answer.objects.filter(question_id__in=[q.id for q in schema.questions], id__gt=watermark)
+        .order_by('id')
+        .values_list('id', 'invitation_id', 'question_id', 'option_id', 'scale')
+    )
+    yield from answers.iterator(chunk_size=UPDATE_CHUNK_SIZE)
+
+
+def _cache():
+    return caches[settings.SURVEY_CACHE_ALIAS]
+
+
+def respondent_sets_key(survey_id: int) -> str:
+    return f'respondent-sets:v{RESPONDENT_SETS_VERSION}:{survey_id}'
+
+
+def get_respondent_sets(schema: SurveySchema, deletions: int) -> RespondentSets:
+    """Cached respondent bitmaps of the survey, caught up to the latest answer.
+
+    ``deletions`` is the survey's current ``answer_deletions``; cached sets
+    built under another value are replaced.
+    """
+    key = respondent_sets_key(schema.survey_id)
+    sets = _cache().get(key)
+    fresh = sets is None or sets.deletions != deletions
+    if fresh:
+        sets = RespondentSets(schema.survey_id, deletions)
+    if sets.update(schema) or fresh:
+        _cache().set(key, sets)
+    return sets
+
+
+def invalidate_respondent_sets(survey_id: int) -> None:
+    _cache().delete(respondent_sets_key(survey_id))
+
+
+def crosstab(schema: SurveySchema, segment: QuestionSpec, target: QuestionSpec, deletions: int) -> dict:
+    """Answers to ``target`` per option of the ``mc`` question ``segment``.
+
+    The last row covers every respondent of ``target``. Scale targets also
+    get the mean per row. ``deletions`` is passed to :func:`get_respondent_sets`.
+    """
+    sets = get_respondent_sets(schema, deletions)
+    target_buckets = [(bucket, sets.members(target.id, bucket)) for bucket in buckets(target)]
+    segments = [
+        (option_id, text, sets.members(segment.id, option_id)) for option_id, text in segment.choices
+    ] + [(None, 'Alle respondenten', sets.answered(target))]
+    rows = []
+    for option_id, label, members in segments:
+        counts = [(members & bits).bit_count() for _, bits in target_buckets]
+        row = {'option_id': option_id, 'label': label, 'respondents': sum(counts), 'counts': counts}
+        if target.question_type == Question.SCALE:
+            total = sum(counts)
+            row['mean'] = round(sum(b * n for (b, _), n in zip(target_buckets, counts)) / total / 10, 2) if total else None
+        rows.append(row)
+    return {
+        'segment': {'id': segment.id, 'title': segment.title},
+        'target': {'id': target.id, 'title': target.title, 'type': target.question_type},
+        'columns': bucket_labels(target),
+        'rows': rows,
+    }
@@ -0,0 +1,51 @@
+"""SQLite connection tuning and serialized write transactions."""
+from __future__ import annotations
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+_write_lock = threading.RLock()
+
+
+def apply_sqlite_pragmas(sender, connection: BaseDatabaseWrapper, **kwargs) -> None:
+    """Apply ``settings.SQLITE_PRAGMAS`` to every new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def _begin_immediate(connection: BaseDatabaseWrapper) -> Iterator[None]:
+    """Make the outermost ``atomic()`` on ``connection`` start with ``BEGIN IMMEDIATE``.
+
+    Django 5.0 always issues a deferred ``BEGIN`` on SQLite; this overrides
+    the method it uses for that on the connection instance.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    connection._start_transaction_under_autocommit = lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    finally:
+        del connection._start_transaction_under_autocommit
+
+
+@contextmanager
+def write_transaction() -> Iterator[None]:
+    """``transaction.atomic()`` that holds SQLite's write lock from the start.
+
+    The transaction begins with ``BEGIN IMMEDIATE``, so a writer that reads
+    first cannot fail with a stale read snapshot once another process has
+    committed; it waits for the lock within the busy timeout instead. With
+    ``SURVEY_SERIALIZE_WRITES`` enabled, concurrent writers in the same
+    process also queue on a lock rather than on the busy timeout.
+    """
+    lock = _write_lock if settings.SURVEY_SERIALIZE_WRITES else nullcontext()
+    with lock, _begin_immediate(transaction.get_connection()), transaction.atomic():
+        yield
@@ -0,0 +1,181 @@
+"""Survey definitions: importing surveys from JSON or CSV and cloning them.
+
+A JSON definition looks like::
+
+    {"title": "...", "description": "...", "start_date": "2025-01-01",
+     "end_date": "2025-03-31", "is_published": false, "questions_per_page": 0,
+     "questions": [{"number": 1, "title": "...", "text": "...", "type": "mc",
+                    "options": ["Ja", "Nee"], "image_url": "", "table_description": ""}]}
+
+A CSV file holds only the questions, one per row with the same keys as
+columns and the options separated by ``|``; the survey fields come from
+the caller. JSON options may also be given as one ``|``-separated string. Everything is validated before the first row is written, and
+the rows then go in with one bulk insert per table.
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+from dataclasses import dataclass
+from typing import Any
+from django.core.exceptions import ValidationError
+from .crosstab import invalidate_respondent_sets
+from .db import write_transaction
+from .models import Survey, Question, Option
+from .schema import invalidate_schema
+
+SURVEY_FIELDS = ('title', 'description', 'start_date', 'end_date', 'is_published', 'questions_per_page')
+CSV_REQUIRED_COLUMNS = ('title', 'text', 'type')
+OPTION_SEPARATOR = '|'
+
+
+@dataclass
+class Definition:
+    """Unsaved, validated rows of one survey."""
+    survey: Survey
+    questions: list[tuple[Question, list[Option]]]
+
+
+def parse_json(content: str) -> dict[str, Any]:
+    try:
+        data = json.loads(content)
+    except ValueError as exc:
+        raise ValidationError(f'Ongeldige JSON: {exc}.')
+    if not isinstance(data, dict) or not isinstance(data.get('questions'), list):
+        raise ValidationError('Verwacht een object met een lijst "questions".')
+    return data
+
+
+def parse_csv(content: str, survey: dict[str, Any]) -> dict[str, Any]:
+    """Questions from CSV, combined with the survey fields in ``survey``."""
+    reader = csv.DictReader(io.StringIO(content))
+    missing = [column for column in CSV_REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValidationError(f'Ontbrekende kolommen: {", ".join(missing)}.')
+    questions = [
+        {**row, 'options': [text.strip() for text in (row.get('options') or '').split(OPTION_SEPARATOR) if text.strip()]}
+        for row in reader
+    ]
+    return {**survey, 'questions': questions}
+
+
+def parse_definition(name: str, content: str, survey: dict[str, Any] | None = None) -> dict[str, Any]:
+    """Parse a ``.json`` or ``.csv`` file; fields in ``survey`` override the file's."""
+    survey = {key: value for key, value in (survey or {}).items() if value not in (None, '')}
+    if name.lower().endswith('.csv'):
+        return parse_csv(content, survey)
+    return {**parse_json(content), **survey}
+
+
+def build_definition(data: dict[str, Any]) -> Definition:
+    """Unsaved rows for ``data``, checked like the model forms would.
+
+    Raises :class:`ValidationError` listing every problem found.
+    """
+    errors: list[str] = []
+    survey = Survey(**{field: data[field] for field in SURVEY_FIELDS if data.get(field) not in (None, '')})
+    errors += _errors(survey, exclude=['answer_storage', 'archived_at'])
+    questions = []
+    numbers: set[int] = set()
+    for position, item in enumerate(data.get('questions') or [], 1):
+        if not isinstance(item, dict):
+            errors.append(f'Vraag {position}: verwacht een object.')
+            continue
+        question = Question(
+            number=item.get('number') or position, title=item.get('title') or '', text=item.get('text') or '',
+            image_url=item.get('image_url') or '', table_description=item.get('table_description') or '',
+            question_type=item.get('type') or '',
+        )
+        texts = item.get('options') or []
+        problems = []
+        if isinstance(texts, str):
+            texts = [text.strip() for text in texts.split(OPTION_SEPARATOR) if text.strip()]
+        elif not isinstance(texts, list):
+            problems.append('opties moeten een lijst zijn.')
+            texts = []
+        options = [Option(text=str(text)) for text in texts]
+        problems += _errors(question, exclude=['survey'])
+        for option in options:
+            problems += _errors(option, exclude=['question'])
+        if question.question_type == Question.MULTIPLE_CHOICE and not options:
+            problems.append('meerkeuzevraag zonder opties.')
+        elif question.question_type != Question.MULTIPLE_CHOICE and options:
+            problems.append('alleen meerkeuzevragen hebben opties.')
+        if question.number in numbers:
+            problems.append(f'vraagnummer {question.number} komt al voor.')
+        numbers.add(question.number)
+        errors += [f'Vraag {position}: {problem}' for problem in problems]
+        questions.append((question, options))
+    if not errors:
+        try:
+            survey.validate_definition(len(questions))
+        except ValidationError as exc:
+            errors += exc.messages
+    if errors:
+        raise ValidationError(errors)
+    return Definition(survey, questions)
+
+
+def _errors(instance, exclude: list[str]) -> list[str]:
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as exc:
+        return [f'{field}: {message}' for field, messages in exc.message_dict.items() for message in messages]
+    return []
+
+
+def create_survey(definition: Definition) -> Survey:
+    """Insert the survey, its questions and its options.
+
+    One insert per table, in batches of SQLite's parameter limit. Bulk
+    inserts send no signals, so the caches are invalidated here.
+    """
+    survey = definition.survey
+    with write_transaction():
+        survey.save()
+        for question, _ in definition.questions:
+            question.survey = survey
+        Question.objects.bulk_create([question for question, _ in definition.questions])
+        options = []
+        for question, question_options in definition.questions:
+            for option in question_options:
+                option.question = question
+                options.append(option)
+        Option.objects.bulk_create(options)
+    invalidate_schema(survey.pk)
+    invalidate_respondent_sets(survey.pk)
+    return survey
+
+
+def import_survey(data: dict[str, Any]) -> Survey:
+    return create_survey(build_definition(data))
+
+
+def clone_survey(survey: Survey, title: str | None = None) -> Survey:
+    """Copy ``survey`` with its questions and options, without responses.
+
+    The copy starts unpublished, so it does not go live with the dates of
+    the original. Reads the questions and the options in one query each, so together
+    with :func:`create_survey` the number of queries does not depend on
+    the size of the survey.
+    """
+    questions = list(Question.objects.filter(survey=survey).order_by('number', 'id'))
+    options: dict[int, list[Option]] = {}
+    for option in Option.objects.filter(question__survey=survey).order_by('id'):
+        options.setdefault(option.question_id, []).append(Option(text=option.text))
+    copy = Survey(
+        title=title or f'{survey.title} (kopie)'[:200], description=survey.description,
+        start_date=survey.start_date, end_date=survey.end_date,
+        questions_per_page=survey.questions_per_page,
+    )
+    copy.validate_definition(len(questions))
+    return create_survey(Definition(copy, [
+        (
+            Question(
+                number=q.number, title=q.title, text=q.text, image_url=q.image_url,
+                table_description=q.table_description, question_type=q.question_type,
+            ),
+            options.get(q.pk, []),
+        )
+        for q in questions
+    ]))
@@ -0,0 +1,165 @@
+"""Streaming CSV export of survey answers."""
+from __future__ import annotations
+import csv
+import zlib
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import AsyncIterator, Iterable, Iterator
+from asgiref.sync import sync_to_async
+from django.db.models import Max, QuerySet
+from django.utils.http import quote_etag
+from .models import Survey, Answer
+from .archive import open_archive
+from .schema import AnswerFormatter, SurveySchema
+from .storage import packed_responses, unpack
+
+EXPORT_CHUNK_SIZE = 2000
+LONG = 'long'
+WIDE = 'wide'
+LAYOUTS = (LONG, WIDE)
+
+
+class Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_csv(rows: Iterable[list]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def astream_csv(rows: Iterator[list], batch_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[str]:
+    """``stream_csv`` for async responses, one chunk per ``batch_size`` rows.
+
+    The rows are produced in a worker thread while the event loop is free.
+    ``sync_to_async`` is thread sensitive, so every batch runs on the thread
+    that opened the database cursor.
+    """
+    lines = stream_csv(rows)
+    take = sync_to_async(lambda: ''.join(islice(lines, batch_size)))
+    try:
+        while chunk := await take():
+            yield chunk
+    finally:
+        await sync_to_async(_close)(lines, rows)
+
+
+def _close(*iterators: Iterator) -> None:
+    for iterator in iterators:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
+
+
+def survey_answers(schema: SurveySchema, since: int = 0, until: int | None = None) -> QuerySet:
+    """Answers of the survey with ``since < id <= until``.
+
+    For packed surveys these are the packed responses, whose ids serve as
+    the export cursor instead.
+    """
+    if schema.packed:
+        return packed_responses(schema, since, until)
+    answers = Answer.objects.filter(question_id__in=[q.id for q in schema.questions])
+    if since:
+        answers = answers.filter(id__gt=since)
+    if until is not None:
+        answers = answers.filter(id__lte=until)
+    return answers
+
+
+def watermark(schema: SurveySchema, since: int = 0) -> int:
+    """Highest answer id of the survey after ``since``, or ``since`` itself.
+
+    Answer ids only grow, so ``since < id <= watermark`` is a stable window:
+    rows committed while an export streams fall into the next pull.
+    """
+    if schema.archived:
+        with open_archive(schema.survey_id) as archive:
+            return max(archive.last_id, since)
+    return survey_answers(schema, since).aggregate(last=Max('id'))['last'] or since
+
+
+def export_etag(schema: SurveySchema, layout: str, since: int, until: int, deletions: int) -> str:
+    """Validator for an export window; also changes when labels change.
+
+    ``deletions`` is the survey's ``answer_deletions``, so deleting or
+    editing answers below the watermark changes the tag as well.
+    """
+    digest = zlib.crc32(repr(schema).encode())
+    return quote_etag(f'{schema.survey_id}-{layout}-{since}-{until}-{deletions}-{digest:08x}')
+
+
+def long_rows(survey: Survey, schema: SurveySchema, since: int = 0, until: int | None = None,
+              chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """One row per answer, in insertion order."""
+    formatter = AnswerFormatter(schema)
+    yield ['question', 'answer', 'timestamp']
+    if schema.archived:
+        with open_archive(schema.survey_id) as archive:
+            for _, _, answers in archive.respondents(since, until):
+                for question_id, text, option_id, scale, created_at in answers:
+                    yield [formatter.title(question_id), formatter.value(question_id, text, option_id, scale), created_at.isoformat()]
+        return
+    if schema.packed:
+        responses = survey_answers(schema, since, until).order_by('id').values_list('answers', 'created_at')
+        for packed, created_at in responses.iterator(chunk_size=chunk_size):
+            for question_id, text, option_id, scale in unpack(schema, packed):
+                yield [formatter.title(question_id), formatter.value(question_id, text, option_id, scale), created_at.isoformat()]
+        return
+    answers = (
+        survey_answers(schema, since, until)
+        .order_by('id')
+        .values_list('question_id', 'text', 'option_id', 'scale', 'created_at')
+    )
+    for question_id, text, option_id, scale, created_at in answers.iterator(chunk_size=chunk_size):
+        yield [formatter.title(question_id), formatter.value(question_id, text, option_id, scale), created_at.isoformat()]
+
+
+def wide_rows(survey: Survey, schema: SurveySchema, since: int = 0, until: int | None = None,
+              chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """One row per invitation with one column per question.
+
+    Answers are read ordered by invitation, so only the respondent that is
+    currently being assembled is held in memory. A submission is stored in
+    a single transaction, so a ``since``/``until`` window never splits one.
+    """
+    formatter = AnswerFormatter(schema)
+    columns = {q.id: i for i, q in enumerate(schema.questions)}
+    yield ['invitation', 'responded_at'] + [f'{q.number}. {q.title}' for q in schema.questions]
+    if schema.archived:
+        with open_archive(schema.survey_id) as archive:
+            for uuid, responded_at, answers in archive.respondents(since, until):
+                values = [''] * len(columns)
+                for question_id, text, option_id, scale, _ in answers:
+                    if question_id in columns:
+                        values[columns[question_id]] = formatter.value(question_id, text, option_id, scale)
+                yield [uuid, responded_at.isoformat() if responded_at else ''] + values
+        return
+    if schema.packed:
+        responses = (
+            survey_answers(schema, since, until)
+            .order_by('invitation_id')
+            .values_list('invitation__uuid', 'invitation__responded_at', 'answers')
+        )
+        for uuid, responded_at, packed in responses.iterator(chunk_size=chunk_size):
+            values = [''] * len(columns)
+            for question_id, text, option_id, scale in unpack(schema, packed):
+                values[columns[question_id]] = formatter.value(question_id, text, option_id, scale)
+            yield [str(uuid), responded_at.isoformat() if responded_at else ''] + values
+        return
+    answers = (
+        survey_answers(schema, since, until)
+        .order_by('invitation_id', 'id')
+        .values_list('invitation_id', 'invitation__uuid', 'invitation__responded_at',
+                     'question_id', 'text', 'option_id', 'scale')
+    )
+    for _, group in groupby(answers.iterator(chunk_size=chunk_size), key=itemgetter(0)):
+        values = [''] * len(columns)
+        for _, uuid, responded_at, question_id, text, option_id, scale in group:
+            if question_id in columns:
+                values[columns[question_id]] = formatter.value(question_id, text, option_id, scale)
+        yield [str(uuid), responded_at.isoformat() if responded_at else ''] + values
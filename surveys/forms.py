@@ -1,16 +1,26 @@
 """Forms for surveys application."""
 from __future__ import annotations
 from decimal import Decimal
-from typing import Any
+from typing import Any, Iterable
 from django import forms
 from django.forms import ModelForm
 from .models import Survey, Question, Option, Answer
+from .invitations import CSV, JSONL, WEB_INVITATION_LIMIT
+from .pagination import decode_cursor
+from .schema import QuestionSpec
 
 
 class SurveyForm(ModelForm):
     class Meta:
         model = Survey
-        fields = ['title', 'description', 'is_published', 'start_date', 'end_date']
+        fields = ['title', 'description', 'is_published', 'start_date', 'end_date', 'questions_per_page']
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.fields['questions_per_page'].required = False
+
+    def clean_questions_per_page(self) -> int:
+        return self.cleaned_data['questions_per_page'] or 0
 
 
 class QuestionForm(ModelForm):
@@ -25,9 +35,27 @@ class OptionForm(ModelForm):
         fields = ['text']
 
 
+class SurveyImportForm(forms.Form):
+    """A definition file; the survey fields are needed for CSV and override JSON."""
+    definition = forms.FileField(label='Definitie (.json of .csv)')
+    title = forms.CharField(label='Titel', max_length=200, required=False)
+    description = forms.CharField(label='Beschrijving', widget=forms.Textarea, required=False)
+    start_date = forms.DateField(label='Startdatum', required=False)
+    end_date = forms.DateField(label='Einddatum', required=False)
+    is_published = forms.BooleanField(label='Publiceren', required=False)
+
+
+class BulkInvitationForm(forms.Form):
+    count = forms.IntegerField(
+        label='Aantal', min_value=1, max_value=WEB_INVITATION_LIMIT,
+        help_text='Gebruik voor grotere campagnes het commando create_invitations.',
+    )
+    format = forms.ChoiceField(label='Formaat', choices=[(CSV, 'CSV'), (JSONL, 'JSON Lines')])
+
+
 class DynamicResponseForm(forms.Form):
-    """Builds fields dynamically for questions."""
-    def __init__(self, *args: Any, questions: list[Question], **kwargs: Any) -> None:
+    """Builds fields dynamically from compiled question specs."""
+    def __init__(self, *args: Any, questions: Iterable[QuestionSpec], **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         for q in questions:
             if q.question_type == Question.OPEN:
@@ -35,12 +63,68 @@ class DynamicResponseForm(forms.Form):
                     label=q.title, widget=forms.Textarea, max_length=2000
                 )
             elif q.question_type == Question.MULTIPLE_CHOICE:
-                choices = [(opt.id, opt.text) for opt in q.options.all()]
                 self.fields[str(q.id)] = forms.ChoiceField(
-                    label=q.title, choices=choices, widget=forms.RadioSelect
+                    label=q.title, choices=q.choices, widget=forms.RadioSelect
                 )
             else:
                 self.fields[str(q.id)] = forms.DecimalField(
                     label=q.title, min_value=Decimal('0'), max_value=Decimal('1'),
                     decimal_places=1, step_size=Decimal('0.1')
                 )
+
+
+class AnswerFilterForm(forms.Form):
+    """Filters for browsing the raw answers of one survey."""
+    question = forms.TypedChoiceField(label='Vraag', coerce=int, required=False, empty_value=None)
+    since = forms.DateTimeField(label='Vanaf', required=False)
+    until = forms.DateTimeField(label='Tot', required=False)
+    after = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args: Any, questions: Iterable[QuestionSpec], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.fields['question'].choices = [('', 'Alle vragen')] + [
+            (q.id, f'{q.number}. {q.title}') for q in questions
+        ]
+
+    def clean_after(self) -> str:
+        after = self.cleaned_data['after']
+        if after:
+            try:
+                decode_cursor(after)
+            except ValueError:
+                raise forms.ValidationError('Ongeldige paginacursor.')
+        return after
+
+
+class AnswerSearchForm(forms.Form):
+    """Full-text search over open answers, optionally within one survey."""
+    q = forms.CharField(label='Zoekterm', max_length=200)
+    survey = forms.ModelChoiceField(label='Enquête', queryset=Survey.objects.all(), required=False, empty_label='Alle enquêtes')
+    question = forms.TypedChoiceField(label='Vraag', coerce=int, required=False, empty_value=None)
+    page = forms.IntegerField(min_value=1, required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args: Any, questions: Iterable[QuestionSpec] = (), **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.fields['question'].choices = [('', 'Alle vragen')] + [
+            (q.id, f'{q.number}. {q.title}') for q in questions if q.question_type == Question.OPEN
+        ]
+
+
+class CrossTabForm(forms.Form):
+    """A multiple-choice question to segment by and the question to report."""
+    segment = forms.TypedChoiceField(label='Uitsplitsen naar', coerce=int)
+    target = forms.TypedChoiceField(label='Vraag', coerce=int)
+
+    def __init__(self, *args: Any, questions: Iterable[QuestionSpec], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        questions = list(questions)
+        self.fields['segment'].choices = [
+            (q.id, f'{q.number}. {q.title}') for q in questions if q.question_type == Question.MULTIPLE_CHOICE
+        ]
+        self.fields['target'].choices = [(q.id, f'{q.number}. {q.title}') for q in questions]
+
+    def clean(self) -> dict[str, Any]:
+        cleaned = super().clean()
+        if cleaned.get('segment') is not None and cleaned.get('segment') == cleaned.get('target'):
+            raise forms.ValidationError('Kies twee verschillende vragen.')
+        return cleaned
@@ -0,0 +1,233 @@
+"""Persistence of respondent submissions."""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable
+from uuid import UUID
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .db import write_transaction
+from .models import Survey, Question, Invitation, Answer, PackedResponse
+from .schema import QuestionSpec, get_schema
+from .storage import pack
+from .tallies import record_answers
+
+OPEN_MAX_LENGTH = 2000
+
+
+@dataclass(frozen=True)
+class Submission:
+    """Validated answers of one respondent, keyed by question id."""
+    invitation_id: int
+    values: dict[str, Any]
+    submitted_at: datetime
+
+
+def clean_values(questions: Iterable[QuestionSpec], raw: dict[str, Any]) -> tuple[dict[str, Any], dict[str, str]]:
+    """Validate raw JSON answers like ``DynamicResponseForm`` does.
+
+    Returns the cleaned values in the form's shape plus the errors per
+    question id; every question is required.
+    """
+    values: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    for q in questions:
+        key = str(q.id)
+        value = raw.get(key)
+        if value is None or value == '':
+            errors[key] = 'Dit veld is verplicht.'
+        elif q.question_type == Question.OPEN:
+            if not isinstance(value, str):
+                errors[key] = 'Tekst verwacht.'
+            elif len(value) > OPEN_MAX_LENGTH:
+                errors[key] = f'Maximaal {OPEN_MAX_LENGTH} tekens.'
+            else:
+                values[key] = value
+        elif q.question_type == Question.MULTIPLE_CHOICE:
+            if str(value) not in {str(option_id) for option_id, _ in q.choices}:
+                errors[key] = 'Ongeldige optie.'
+            else:
+                values[key] = str(value)
+        else:
+            try:
+                scale = Decimal(str(value))
+            except InvalidOperation:
+                scale = None
+            if scale is None or not scale.is_finite() or not 0 <= scale <= 1 or scale * 10 % 1:
+                errors[key] = 'Waarde tussen 0 en 1 in stappen van 0,1.'
+            else:
+                values[key] = scale
+    return values, errors
+
+
+def validate_batch(items: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[Submission]]:
+    """Validate posted responses in bulk.
+
+    Looks up all invitations in one query and returns a result per item
+    (``ok`` results still carry the invitation id) plus the submissions to
+    store. Unknown, archived, already answered and repeated invitations
+    are reported instead of stored.
+    """
+    uuids = [_uuid(item.get('invitation')) for item in items]
+    invitations = {
+        invitation.uuid: invitation
+        for invitation in Invitation.objects.filter(uuid__in={u for u in uuids if u}).select_related('survey')
+    }
+    now = timezone.now()
+    seen = set()
+    results = []
+    submissions = []
+    for item, invitation_uuid in zip(items, uuids):
+        invitation = invitations.get(invitation_uuid)
+        result: dict[str, Any] = {'invitation': item.get('invitation')}
+        results.append(result)
+        if invitation is None:
+            result['status'] = 'unknown'
+            continue
+        if invitation.survey.archived_at is not None:
+            result['status'] = 'closed'
+            continue
+        if invitation.responded_at is not None or invitation.pk in seen:
+            result['status'] = 'duplicate'
+            continue
+        submitted_at = _submitted_at(item.get('submitted_at'), now)
+        if submitted_at is None:
+            result.update(status='invalid', errors={'submitted_at': 'Ongeldig tijdstip.'})
+            continue
+        answers = item.get('answers')
+        values, errors = clean_values(get_schema(invitation.survey).questions, answers if isinstance(answers, dict) else {})
+        if errors:
+            result.update(status='invalid', errors=errors)
+            continue
+        seen.add(invitation.pk)
+        result.update(status='ok', invitation_id=invitation.pk)
+        submissions.append(Submission(invitation.pk, values, submitted_at))
+    return results, submissions
+
+
+def _uuid(value: Any) -> UUID | None:
+    try:
+        return UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _submitted_at(value: Any, now: datetime) -> datetime | None:
+    """Client timestamp of an offline response; ``now`` when absent."""
+    if value is None:
+        return now
+    try:
+        submitted_at = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:
+        return None
+    if submitted_at is not None and timezone.is_naive(submitted_at):
+        submitted_at = timezone.make_aware(submitted_at)
+    if submitted_at is None or submitted_at > now:
+        return None
+    return submitted_at
+
+
+def build_answers(invitation: Invitation, questions: Iterable[QuestionSpec], values: dict[str, Any],
+                  lenient: bool = False) -> list[Answer]:
+    """Turn cleaned form values into unsaved answers for one invitation.
+
+    A question without a usable value raises :class:`ValueError`, unless
+    ``lenient`` is set: deferred submissions whose survey was edited in the
+    meantime then skip that question.
+    """
+    questions = list(questions)
+    options: dict[tuple[int, str], int] = {
+        (q.id, str(option_id)): option_id
+        for q in questions if q.question_type == Question.MULTIPLE_CHOICE
+        for option_id, _ in q.choices
+    }
+    answers = []
+    for q in questions:
+        value = values.get(str(q.id))
+        if value is None:
+            if lenient:
+                continue
+            raise ValueError(f'No value for question {q.id}')
+        if q.question_type == Question.OPEN:
+            answers.append(Answer(invitation=invitation, question_id=q.id, text=value))
+        elif q.question_type == Question.MULTIPLE_CHOICE:
+            option_id = options.get((q.id, str(value)))
+            if option_id is not None:
+                answers.append(Answer(invitation=invitation, question_id=q.id, option_id=option_id))
+            elif not lenient:
+                raise ValueError(f'Unknown option {value!r} for question {q.id}')
+        else:
+            answers.append(Answer(invitation=invitation, question_id=q.id, scale=value))
+    return answers
+
+
+def save_response(invitation: Invitation, questions: Iterable[QuestionSpec], values: dict[str, Any]) -> list[Answer]:
+    """Store a complete submission and mark the invitation as responded.
+
+    All answers go out in a single bulk insert and share one transaction
+    with the tally update and the ``responded_at`` claim, so the query
+    count does not grow with the number of questions. A resubmission of an
+    invitation that already responded stores nothing and returns no answers.
+    """
+    answers = build_answers(invitation, questions, values)
+    invitation.responded_at = timezone.now()
+    with write_transaction():
+        if not _claim(invitation):
+            return []
+        _store_answers([(invitation, answers)])
+        record_answers(answers)
+    return answers
+
+
+def save_submissions(submissions: Iterable[Submission], lenient: bool = False) -> list[int]:
+    """Store many submissions at once and return the invitation ids stored.
+
+    ``lenient`` is passed on to :func:`build_answers`; the spool drain sets
+    it for submissions queued before their survey was edited.
+
+    Each invitation is claimed inside the transaction by setting its
+    ``responded_at`` only where it is still empty, and answers are written
+    for the claimed invitations only. Invitations that already responded,
+    or that a concurrent request claimed first, are skipped, which also
+    makes replaying a batch after a crash harmless. Submissions for surveys
+    archived in the meantime are dropped as well.
+    """
+    pending = {s.invitation_id: s for s in submissions}
+    invitations = list(
+        Invitation.objects.filter(pk__in=list(pending), responded_at__isnull=True, survey__archived_at__isnull=True)
+        .select_related('survey')
+    )
+    if not invitations:
+        return []
+    responses = []
+    for invitation in invitations:
+        submission = pending[invitation.pk]
+        questions = get_schema(invitation.survey).questions
+        responses.append((invitation, build_answers(invitation, questions, submission.values, lenient)))
+        invitation.responded_at = submission.submitted_at
+    with write_transaction():
+        responses = [(invitation, answers) for invitation, answers in responses if _claim(invitation)]
+        _store_answers(responses)
+        record_answers(answer for _, answers in responses for answer in answers)
+    return [invitation.pk for invitation, _ in responses]
+
+
+def _claim(invitation: Invitation) -> bool:
+    """Set ``responded_at`` unless another request already did."""
+    return bool(
+        Invitation.objects.filter(pk=invitation.pk, responded_at__isnull=True).update(responded_at=invitation.responded_at)
+    )
+
+
+def _store_answers(responses: list[tuple[Invitation, list[Answer]]]) -> None:
+    """Insert the answers as rows or packed records, per survey storage."""
+    rows = []
+    packed = []
+    for invitation, answers in responses:
+        if invitation.survey.answer_storage == Survey.PACKED:
+            packed.append(PackedResponse(invitation=invitation, survey_id=invitation.survey_id, answers=pack(answers)))
+        else:
+            rows += answers
+    Answer.objects.bulk_create(rows)
+    PackedResponse.objects.bulk_create(packed)
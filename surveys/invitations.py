@@ -0,0 +1,72 @@
+"""Bulk creation of invitations for large campaigns."""
+from __future__ import annotations
+import csv
+import json
+from typing import Callable, Iterable, Iterator
+from django.urls import reverse
+from .db import write_transaction
+from .export import Echo
+from .models import Survey, Invitation
+
+INVITATION_CHUNK_SIZE = 1000
+# Largest campaign created within a web request; bigger ones go through
+# the create_invitations command.
+WEB_INVITATION_LIMIT = 10_000
+CSV = 'csv'
+JSONL = 'jsonl'
+FORMATS = (CSV, JSONL)
+CONTENT_TYPES = {CSV: 'text/csv', JSONL: 'application/x-ndjson'}
+
+
+def create_invitations(survey: Survey, count: int, chunk_size: int = INVITATION_CHUNK_SIZE) -> list[tuple[int, int]]:
+    """Create ``count`` invitations and return the first and last id of each chunk.
+
+    Every chunk is one bulk insert in its own write transaction, so
+    respondents can submit between chunks instead of waiting for the whole
+    campaign. If a chunk fails, the chunks already committed are deleted
+    again, so the campaign exists completely or not at all before any link
+    is handed out. Only one chunk is alive at a time.
+    """
+    ranges = []
+    try:
+        for start in range(0, count, chunk_size):
+            chunk = [Invitation(survey=survey) for _ in range(min(chunk_size, count - start))]
+            with write_transaction():
+                Invitation.objects.bulk_create(chunk)
+            ranges.append((chunk[0].pk, chunk[-1].pk))
+    except BaseException:
+        with write_transaction():
+            for first, last in ranges:
+                Invitation.objects.filter(survey=survey, id__range=(first, last)).delete()
+        raise
+    return ranges
+
+
+def campaign_chunks(survey: Survey, ranges: Iterable[tuple[int, int]]) -> Iterator[list[Invitation]]:
+    """Read back the invitations created by :func:`create_invitations`, one chunk at a time.
+
+    A chunk is a single insert, so its ids are consecutive and invitations
+    created by others in the meantime fall outside the ranges.
+    """
+    invitations = Invitation.objects.filter(survey=survey).only('id', 'uuid').order_by('id')
+    for first, last in ranges:
+        yield list(invitations.filter(id__range=(first, last)))
+
+
+def respond_link(base_url: str) -> Callable[[Invitation], str]:
+    """Return a link builder that reverses the respond URL only once."""
+    prefix, suffix = reverse('respond', args=['__uuid__']).split('__uuid__')
+    prefix = base_url.rstrip('/') + prefix
+    return lambda invitation: f'{prefix}{invitation.uuid}{suffix}'
+
+
+def invitation_lines(chunks: Iterable[list[Invitation]], link: Callable[[Invitation], str], fmt: str) -> Iterator[str]:
+    """Render invitations as CSV or JSON Lines, one chunk at a time."""
+    if fmt == CSV:
+        writer = csv.writer(Echo())
+        yield writer.writerow(['uuid', 'link'])
+        for chunk in chunks:
+            yield ''.join(writer.writerow([str(inv.uuid), link(inv)]) for inv in chunk)
+    else:
+        for chunk in chunks:
+            yield ''.join(json.dumps({'uuid': str(inv.uuid), 'link': link(inv)}) + '\n' for inv in chunk)
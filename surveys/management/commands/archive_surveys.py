@@ -0,0 +1,40 @@
+"""Move closed surveys to archive files."""
+from __future__ import annotations
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from surveys.archive import ArchiveError, archive_path, archive_survey
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = 'Archive the invitations and answers of surveys that ended more than --days days ago.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Minimum number of days since the end date.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the surveys that would be archived.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days mag niet negatief zijn.')
+        cutoff = timezone.localdate() - timedelta(days=options['days'])
+        surveys = Survey.objects.filter(end_date__lt=cutoff, archived_at__isnull=True).order_by('pk')
+        failed = 0
+        for survey in surveys:
+            if options['dry_run']:
+                self.stdout.write(f'Enquête {survey.pk} ({survey.end_date}) zou gearchiveerd worden.')
+                continue
+            try:
+                footer = archive_survey(survey)
+            except ArchiveError as exc:
+                failed += 1
+                self.stderr.write(f'Enquête {survey.pk} overgeslagen: {exc}')
+                continue
+            size = archive_path(survey.pk).stat().st_size
+            self.stdout.write(
+                f"Enquête {survey.pk}: {footer['invitations']} uitnodigingen en {footer['answers']} antwoorden "
+                f'gearchiveerd ({filesizeformat(size)}).'
+            )
+        if failed:
+            raise CommandError(f'{failed} enquête(s) niet gearchiveerd.')
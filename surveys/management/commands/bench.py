@@ -0,0 +1,110 @@
+"""Drive simulated respondents and result readers and report performance."""
+from __future__ import annotations
+import json
+import platform
+import random
+import time
+import uuid
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from surveys.bench import AsyncLoadDriver, LoadDriver
+from surveys.invitations import campaign_chunks, create_invitations
+from surveys.schema import get_schema
+from surveys.synthetic import create_synthetic_survey, random_values
+
+
+class Command(BaseCommand):
+    help = 'Benchmark respond, results and results_csv with concurrent simulated users (WSGI or ASGI).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=30)
+        parser.add_argument('--options', type=int, default=5, help='Options per multiple-choice question.')
+        parser.add_argument('--respondents', type=int, default=200)
+        parser.add_argument('--invitations', type=int, default=0,
+                            help='Invitations to create in bulk and time (default: one per respondent).')
+        parser.add_argument('--reads', type=int, default=20, help='Requests per results endpoint.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--asgi', action='store_true',
+                            help='Use the ASGI handler and the async views instead of the WSGI path.')
+        parser.add_argument('--json', dest='json_path', help='Write the report as JSON to this file ("-" for stdout).')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic survey afterwards.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        survey = create_synthetic_survey(options['questions'], options['options'], rng, title='Benchmark')
+        user = get_user_model().objects.create_user(f'bench-{uuid.uuid4().hex[:12]}', is_staff=True)
+        try:
+            if options['asgi']:
+                with override_settings(ROOT_URLCONF='surveypro.urls_async',
+                                       ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                    report = self.run(survey, user, options)
+            else:
+                report = self.run(survey, user, options)
+        finally:
+            user.delete()
+            if not options['keep']:
+                survey.delete()
+        self.write_report(report, options['json_path'])
+
+    def run(self, survey, user, options) -> dict:
+        schema = get_schema(survey)
+        count = max(options['invitations'], options['respondents'])
+        started = time.perf_counter()
+        ranges = create_invitations(survey, count)
+        seconds = time.perf_counter() - started
+        invitations = (inv for chunk in campaign_chunks(survey, ranges) for inv in chunk)
+        links = [reverse('respond', args=[inv.uuid]) for inv in islice(invitations, options['respondents'])]
+        # The request lambdas return coroutines when given an AsyncClient.
+        driver = (AsyncLoadDriver if options['asgi'] else LoadDriver)(options['concurrency'], user=user)
+        seed = options['seed']
+        driver.run([
+            [
+                ('respond_get', lambda c, link=link: c.get(link)),
+                ('respond_post', lambda c, link=link, values=random_values(schema, random.Random(seed + i)): c.post(link, values)),
+            ]
+            for i, link in enumerate(links)
+        ])
+        results_url = reverse('results', args=[survey.pk])
+        csv_url = reverse('results_csv', args=[survey.pk])
+        driver.run(
+            [[('results', lambda c: c.get(results_url))] for _ in range(options['reads'])]
+            + [[('results_csv', lambda c: c.get(csv_url))] for _ in range(options['reads'])]
+        )
+        return {
+            'started_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'db_profile': settings.DB_PROFILE,
+            'ingest_mode': settings.SURVEY_INGEST_MODE,
+            'server': 'asgi' if options['asgi'] else 'wsgi',
+            'parameters': {
+                key: options[key] for key in ('questions', 'options', 'respondents', 'invitations', 'reads', 'concurrency', 'seed')
+            },
+            'invitations': {'count': count, 'seconds': round(seconds, 3), 'per_second': round(count / seconds)},
+            'endpoints': driver.report(),
+        }
+
+    def write_report(self, report: dict, json_path: str | None) -> None:
+        if json_path == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if json_path:
+            with open(json_path, 'w') as fh:
+                json.dump(report, fh, indent=2)
+        invitations = report['invitations']
+        self.stdout.write(
+            f"{invitations['count']} uitnodigingen in {invitations['seconds']} s ({invitations['per_second']} per seconde)"
+        )
+        self.stdout.write(f"{'endpoint':<14}{'req':>6}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'SQL':>7}")
+        for name, row in report['endpoints'].items():
+            lat = row['latency_ms']
+            self.stdout.write(
+                f"{name:<14}{row['requests']:>6}{row['errors']:>5}{row['throughput_rps']:>9}"
+                f"{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}{row['queries']['mean']:>7}"
+            )
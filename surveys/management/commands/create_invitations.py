@@ -0,0 +1,43 @@
+"""Create invitations for a survey in bulk."""
+from __future__ import annotations
+import time
+from django.core.management.base import BaseCommand, CommandError
+from surveys.invitations import FORMATS, INVITATION_CHUNK_SIZE, campaign_chunks, create_invitations, invitation_lines, respond_link
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = 'Create invitations in bulk and write their respond links as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey_id', type=int)
+        parser.add_argument('count', type=int)
+        parser.add_argument('--base-url', default='http://localhost:8000', help='Prefix for the respond links.')
+        parser.add_argument('--format', choices=FORMATS, default=FORMATS[0])
+        parser.add_argument('--output', help='File to write to (default: stdout).')
+        parser.add_argument('--chunk-size', type=int, default=INVITATION_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            survey = Survey.objects.get(pk=options['survey_id'])
+        except Survey.DoesNotExist:
+            raise CommandError(f"Enquête {options['survey_id']} bestaat niet.")
+        if survey.archived_at is not None:
+            raise CommandError(f'Enquête {survey.pk} is gearchiveerd.')
+        if options['count'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('Aantal en chunkgrootte moeten positief zijn.')
+        started = time.perf_counter()
+        ranges = create_invitations(survey, options['count'], options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f"{options['count']} uitnodigingen aangemaakt in {elapsed:.2f} s "
+            f"({options['count'] / elapsed:.0f} per seconde)."
+        )
+        chunks = campaign_chunks(survey, ranges)
+        lines = invitation_lines(chunks, respond_link(options['base_url']), options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as out:
+                out.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
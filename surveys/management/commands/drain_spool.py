@@ -0,0 +1,57 @@
+"""Move spooled submissions into the main database."""
+from __future__ import annotations
+import time
+from django.core.management.base import BaseCommand
+from surveys.ingest import save_submissions
+from surveys.spool import get_spool
+
+
+class Command(BaseCommand):
+    help = 'Drain the write-behind submission spool in large batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of stopping when empty.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        spool = get_spool()
+        total = 0
+        while True:
+            batch = spool.peek(options['batch_size'])
+            if not batch:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            # Rows leave the spool only after the main transaction committed;
+            # a crash in between is replayed and deduplicated per invitation.
+            # Submissions may predate edits to their survey, hence lenient.
+            try:
+                stored = save_submissions((submission for _, submission in batch), lenient=True)
+                done = [spool_id for spool_id, _ in batch]
+            except Exception:  # noqa: BLE001 - retried one by one below
+                stored, done = self.save_one_by_one(spool, batch)
+            spool.remove(done)
+            total += len(stored)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{len(stored)} van {len(batch)} inzendingen verwerkt.')
+        self.stdout.write(f'{total} inzendingen verwerkt.')
+
+    def save_one_by_one(self, spool, batch) -> tuple[list[int], list[int]]:
+        """Store the submissions of a failed batch separately.
+
+        Returns the stored invitation ids and the spool ids that are done.
+        A failing submission stays in the spool until it has failed
+        ``MAX_ATTEMPTS`` times and is moved aside.
+        """
+        stored, done = [], []
+        for spool_id, submission in batch:
+            try:
+                stored += save_submissions([submission], lenient=True)
+            except Exception as exc:  # noqa: BLE001 - recorded in the spool
+                if spool.fail(spool_id, repr(exc)):
+                    self.stderr.write(f'Inzending {spool_id} (uitnodiging {submission.invitation_id}) apart gezet: {exc!r}')
+                continue
+            done.append(spool_id)
+        return stored, done
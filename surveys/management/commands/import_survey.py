@@ -0,0 +1,36 @@
+"""Create a survey from a JSON or CSV definition file."""
+from __future__ import annotations
+from pathlib import Path
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from surveys.definitions import import_survey, parse_definition
+
+
+class Command(BaseCommand):
+    help = 'Import a survey with its questions and options from a JSON or CSV definition.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='A .json definition, or a .csv file with one question per row.')
+        parser.add_argument('--title')
+        parser.add_argument('--description')
+        parser.add_argument('--start-date', help='YYYY-MM-DD')
+        parser.add_argument('--end-date', help='YYYY-MM-DD')
+        parser.add_argument('--publish', action='store_true', default=None, help='Publish the survey right away.')
+        parser.add_argument('--questions-per-page', type=int)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        try:
+            content = path.read_text(encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(f'Kan {path} niet lezen: {exc}')
+        overrides = {
+            'title': options['title'], 'description': options['description'],
+            'start_date': options['start_date'], 'end_date': options['end_date'],
+            'is_published': options['publish'], 'questions_per_page': options['questions_per_page'],
+        }
+        try:
+            survey = import_survey(parse_definition(path.name, content, overrides))
+        except ValidationError as exc:
+            raise CommandError('\n'.join(exc.messages))
+        self.stdout.write(f'Enquête {survey.pk} "{survey.title}" aangemaakt met {survey.questions.count()} vragen.')
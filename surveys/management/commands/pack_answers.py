@@ -0,0 +1,40 @@
+"""Convert surveys to compact per-respondent answer storage."""
+from __future__ import annotations
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+from surveys.models import Survey, Answer, PackedResponse
+from surveys.storage import PACK_BATCH_SIZE, pack_survey, table_sizes
+
+
+class Command(BaseCommand):
+    help = 'Move the answer rows of surveys into one packed record per respondent and report the space saved.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey_ids', nargs='+', type=int, help='Surveys to convert.')
+        parser.add_argument('--batch-size', type=int, default=PACK_BATCH_SIZE, help='Respondents per insert.')
+
+    def handle(self, *args, **options):
+        surveys = list(Survey.objects.filter(pk__in=options['survey_ids']).order_by('pk'))
+        missing = set(options['survey_ids']) - {survey.pk for survey in surveys}
+        if missing:
+            raise CommandError(f'Onbekende enquête(s): {", ".join(map(str, sorted(missing)))}')
+        before = table_sizes(Answer, PackedResponse)
+        for survey in surveys:
+            if survey.archived_at is not None:
+                self.stdout.write(f'Enquête {survey.pk}: gearchiveerd, zet haar eerst terug met restore_survey.')
+                continue
+            if survey.answer_storage == Survey.PACKED:
+                self.stdout.write(f'Enquête {survey.pk}: al compact opgeslagen.')
+                continue
+            rows, responses = pack_survey(survey, options['batch_size'])
+            self.stdout.write(f'Enquête {survey.pk}: {rows} antwoorden -> {responses} respondenten.')
+        after = table_sizes(Answer, PackedResponse)
+        if before is None or after is None:
+            self.stdout.write('Ruimtegebruik onbekend: dbstat is niet beschikbaar.')
+            return
+        old, new = sum(before.values()), sum(after.values())
+        self.stdout.write(
+            f'Tabellen en indexen: {filesizeformat(old)} -> {filesizeformat(new)} '
+            f'({filesizeformat(max(old - new, 0))} bespaard). '
+            'Draai VACUUM om vrijgekomen pagina\'s aan het bestandssysteem terug te geven.'
+        )
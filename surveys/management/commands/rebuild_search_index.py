@@ -0,0 +1,11 @@
+"""Rebuild the full-text index over open answers."""
+from __future__ import annotations
+from django.core.management.base import BaseCommand
+from surveys.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Repopulate the FTS5 search index from the open answers.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{rebuild_index()} open antwoorden geïndexeerd.')
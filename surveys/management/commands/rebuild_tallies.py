@@ -0,0 +1,32 @@
+"""Rebuild result tallies from the raw answers."""
+from __future__ import annotations
+from django.core.management.base import BaseCommand, CommandError
+from surveys.models import Survey
+from surveys.tallies import Tallies, rebuild_tallies
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-question tallies from the answers and report any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey_ids', nargs='*', type=int, help='Surveys to process (default: all).')
+        parser.add_argument('--check', action='store_true', help='Only compare, do not rewrite the tallies.')
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.order_by('pk')
+        if options['survey_ids']:
+            surveys = surveys.filter(pk__in=options['survey_ids'])
+        drifted = 0
+        for survey in surveys:
+            if options['check']:
+                problems = Tallies.from_database(survey).diff(Tallies.from_stored(survey))
+            else:
+                problems = rebuild_tallies(survey)
+            if problems:
+                drifted += 1
+                self.stdout.write(f'Enquête {survey.pk}: {len(problems)} afwijking(en)')
+                for problem in problems:
+                    self.stdout.write(f'  {problem}')
+        if options['check'] and drifted:
+            raise CommandError(f'{drifted} enquête(s) met afwijkende tellingen.')
+        self.stdout.write('Tellingen gecontroleerd.' if options['check'] else 'Tellingen opnieuw opgebouwd.')
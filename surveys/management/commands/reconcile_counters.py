@@ -0,0 +1,32 @@
+"""Repair the question, invitation and response counters of surveys."""
+from __future__ import annotations
+from django.core.management.base import BaseCommand, CommandError
+from surveys.counters import counter_drift, reconcile_counters
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = 'Recount questions, invitations and responses per survey and repair drifted counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey_ids', nargs='*', type=int, help='Surveys to process (default: all).')
+        parser.add_argument('--check', action='store_true', help='Only compare, do not repair the counters.')
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.order_by('pk')
+        if options['survey_ids']:
+            surveys = surveys.filter(pk__in=options['survey_ids'])
+        drifted = 0
+        for survey in surveys:
+            drift = counter_drift(survey)
+            if not drift:
+                continue
+            drifted += 1
+            self.stdout.write(f'Enquête {survey.pk}: ' + ', '.join(
+                f'{name} {stored} != {expected}' for name, (stored, expected) in drift.items()
+            ))
+            if not options['check']:
+                reconcile_counters(survey)
+        if options['check'] and drifted:
+            raise CommandError(f'{drifted} enquête(s) met afwijkende tellers.')
+        self.stdout.write('Tellers gecontroleerd.' if options['check'] else f'{drifted} enquête(s) hersteld.')
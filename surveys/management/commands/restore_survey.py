@@ -0,0 +1,23 @@
+"""Bring archived surveys back into the database."""
+from __future__ import annotations
+from django.core.management.base import BaseCommand, CommandError
+from surveys.archive import restore_survey
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = 'Restore the invitations and answers of archived surveys and remove their archive files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey_ids', nargs='+', type=int, help='Surveys to restore.')
+
+    def handle(self, *args, **options):
+        for survey_id in options['survey_ids']:
+            try:
+                survey = Survey.objects.get(pk=survey_id, archived_at__isnull=False)
+            except Survey.DoesNotExist:
+                raise CommandError(f'Enquête {survey_id} bestaat niet of is niet gearchiveerd.')
+            footer = restore_survey(survey)
+            self.stdout.write(
+                f"Enquête {survey_id}: {footer['invitations']} uitnodigingen en {footer['answers']} antwoorden teruggezet."
+            )
@@ -1,14 +1,30 @@
 """Seed database with demo survey and questions."""
 from __future__ import annotations
+import random
+import time
 from datetime import date
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from surveys.models import Survey, Question, Option
+from surveys.synthetic import create_synthetic_survey, generate_responses
 
 
 class Command(BaseCommand):
-    help = 'Create demo survey with questions.'
+    help = 'Create demo survey with questions, or with --synthetic a large generated data set.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', action='store_true', help='Generate synthetic surveys with responses.')
+        parser.add_argument('--surveys', type=int, default=1)
+        parser.add_argument('--questions', type=int, default=40)
+        parser.add_argument('--options', type=int, default=5, help='Options per multiple-choice question.')
+        parser.add_argument('--invitations', type=int, default=10000, help='Invitations per survey.')
+        parser.add_argument('--response-rate', type=float, default=0.6)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Invitations per bulk insert transaction.')
 
     def handle(self, *args, **options):
+        if options['synthetic']:
+            self.generate(options)
+            return
         if Survey.objects.exists():
             self.stdout.write('Data already exists.')
             return
@@ -24,3 +40,28 @@ class Command(BaseCommand):
         for i in range(8, 11):
             Question.objects.create(survey=survey, number=i, title=f'Schaal {i}', text='Geef een waarde', question_type=Question.SCALE)
         self.stdout.write('Demo data aangemaakt.')
+
+    def generate(self, options) -> None:
+        if not 0 <= options['response_rate'] <= 1:
+            raise CommandError('--response-rate moet tussen 0 en 1 liggen.')
+        if min(options['surveys'], options['questions'], options['options'], options['chunk_size']) < 1:
+            raise CommandError('Aantallen moeten positief zijn.')
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        rows = 0
+        for n in range(1, options['surveys'] + 1):
+            survey = create_synthetic_survey(
+                options['questions'], options['options'], rng, title=f'Synthetische enquête {n}'
+            )
+            progress = generate_responses(
+                survey, options['invitations'], options['response_rate'], rng, options['chunk_size']
+            )
+            for invitations, answers in progress:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'Enquête {survey.pk}: {invitations}/{options["invitations"]} uitnodigingen, '
+                    f'{answers} antwoorden ({(rows + invitations + answers) / elapsed:.0f} rijen/s)'
+                )
+            rows += invitations + answers
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{rows} rijen aangemaakt in {elapsed:.1f} s ({rows / elapsed:.0f} rijen/s).')
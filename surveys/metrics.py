@@ -0,0 +1,115 @@
+"""In-process request metrics exposed in the Prometheus text format."""
+from __future__ import annotations
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts[i]`` holds observations <= ``buckets[i]``."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total, rows = 0, []
+        for bound, n in zip([*map(_format, self.buckets), '+Inf'], self.counts):
+            total += n
+            rows.append((bound, total))
+        return rows
+
+
+@dataclass
+class ViewMetrics:
+    latency: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    queries: Histogram = field(default_factory=lambda: Histogram(QUERY_BUCKETS))
+    sql_time: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+
+
+METRICS = (
+    ('surveypro_request_latency_seconds', 'latency', 'Request latency per URL name.'),
+    ('surveypro_request_sql_queries', 'queries', 'SQL queries per request per URL name.'),
+    ('surveypro_request_sql_seconds', 'sql_time', 'Time spent in SQL per request per URL name.'),
+)
+
+
+class MetricsRegistry:
+    """Thread-safe store of per-view histograms for this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._views: dict[str, ViewMetrics] = {}
+
+    def record(self, view: str, latency: float, queries: int, sql_time: float) -> None:
+        with self._lock:
+            metrics = self._views.setdefault(view, ViewMetrics())
+            metrics.latency.observe(latency)
+            metrics.queries.observe(queries)
+            metrics.sql_time.observe(sql_time)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, attr, help_text in METRICS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, metrics in sorted(self._views.items()):
+                    histogram = getattr(metrics, attr)
+                    label = _escape(view)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{view="{label}",le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{view="{label}"}} {_format(histogram.sum)}')
+                    lines.append(f'{name}_count{{view="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and the time spent in them."""
+
+    def __init__(self, keep_sql: bool = False) -> None:
+        self.count = 0
+        self.time = 0.0
+        self.keep_sql = keep_sql
+        self.statements: Counter[str] = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+            if self.keep_sql:
+                self.statements[sql] += 1
+
+    def duplicates(self) -> list[tuple[str, int]]:
+        """SQL statements that ran more than once, most repeated first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n > 1]
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
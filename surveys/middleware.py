@@ -0,0 +1,128 @@
+"""Request instrumentation middleware."""
+from __future__ import annotations
+import json
+import logging
+import time
+from contextlib import ExitStack
+from typing import AsyncIterator, Callable, Iterator
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+from .metrics import QueryRecorder, registry
+
+logger = logging.getLogger('surveys.metrics')
+
+DEBUG_HEADER = 'X-Debug-Queries'
+REPORT_LIMIT = 5
+REPORT_SQL_LENGTH = 300
+
+
+class MetricsMiddleware:
+    """Record latency, query count and SQL time per URL name.
+
+    Staff users, and only they, whatever DEBUG says, can send
+    ``X-Debug-Queries: 1`` to get the query count and the most duplicated
+    statements of that request in response headers; the full report goes
+    to the ``surveys.metrics`` logger. For streaming responses the measurement ends when the body is
+    exhausted, and the headers only cover the work done before streaming.
+
+    Under ASGI the query wrapper is installed through ``sync_to_async``, on
+    the thread that runs the database work of the request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(keep_sql=DEBUG_HEADER in request.headers)
+        started = time.perf_counter()
+        instrumented = ExitStack()
+        with instrumented:
+            instrumented.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+            if recorder.keep_sql and _may_debug(request):
+                self._add_report(request, response, recorder)
+            if response.streaming:
+                # Keep counting until the body has been sent.
+                response.streaming_content = self._finish_after(
+                    response.streaming_content, request, recorder, started, instrumented.pop_all()
+                )
+                return response
+        self._record(request, recorder, started)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        recorder = QueryRecorder(keep_sql=DEBUG_HEADER in request.headers)
+        started = time.perf_counter()
+        instrumented = ExitStack()
+        await sync_to_async(lambda: instrumented.enter_context(connection.execute_wrapper(recorder)))()
+        try:
+            response = await self.get_response(request)
+            if recorder.keep_sql and await _amay_debug(request):
+                self._add_report(request, response, recorder)
+        except BaseException:
+            await sync_to_async(instrumented.close)()
+            raise
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._afinish_after(
+                    response.streaming_content, request, recorder, started, instrumented
+                )
+            else:
+                # Django iterates sync bodies on the same thread as the view.
+                response.streaming_content = self._finish_after(
+                    response.streaming_content, request, recorder, started, instrumented
+                )
+            return response
+        await sync_to_async(instrumented.close)()
+        self._record(request, recorder, started)
+        return response
+
+    def _finish_after(self, content: Iterator, request: HttpRequest, recorder: QueryRecorder,
+                      started: float, instrumented: ExitStack) -> Iterator:
+        with instrumented:
+            yield from content
+        self._record(request, recorder, started)
+
+    async def _afinish_after(self, content: AsyncIterator, request: HttpRequest, recorder: QueryRecorder,
+                             started: float, instrumented: ExitStack) -> AsyncIterator:
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            await sync_to_async(instrumented.close)()
+        self._record(request, recorder, started)
+
+    def _record(self, request: HttpRequest, recorder: QueryRecorder, started: float) -> None:
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        registry.record(view, time.perf_counter() - started, recorder.count, recorder.time)
+
+    def _add_report(self, request: HttpRequest, response: HttpResponse, recorder: QueryRecorder) -> None:
+        duplicates = recorder.duplicates()
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-Query-Time-Ms'] = f'{recorder.time * 1000:.2f}'
+        response['X-Duplicate-Queries'] = json.dumps(
+            [{'sql': sql[:REPORT_SQL_LENGTH], 'count': n} for sql, n in duplicates[:REPORT_LIMIT]]
+        )
+        logger.info(
+            'Duplicated queries for %s %s:\n%s', request.method, request.path,
+            '\n'.join(f'{n}x {sql}' for sql, n in duplicates) or '(none)',
+        )
+
+
+def _may_debug(request: HttpRequest) -> bool:
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_staff)
+
+
+async def _amay_debug(request: HttpRequest) -> bool:
+    auser = getattr(request, 'auser', None)
+    user = await auser() if auser else None
+    return bool(user and user.is_staff)
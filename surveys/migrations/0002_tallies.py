@@ -0,0 +1,39 @@
+"""Incrementally maintained per-question result tallies."""
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionTally',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tally', serialize=False, to='surveys.question')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('total_squares', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='survey',
+            options={'ordering': ['-start_date'], 'verbose_name': 'Enquête', 'verbose_name_plural': 'Enquêtes'},
+        ),
+        migrations.CreateModel(
+            name='TallyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tally_buckets', to='surveys.question')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tallybucket',
+            constraint=models.UniqueConstraint(fields=('question', 'bucket'), name='unique_tally_bucket'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+"""Composite indexes for keyset pagination of answers."""
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0002_tallies'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['created_at', 'id'], name='answer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'created_at', 'id'], name='answer_question_created_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+"""Compact per-respondent answer storage."""
+import django.db.models.deletion
+import django.utils.timezone
+import surveys.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0003_answer_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='answer_storage',
+            field=models.CharField(choices=[('rows', 'Rij per antwoord'), ('packed', 'Compact per respondent')], default='rows', editable=False, max_length=10),
+        ),
+        migrations.CreateModel(
+            name='PackedResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(encoder=surveys.models.CompactJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('invitation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='packed_response', to='surveys.invitation')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='packed_responses', to='surveys.survey')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['survey', 'created_at', 'id'], name='packed_survey_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+"""FTS5 index over open answers, kept in sync by triggers."""
+from django.db import migrations
+
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE surveys_answer_fts USING fts5(
+        text, content='surveys_answer', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER surveys_answer_fts_insert AFTER INSERT ON surveys_answer
+    WHEN new.text != '' BEGIN
+        INSERT INTO surveys_answer_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_answer_fts_delete AFTER DELETE ON surveys_answer
+    WHEN old.text != '' BEGIN
+        INSERT INTO surveys_answer_fts(surveys_answer_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_answer_fts_update AFTER UPDATE OF text ON surveys_answer BEGIN
+        INSERT INTO surveys_answer_fts(surveys_answer_fts, rowid, text)
+            SELECT 'delete', old.id, old.text WHERE old.text != '';
+        INSERT INTO surveys_answer_fts(rowid, text)
+            SELECT new.id, new.text WHERE new.text != '';
+    END
+    """,
+    "INSERT INTO surveys_answer_fts(rowid, text) SELECT id, text FROM surveys_answer WHERE text != ''",
+]
+
+DROP = [
+    'DROP TRIGGER surveys_answer_fts_update',
+    'DROP TRIGGER surveys_answer_fts_delete',
+    'DROP TRIGGER surveys_answer_fts_insert',
+    'DROP TABLE surveys_answer_fts',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_survey_archive'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE, reverse_sql=DROP),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:04
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0006_answer_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='questions_per_page',
+            field=models.PositiveSmallIntegerField(default=0, help_text='0 = alle vragen op één pagina.', verbose_name='Vragen per pagina'),
+        ),
+        migrations.CreateModel(
+            name='PartialResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.PositiveSmallIntegerField(default=0)),
+                ('values', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('invitation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='partial_response', to='surveys.invitation')),
+            ],
+        ),
+    ]
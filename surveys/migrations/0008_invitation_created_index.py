@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0007_paged_responses'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invitation',
+            index=models.Index(fields=['created_at', 'id'], name='invitation_created_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+"""Per-survey counters, kept up to date by triggers.
+
+Invitations of archived surveys are deleted and restored without touching
+the counters, so those keep showing the archived totals.
+"""
+from django.db import migrations, models
+
+CREATE = [
+    """
+    CREATE TRIGGER surveys_question_count_insert AFTER INSERT ON surveys_question BEGIN
+        UPDATE surveys_survey SET question_count = question_count + 1 WHERE id = new.survey_id;
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_question_count_delete AFTER DELETE ON surveys_question BEGIN
+        UPDATE surveys_survey SET question_count = max(question_count - 1, 0) WHERE id = old.survey_id;
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_invitation_count_insert AFTER INSERT ON surveys_invitation BEGIN
+        UPDATE surveys_survey SET
+            invitation_count = invitation_count + 1,
+            response_count = response_count + (new.responded_at IS NOT NULL)
+        WHERE id = new.survey_id AND archived_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_invitation_count_delete AFTER DELETE ON surveys_invitation BEGIN
+        UPDATE surveys_survey SET
+            invitation_count = max(invitation_count - 1, 0),
+            response_count = max(response_count - (old.responded_at IS NOT NULL), 0)
+        WHERE id = old.survey_id AND archived_at IS NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_invitation_count_update AFTER UPDATE OF responded_at ON surveys_invitation
+    WHEN (old.responded_at IS NULL) != (new.responded_at IS NULL) BEGIN
+        UPDATE surveys_survey SET
+            response_count = max(response_count + (new.responded_at IS NOT NULL) - (old.responded_at IS NOT NULL), 0)
+        WHERE id = new.survey_id AND archived_at IS NULL;
+    END
+    """,
+]
+
+BACKFILL = [
+    """
+    UPDATE surveys_survey SET
+        question_count = (SELECT COUNT(*) FROM surveys_question WHERE survey_id = surveys_survey.id),
+        invitation_count = (SELECT COUNT(*) FROM surveys_invitation WHERE survey_id = surveys_survey.id),
+        response_count = (
+            SELECT COUNT(*) FROM surveys_invitation
+            WHERE survey_id = surveys_survey.id AND responded_at IS NOT NULL
+        )
+    """,
+]
+
+DROP = [
+    'DROP TRIGGER surveys_invitation_count_update',
+    'DROP TRIGGER surveys_invitation_count_delete',
+    'DROP TRIGGER surveys_invitation_count_insert',
+    'DROP TRIGGER surveys_question_count_delete',
+    'DROP TRIGGER surveys_question_count_insert',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0008_invitation_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='invitation_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Uitnodigingen'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Vragen'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='response_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Reacties'),
+        ),
+        migrations.RunSQL(CREATE + BACKFILL, reverse_sql=DROP),
+    ]
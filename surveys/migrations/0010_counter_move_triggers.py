@@ -0,0 +1,44 @@
+"""Keep the survey counters right when a question or invitation moves to another survey."""
+from django.db import migrations
+
+CREATE = [
+    """
+    CREATE TRIGGER surveys_question_count_move AFTER UPDATE OF survey_id ON surveys_question
+    WHEN old.survey_id != new.survey_id BEGIN
+        UPDATE surveys_survey SET question_count = max(question_count - 1, 0) WHERE id = old.survey_id;
+        UPDATE surveys_survey SET question_count = question_count + 1 WHERE id = new.survey_id;
+    END
+    """,
+    # Moves the invitation with its old response state; a responded_at change
+    # in the same statement is applied to the new survey by
+    # surveys_invitation_count_update.
+    """
+    CREATE TRIGGER surveys_invitation_count_move AFTER UPDATE OF survey_id ON surveys_invitation
+    WHEN old.survey_id != new.survey_id BEGIN
+        UPDATE surveys_survey SET
+            invitation_count = max(invitation_count - 1, 0),
+            response_count = max(response_count - (old.responded_at IS NOT NULL), 0)
+        WHERE id = old.survey_id AND archived_at IS NULL;
+        UPDATE surveys_survey SET
+            invitation_count = invitation_count + 1,
+            response_count = response_count + (old.responded_at IS NOT NULL)
+        WHERE id = new.survey_id AND archived_at IS NULL;
+    END
+    """,
+]
+
+DROP = [
+    'DROP TRIGGER surveys_invitation_count_move',
+    'DROP TRIGGER surveys_question_count_move',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0009_survey_counters'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE, reverse_sql=DROP),
+    ]
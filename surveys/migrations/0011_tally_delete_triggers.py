@@ -0,0 +1,67 @@
+"""Take deleted answers out of the result tallies.
+
+Answer rows are subtracted exactly. Packed answers cannot be decoded in
+SQL, so deleting one only marks the tallies of its survey as stale until
+rebuild_tallies runs. Deletes by archiving or by pack_answers are skipped,
+since the tallies stay valid for those.
+
+Adding a column with a default makes SQLite rebuild surveys_survey, which
+fails while triggers on other tables refer to it; the counter triggers are
+therefore dropped around the AddField and created again.
+"""
+from importlib import import_module
+from django.db import migrations, models
+
+counters = import_module('surveys.migrations.0009_survey_counters')
+counter_moves = import_module('surveys.migrations.0010_counter_move_triggers')
+SURVEY_TRIGGERS = counters.CREATE + counter_moves.CREATE
+SURVEY_TRIGGERS_DROP = counter_moves.DROP + counters.DROP
+
+SCALE_TENTHS = 'CAST(round(old.scale * 10) AS INTEGER)'
+
+CREATE = [
+    f"""
+    CREATE TRIGGER surveys_answer_tally_delete AFTER DELETE ON surveys_answer
+    WHEN EXISTS (
+        SELECT 1 FROM surveys_question q JOIN surveys_survey s ON s.id = q.survey_id
+        WHERE q.id = old.question_id AND s.archived_at IS NULL AND s.answer_storage = 'rows'
+    ) BEGIN
+        UPDATE surveys_questiontally SET
+            count = max(count - 1, 0),
+            total = total - coalesce({SCALE_TENTHS}, 0),
+            total_squares = total_squares - coalesce({SCALE_TENTHS} * {SCALE_TENTHS}, 0)
+        WHERE question_id = old.question_id;
+        UPDATE surveys_tallybucket SET count = max(count - 1, 0)
+        WHERE question_id = old.question_id AND bucket = coalesce(old.option_id, {SCALE_TENTHS});
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_packedresponse_tally_delete AFTER DELETE ON surveys_packedresponse BEGIN
+        UPDATE surveys_survey SET tallies_stale = 1
+        WHERE id = old.survey_id AND archived_at IS NULL AND answer_storage = 'packed';
+    END
+    """,
+]
+
+DROP = [
+    'DROP TRIGGER surveys_packedresponse_tally_delete',
+    'DROP TRIGGER surveys_answer_tally_delete',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0010_counter_move_triggers'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SURVEY_TRIGGERS_DROP, reverse_sql=SURVEY_TRIGGERS),
+        migrations.AddField(
+            model_name='survey',
+            name='tallies_stale',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunSQL(SURVEY_TRIGGERS, reverse_sql=SURVEY_TRIGGERS_DROP),
+        migrations.RunSQL(CREATE, reverse_sql=DROP),
+    ]
@@ -0,0 +1,53 @@
+"""Count deleted answers per survey, so cached respondent sets can notice them.
+
+Deletes by archiving or by pack_answers are not counted; both already drop
+the cached sets when they change the survey. The survey triggers are
+dropped around the AddField for the reason given in 0011.
+"""
+from importlib import import_module
+from django.db import migrations, models
+
+counters = import_module('surveys.migrations.0009_survey_counters')
+counter_moves = import_module('surveys.migrations.0010_counter_move_triggers')
+tally_deletes = import_module('surveys.migrations.0011_tally_delete_triggers')
+SURVEY_TRIGGERS = counters.CREATE + counter_moves.CREATE + tally_deletes.CREATE
+SURVEY_TRIGGERS_DROP = tally_deletes.DROP + counter_moves.DROP + counters.DROP
+
+CREATE = [
+    """
+    CREATE TRIGGER surveys_answer_deletions AFTER DELETE ON surveys_answer BEGIN
+        UPDATE surveys_survey SET answer_deletions = answer_deletions + 1
+        WHERE id = (SELECT survey_id FROM surveys_question WHERE id = old.question_id)
+            AND archived_at IS NULL AND answer_storage = 'rows';
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_packedresponse_deletions AFTER DELETE ON surveys_packedresponse BEGIN
+        UPDATE surveys_survey SET answer_deletions = answer_deletions + 1
+        WHERE id = old.survey_id AND archived_at IS NULL AND answer_storage = 'packed';
+    END
+    """,
+]
+
+DROP = [
+    'DROP TRIGGER surveys_packedresponse_deletions',
+    'DROP TRIGGER surveys_answer_deletions',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0011_tally_delete_triggers'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SURVEY_TRIGGERS_DROP, reverse_sql=SURVEY_TRIGGERS),
+        migrations.AddField(
+            model_name='survey',
+            name='answer_deletions',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(SURVEY_TRIGGERS, reverse_sql=SURVEY_TRIGGERS_DROP),
+        migrations.RunSQL(CREATE, reverse_sql=DROP),
+    ]
@@ -0,0 +1,39 @@
+"""Count edited answers in ``Survey.answer_deletions`` as well.
+
+An edit replaces an answer below the export and respondent-set watermarks
+just like a delete does, so both have to invalidate what was built from
+the old value. No column is added, so the survey triggers can stay.
+"""
+from django.db import migrations
+
+CREATE = [
+    """
+    CREATE TRIGGER surveys_answer_edits AFTER UPDATE ON surveys_answer BEGIN
+        UPDATE surveys_survey SET answer_deletions = answer_deletions + 1
+        WHERE id IN (SELECT survey_id FROM surveys_question WHERE id IN (old.question_id, new.question_id))
+            AND archived_at IS NULL AND answer_storage = 'rows';
+    END
+    """,
+    """
+    CREATE TRIGGER surveys_packedresponse_edits AFTER UPDATE ON surveys_packedresponse BEGIN
+        UPDATE surveys_survey SET answer_deletions = answer_deletions + 1
+        WHERE id IN (old.survey_id, new.survey_id) AND archived_at IS NULL AND answer_storage = 'packed';
+    END
+    """,
+]
+
+DROP = [
+    'DROP TRIGGER surveys_packedresponse_edits',
+    'DROP TRIGGER surveys_answer_edits',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0012_answer_deletions'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE, reverse_sql=DROP),
+    ]
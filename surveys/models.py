@@ -3,16 +3,45 @@ from __future__ import annotations
 import uuid
 from decimal import Decimal
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 
 class Survey(models.Model):
     """Survey definition."""
+    ROWS = 'rows'
+    PACKED = 'packed'
+    ANSWER_STORAGE = [
+        (ROWS, 'Rij per antwoord'),
+        (PACKED, 'Compact per respondent'),
+    ]
+    MIN_PUBLISHED_QUESTIONS = 10
+    COUNTERS = ('question_count', 'invitation_count', 'response_count')
+    # Columns written by database triggers only.
+    TRIGGER_FIELDS = (*COUNTERS, 'tallies_stale', 'answer_deletions')
+
     title = models.CharField(max_length=200)
     description = models.TextField()
     is_published = models.BooleanField(default=False)
     start_date = models.DateField()
     end_date = models.DateField()
+    # Changed only by the pack_answers command, which converts stored answers.
+    answer_storage = models.CharField(max_length=10, choices=ANSWER_STORAGE, default=ROWS, editable=False)
+    # Set while the invitations and answers live in an archive file.
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False)
+    questions_per_page = models.PositiveSmallIntegerField(
+        'Vragen per pagina', default=0, help_text='0 = alle vragen op één pagina.'
+    )
+    # Maintained by database triggers (migration 0009); see surveys/counters.py.
+    question_count = models.PositiveIntegerField('Vragen', default=0, editable=False)
+    invitation_count = models.PositiveIntegerField('Uitnodigingen', default=0, editable=False)
+    response_count = models.PositiveIntegerField('Reacties', default=0, editable=False)
+    # Set by a trigger when packed answers are deleted; cleared by rebuild_tallies.
+    tallies_stale = models.BooleanField(default=False, editable=False)
+    # Bumped by triggers for every deleted or edited answer; cached respondent sets and
+    # export ETags built before no longer match.
+    answer_deletions = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-start_date']
@@ -22,11 +51,35 @@ class Survey(models.Model):
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs) -> None:
+        # Never write back trigger columns that may have changed since this instance was loaded.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TRIGGER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def clean(self) -> None:
+        if self.pk:
+            # Questions may have been added since this instance was loaded.
+            self.refresh_from_db(fields=['question_count'])
+        self.validate_definition(self.question_count)
+
+    @property
+    def response_rate(self) -> float | None:
+        """Responses as a percentage of the invitations."""
+        return round(100 * self.response_count / self.invitation_count, 1) if self.invitation_count else None
+
+    def validate_definition(self, question_count: int) -> None:
+        """The rules of :meth:`clean` for a survey with ``question_count`` questions.
+
+        Also checks unsaved surveys before an import or clone writes them.
+        """
         if self.end_date < self.start_date:
             raise ValidationError('Einddatum moet groter of gelijk zijn aan startdatum.')
-        if self.is_published and self.questions.count() < 10:
-            raise ValidationError('Enquête moet minimaal 10 vragen hebben voor publicatie.')
+        if self.is_published and question_count < self.MIN_PUBLISHED_QUESTIONS:
+            raise ValidationError(f'Enquête moet minimaal {self.MIN_PUBLISHED_QUESTIONS} vragen hebben voor publicatie.')
 
 
 class Question(models.Model):
@@ -68,9 +121,16 @@ class Invitation(models.Model):
     """Unique link for survey participation."""
     survey = models.ForeignKey(Survey, related_name='invitations', on_delete=models.CASCADE)
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Defaults rather than auto_now_add, so restored rows keep their timestamps.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     responded_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Date filter of the admin changelist.
+            models.Index(fields=['created_at', 'id'], name='invitation_created_idx'),
+        ]
+
     def __str__(self) -> str:
         return str(self.uuid)
 
@@ -82,7 +142,14 @@ class Answer(models.Model):
     text = models.CharField(max_length=2000, blank=True)
     option = models.ForeignKey(Option, null=True, blank=True, on_delete=models.SET_NULL)
     scale = models.DecimalField(max_digits=2, decimal_places=1, null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination over (created_at, id), optionally per question.
+            models.Index(fields=['created_at', 'id'], name='answer_created_idx'),
+            models.Index(fields=['question', 'created_at', 'id'], name='answer_question_created_idx'),
+        ]
 
     def clean(self) -> None:
         qt = self.question.question_type
@@ -98,3 +165,89 @@ class Answer(models.Model):
 
     def __str__(self) -> str:
         return f"{self.question}"
+
+
+class CompactJSONEncoder(DjangoJSONEncoder):
+    """JSON without the optional whitespace after separators."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        kwargs['separators'] = (',', ':')
+        super().__init__(*args, **kwargs)
+
+
+class PackedResponse(models.Model):
+    """All answers of one respondent in a single row, for ``packed`` surveys.
+
+    ``answers`` maps the question id to the text (``open``), the option id
+    (``mc``) or the scale value in tenths (``scale``).
+    """
+    invitation = models.OneToOneField(Invitation, related_name='packed_response', on_delete=models.CASCADE)
+    survey = models.ForeignKey(Survey, related_name='packed_responses', on_delete=models.CASCADE)
+    answers = models.JSONField(encoder=CompactJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['survey', 'created_at', 'id'], name='packed_survey_created_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return str(self.invitation)
+
+
+class PartialResponse(models.Model):
+    """Progress of a respondent through a paged survey.
+
+    ``values`` holds the cleaned answers of the completed pages, keyed by
+    question id like the form data; ``page`` is the page to show next.
+    """
+    invitation = models.OneToOneField(Invitation, related_name='partial_response', on_delete=models.CASCADE)
+    page = models.PositiveSmallIntegerField(default=0)
+    values = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return str(self.invitation)
+
+
+class QuestionTally(models.Model):
+    """Running aggregate of the answers given to one question.
+
+    Scale values are kept in tenths (and their squares in hundredths) so the
+    sums stay exact integers.
+    """
+    question = models.OneToOneField(Question, related_name='tally', on_delete=models.CASCADE, primary_key=True)
+    count = models.PositiveIntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+    total_squares = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.question_id}: {self.count}"
+
+    @property
+    def mean(self) -> float | None:
+        if not self.count:
+            return None
+        return self.total / self.count / 10
+
+    @property
+    def stddev(self) -> float | None:
+        if not self.count:
+            return None
+        variance = self.total_squares / self.count / 100 - self.mean ** 2
+        return max(variance, 0.0) ** 0.5
+
+
+class TallyBucket(models.Model):
+    """Answer count for one option (``mc``) or scale step in tenths (``scale``)."""
+    question = models.ForeignKey(Question, related_name='tally_buckets', on_delete=models.CASCADE)
+    bucket = models.PositiveIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'bucket'], name='unique_tally_bucket'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.question_id}/{self.bucket}: {self.count}"
@@ -0,0 +1,99 @@
+"""Paged response forms for long surveys.
+
+A survey with ``questions_per_page`` set is answered one page at a time.
+Only the fields of the current page are built and validated; the cleaned
+values of the earlier pages wait in a :class:`PartialResponse` until the
+last page is submitted, and are then stored like a one-page submission.
+If the page size changed in the meantime, some questions may never have
+been shown; the respondent is then sent back to the first of them.
+"""
+from __future__ import annotations
+from typing import Any
+from django.conf import settings
+from django.utils import timezone
+from .db import write_transaction
+from .ingest import clean_values, save_response
+from .models import Invitation, PartialResponse
+from .schema import QuestionSpec, SurveySchema
+from .spool import get_spool
+
+
+def page_count(schema: SurveySchema, per_page: int) -> int:
+    if not per_page:
+        return 1
+    return max(-(-len(schema.questions) // per_page), 1)
+
+
+def page_questions(schema: SurveySchema, per_page: int, page: int) -> tuple[QuestionSpec, ...]:
+    """Questions on ``page`` (counted from 0)."""
+    if not per_page:
+        return schema.questions
+    return schema.questions[page * per_page:(page + 1) * per_page]
+
+
+def load_progress(invitation: Invitation) -> PartialResponse:
+    """Stored progress of the respondent, or a fresh unsaved one."""
+    progress = PartialResponse.objects.filter(invitation=invitation).first()
+    return progress or PartialResponse(invitation=invitation, values={})
+
+
+def initial_values(progress: PartialResponse, questions: tuple[QuestionSpec, ...]) -> dict[str, Any]:
+    """Earlier answers to ``questions``, for a respondent who went back."""
+    return {str(q.id): progress.values[str(q.id)] for q in questions if str(q.id) in progress.values}
+
+
+def first_incomplete_page(schema: SurveySchema, per_page: int, values: dict[str, Any]) -> int | None:
+    """First page with a question that ``values`` does not answer validly."""
+    _, errors = clean_values(schema.questions, values)
+    for position, q in enumerate(schema.questions):
+        if str(q.id) in errors:
+            return position // per_page if per_page else 0
+    return None
+
+
+def save_page(progress: PartialResponse, values: dict[str, Any]) -> None:
+    """Keep the answers of the current page and move to the next one."""
+    progress.values.update(values)
+    progress.page += 1
+    _store(progress)
+
+
+def _store(progress: PartialResponse) -> None:
+    """Save the progress; a first page stored concurrently by a double submit wins."""
+    with write_transaction():
+        if progress.pk:
+            progress.save()
+        else:
+            PartialResponse.objects.get_or_create(
+                invitation=progress.invitation, defaults={'page': progress.page, 'values': progress.values},
+            )
+
+
+def go_back(progress: PartialResponse) -> None:
+    if progress.pk and progress.page:
+        progress.page -= 1
+        with write_transaction():
+            progress.save(update_fields=['page', 'updated_at'])
+
+
+def complete(progress: PartialResponse, schema: SurveySchema, per_page: int, values: dict[str, Any]) -> bool:
+    """Store the whole response and drop the saved progress.
+
+    Returns False, storing nothing, when earlier pages left questions
+    unanswered; the progress then points at the first page to fill in.
+    """
+    values = {**progress.values, **values}
+    page = first_incomplete_page(schema, per_page, values)
+    if page is not None:
+        progress.values, progress.page = values, page
+        _store(progress)
+        return False
+    invitation = progress.invitation
+    with write_transaction():
+        if settings.SURVEY_INGEST_MODE == 'spool':
+            get_spool().enqueue(invitation.pk, values, timezone.now())
+        else:
+            save_response(invitation, schema.questions, values)
+        if progress.pk:
+            progress.delete()
+    return True
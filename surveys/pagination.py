@@ -0,0 +1,72 @@
+"""Keyset (cursor) pagination over ``(created_at, id)``, and an admin
+paginator that avoids exact counts over large tables."""
+from __future__ import annotations
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from django.core.paginator import Paginator
+from django.db.models import Max, QuerySet
+from django.utils.functional import cached_property
+
+# Filtered admin lists count at most this many rows.
+ESTIMATE_COUNT_LIMIT = 10_000
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    """One page of rows plus the cursor of the page after it, if any."""
+    rows: list
+    next_cursor: str | None
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f'{created_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Parse a cursor made by :func:`encode_cursor`; raises ``ValueError``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, UnicodeDecodeError, base64.binascii.Error) as exc:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from exc
+
+
+def keyset_page(queryset: QuerySet, cursor: str | None, size: int, fields: tuple[str, ...]) -> KeysetPage:
+    """Return the page of ``queryset`` after ``cursor``, newest first.
+
+    The cursor is turned into a range condition on the ``(created_at, id)``
+    index, so every page costs the same as the first one; there is no
+    OFFSET and no COUNT.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+    rows = list(queryset.values(*fields, 'id', 'created_at')[:size + 1])
+    if len(rows) <= size:
+        return KeysetPage(rows, None)
+    rows = rows[:size]
+    return KeysetPage(rows, encode_cursor(rows[-1]['created_at'], rows[-1]['id']))
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count never scans a whole large table.
+
+    An unfiltered list is estimated by its highest id, which SQLite reads
+    from the end of the primary key; ids lost to deletes make it an upper
+    bound. A filtered list is counted up to ``ESTIMATE_COUNT_LIMIT`` rows,
+    so the page links stop there.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        queryset = queryset.order_by()
+        if not queryset.query.where:
+            return queryset.aggregate(last=Max('pk'))['last'] or 0
+        return queryset[:ESTIMATE_COUNT_LIMIT].count()
@@ -0,0 +1,121 @@
+"""Opt-in cProfile sampling of live requests by staff users."""
+from __future__ import annotations
+import cProfile
+import random
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Callable, Iterator
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+SUFFIX = '.pstats'
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+@dataclass(frozen=True)
+class ProfileFile:
+    name: str
+    view_name: str
+    created_at: datetime
+    size: int
+
+
+def profile_dir() -> Path:
+    return Path(settings.SURVEY_PROFILE_DIR)
+
+
+def wants_profile(request: HttpRequest) -> bool:
+    """Staff asked for a profile and the request falls within the sample."""
+    user = getattr(request, 'user', None)
+    if not (user and user.is_staff):
+        return False
+    if PROFILE_HEADER not in request.headers and request.GET.get(PROFILE_PARAM) != '1':
+        return False
+    return random.random() < settings.SURVEY_PROFILE_SAMPLE_RATE
+
+
+def save_profile(profiler: cProfile.Profile, view_name: str) -> str:
+    """Write the stats into the ring buffer and drop the oldest files."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    name = f'{stamp}_{_UNSAFE.sub("-", view_name)}{SUFFIX}'
+    profiler.dump_stats(directory / name)
+    for old in sorted(directory.glob(f'*{SUFFIX}'), reverse=True)[settings.SURVEY_PROFILE_KEEP:]:
+        old.unlink(missing_ok=True)
+    return name
+
+
+def list_profiles() -> list[ProfileFile]:
+    """Stored profiles, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob(f'*{SUFFIX}'), reverse=True):
+        stamp, _, view_name = path.stem.partition('_')
+        try:
+            created_at = datetime.strptime(stamp, '%Y%m%dT%H%M%S%fZ').replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            continue
+        profiles.append(ProfileFile(path.name, view_name, created_at, path.stat().st_size))
+    return profiles
+
+
+def profile_path(name: str) -> Path | None:
+    """Path of a stored profile, or ``None`` for unknown or unsafe names."""
+    if _UNSAFE.search(name) or not name.endswith(SUFFIX):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+class ProfilingMiddleware:
+    """Run sampled views under cProfile and keep the stats on disk.
+
+    Streaming bodies are profiled chunk by chunk until they are exhausted,
+    so exports include the work done while streaming. Async views are not
+    profiled: cProfile only sees the thread it runs on, not the awaits.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.get_response(request)
+
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs) -> HttpResponse | None:
+        if iscoroutinefunction(view_func) or not wants_profile(request):
+            return None
+        view_name = request.resolver_match.view_name if request.resolver_match else 'unknown'
+        profiler = cProfile.Profile()
+        response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+        if getattr(response, 'streaming', False):
+            response.streaming_content = self._profile_stream(response.streaming_content, profiler, view_name)
+        else:
+            response['X-Profile-Id'] = save_profile(profiler, view_name)
+        return response
+
+    def _profile_stream(self, content: Iterator, profiler: cProfile.Profile, view_name: str) -> Iterator:
+        iterator = iter(content)
+        try:
+            while True:
+                profiler.enable()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    profiler.disable()
+                yield chunk
+        finally:
+            save_profile(profiler, view_name)
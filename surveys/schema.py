@@ -0,0 +1,91 @@
+"""Compiled response-form schemas, cached per survey."""
+from __future__ import annotations
+from dataclasses import dataclass
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from .models import Survey, Question
+
+# Bump when the layout of the cached classes changes.
+SCHEMA_VERSION = 3
+
+
+@dataclass(frozen=True)
+class QuestionSpec:
+    """Everything needed to render and validate one question."""
+    id: int
+    number: int
+    title: str
+    question_type: str
+    choices: tuple[tuple[int, str], ...] = ()
+
+
+@dataclass(frozen=True)
+class SurveySchema:
+    """Compiled field specification of a survey."""
+    survey_id: int
+    title: str
+    questions: tuple[QuestionSpec, ...]
+    packed: bool = False
+    archived: bool = False
+
+
+class AnswerFormatter:
+    """Renders raw answer columns with the labels of a compiled schema."""
+
+    def __init__(self, schema: SurveySchema) -> None:
+        self.questions = {q.id: q for q in schema.questions}
+        self.options = {option_id: text for q in schema.questions for option_id, text in q.choices}
+
+    def title(self, question_id: int) -> str:
+        question = self.questions.get(question_id)
+        return question.title if question else ''
+
+    def value(self, question_id: int, text: str, option_id: int | None, scale: Decimal | None) -> str:
+        question = self.questions.get(question_id)
+        if question is None or question.question_type == Question.OPEN:
+            return text
+        if question.question_type == Question.MULTIPLE_CHOICE:
+            return self.options.get(option_id, '')
+        return '' if scale is None else str(scale)
+
+
+def _cache():
+    return caches[settings.SURVEY_CACHE_ALIAS]
+
+
+def schema_cache_key(survey_id: int) -> str:
+    return f'survey-schema:v{SCHEMA_VERSION}:{survey_id}'
+
+
+def compile_schema(survey: Survey) -> SurveySchema:
+    """Build the schema from the database in a fixed number of queries."""
+    questions = survey.questions.prefetch_related('options')
+    return SurveySchema(
+        survey_id=survey.pk,
+        title=survey.title,
+        questions=tuple(
+            QuestionSpec(
+                id=q.id, number=q.number, title=q.title, question_type=q.question_type,
+                choices=tuple((opt.id, opt.text) for opt in q.options.all())
+                if q.question_type == Question.MULTIPLE_CHOICE else (),
+            )
+            for q in questions
+        ),
+        packed=survey.answer_storage == Survey.PACKED,
+        archived=survey.archived_at is not None,
+    )
+
+
+def get_schema(survey: Survey) -> SurveySchema:
+    """Return the cached schema of ``survey``, compiling it on a miss."""
+    key = schema_cache_key(survey.pk)
+    schema = _cache().get(key)
+    if schema is None:
+        schema = compile_schema(survey)
+        _cache().set(key, schema)
+    return schema
+
+
+def invalidate_schema(survey_id: int) -> None:
+    _cache().delete(schema_cache_key(survey_id))
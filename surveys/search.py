@@ -0,0 +1,97 @@
+"""Full-text search over open answers through SQLite FTS5.
+
+The ``surveys_answer_fts`` index is created by migration 0006 and follows
+``surveys_answer`` through triggers. Answers of packed or archived surveys
+are not stored as answer rows and are therefore not searchable.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from uuid import UUID
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+from .db import write_transaction
+
+FTS_TABLE = 'surveys_answer_fts'
+SEARCH_PAGE_SIZE = 20
+SNIPPET_TOKENS = 16
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """One matching answer, with a highlighted excerpt."""
+    answer_id: int
+    invitation_uuid: UUID
+    survey_id: int
+    question_id: int
+    question_title: str
+    snippet: str
+    rank: float
+
+    @property
+    def excerpt(self) -> SafeString:
+        """The snippet as HTML, with the matches in ``<mark>``."""
+        return mark_safe(escape(self.snippet).replace('\x02', '<mark>').replace('\x03', '</mark>'))
+
+
+def match_expression(terms: str) -> str:
+    """Turn user input into an FTS5 query that matches all words.
+
+    Every word is quoted, so operators and punctuation cannot cause syntax
+    errors; a trailing ``*`` keeps its prefix meaning.
+    """
+    phrases = []
+    for word in terms.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            phrases.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(phrases)
+
+
+def search_answers(terms: str, survey_id: int | None = None, question_id: int | None = None,
+                   page: int = 1, page_size: int = SEARCH_PAGE_SIZE) -> tuple[list[SearchHit], bool]:
+    """Best matching answers first; returns one page and whether more follow.
+
+    The query starts from the FTS index, so its cost follows the number of
+    matches rather than the size of the answer table.
+    """
+    expression = match_expression(terms)
+    if not expression:
+        return [], False
+    sql = [
+        'SELECT a.id, i.uuid, q.survey_id, q.id, q.title,',
+        f"       snippet({FTS_TABLE}, 0, char(2), char(3), '…', {SNIPPET_TOKENS}), bm25({FTS_TABLE}) AS rank",
+        f'FROM {FTS_TABLE}',
+        f'JOIN surveys_answer a ON a.id = {FTS_TABLE}.rowid',
+        'JOIN surveys_question q ON q.id = a.question_id',
+        'JOIN surveys_invitation i ON i.id = a.invitation_id',
+        f'WHERE {FTS_TABLE} MATCH %s',
+    ]
+    params: list = [expression]
+    if survey_id:
+        sql.append('AND q.survey_id = %s')
+        params.append(survey_id)
+    if question_id:
+        sql.append('AND a.question_id = %s')
+        params.append(question_id)
+    sql.append('ORDER BY rank, a.id LIMIT %s OFFSET %s')
+    params += [page_size + 1, (page - 1) * page_size]
+    with connection.cursor() as cursor:
+        cursor.execute('\n'.join(sql), params)
+        rows = cursor.fetchall()
+    hits = [
+        SearchHit(answer_id, UUID(uuid), survey, question, title, snippet, rank)
+        for answer_id, uuid, survey, question, title, snippet, rank in rows[:page_size]
+    ]
+    return hits, len(rows) > page_size
+
+
+def rebuild_index() -> int:
+    """Repopulate the index from the answer rows; returns the rows indexed."""
+    with write_transaction(), connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}(rowid, text) SELECT id, text FROM surveys_answer WHERE text != ''")
+        indexed = cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
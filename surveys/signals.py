@@ -0,0 +1,58 @@
+"""Signal handlers keeping derived survey data in sync."""
+from __future__ import annotations
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Survey, Question, Option
+from .crosstab import invalidate_respondent_sets
+from .schema import invalidate_schema
+
+
+def _invalidate(survey_id: int) -> None:
+    """Drop the cached schema and respondent sets of ``survey_id``.
+
+    Once now and once more after the transaction commits: a request that
+    reads the old rows in between would otherwise cache them for good.
+    """
+    def drop() -> None:
+        invalidate_schema(survey_id)
+        invalidate_respondent_sets(survey_id)
+    drop()
+    transaction.on_commit(drop)
+
+
+@receiver([post_save, post_delete], sender=Survey)
+def survey_changed(sender, instance: Survey, **kwargs) -> None:
+    _invalidate(instance.pk)
+
+
+def _previous_survey_ids(instance, survey_ids) -> None:
+    """Remember the surveys ``instance`` belonged to before this save."""
+    instance._previous_survey_ids = set(survey_ids) if instance.pk else set()
+
+
+@receiver(pre_save, sender=Question)
+def question_saving(sender, instance: Question, **kwargs) -> None:
+    _previous_survey_ids(instance, Question.objects.filter(pk=instance.pk).values_list('survey_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance: Question, **kwargs) -> None:
+    # A question moved to another survey also leaves its old one.
+    for survey_id in {instance.survey_id, *getattr(instance, '_previous_survey_ids', ())}:
+        _invalidate(survey_id)
+
+
+@receiver(pre_save, sender=Option)
+def option_saving(sender, instance: Option, **kwargs) -> None:
+    _previous_survey_ids(instance, Option.objects.filter(pk=instance.pk).values_list('question__survey_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_changed(sender, instance: Option, **kwargs) -> None:
+    if Option.question.is_cached(instance):
+        survey_ids = [instance.question.survey_id]
+    else:
+        survey_ids = Question.objects.filter(pk=instance.question_id).values_list('survey_id', flat=True)
+    for survey_id in {*survey_ids, *getattr(instance, '_previous_survey_ids', ())}:
+        _invalidate(survey_id)
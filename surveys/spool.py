@@ -0,0 +1,135 @@
+"""Durable write-behind spool for respondent submissions.
+
+Submissions are appended to a separate SQLite file, so acknowledging a
+respondent never waits for the main database. The ``drain_spool`` command
+moves them into ``Answer``/``Invitation`` in large batches. A submission
+that keeps failing is moved to the ``dead_submission`` table after
+``MAX_ATTEMPTS`` tries, so it cannot hold up the rest of the queue.
+"""
+from __future__ import annotations
+import functools
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+from django.conf import settings
+from .ingest import Submission
+
+MAX_ATTEMPTS = 3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS submission (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invitation_id INTEGER NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    submitted_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failure (
+    submission_id INTEGER PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    error TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dead_submission (
+    id INTEGER PRIMARY KEY,
+    invitation_id INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    error TEXT NOT NULL
+);
+'''
+
+
+class SubmissionSpool:
+    """Append-only queue with at most one pending submission per invitation."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            # An acknowledged submission must survive a power cut.
+            conn.execute('PRAGMA synchronous = FULL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, invitation_id: int, values: dict[str, Any], submitted_at: datetime) -> bool:
+        """Store a submission; returns ``False`` if one is already pending."""
+        payload = json.dumps({key: _jsonable(value) for key, value in values.items()})
+        cursor = self._connection().execute(
+            'INSERT OR IGNORE INTO submission (invitation_id, payload, submitted_at) VALUES (?, ?, ?)',
+            (invitation_id, payload, submitted_at.isoformat()),
+        )
+        return cursor.rowcount == 1
+
+    def peek(self, limit: int) -> list[tuple[int, Submission]]:
+        """Oldest pending submissions with their spool ids, without removing them."""
+        rows = self._connection().execute(
+            'SELECT id, invitation_id, payload, submitted_at FROM submission ORDER BY id LIMIT ?', (limit,)
+        )
+        return [
+            (spool_id, Submission(invitation_id, json.loads(payload), datetime.fromisoformat(submitted_at)))
+            for spool_id, invitation_id, payload, submitted_at in rows
+        ]
+
+    def remove(self, spool_ids: list[int]) -> None:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany('DELETE FROM submission WHERE id = ?', [(i,) for i in spool_ids])
+        conn.executemany('DELETE FROM failure WHERE submission_id = ?', [(i,) for i in spool_ids])
+        conn.execute('COMMIT')
+
+    def fail(self, spool_id: int, error: str) -> bool:
+        """Count a failed attempt; returns ``True`` once the submission was moved aside."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(
+            'INSERT INTO failure (submission_id, attempts, error) VALUES (?, 1, ?) '
+            'ON CONFLICT (submission_id) DO UPDATE SET attempts = attempts + 1, error = excluded.error',
+            (spool_id, error),
+        )
+        attempts = conn.execute('SELECT attempts FROM failure WHERE submission_id = ?', (spool_id,)).fetchone()[0]
+        dead = attempts >= MAX_ATTEMPTS
+        if dead:
+            conn.execute(
+                'INSERT INTO dead_submission (id, invitation_id, payload, submitted_at, error) '
+                'SELECT id, invitation_id, payload, submitted_at, ? FROM submission WHERE id = ?',
+                (error, spool_id),
+            )
+            conn.execute('DELETE FROM submission WHERE id = ?', (spool_id,))
+            conn.execute('DELETE FROM failure WHERE submission_id = ?', (spool_id,))
+        conn.execute('COMMIT')
+        return dead
+
+    def dead(self) -> list[tuple[int, Submission, str]]:
+        """Submissions moved aside by :meth:`fail`, with their last error."""
+        rows = self._connection().execute(
+            'SELECT id, invitation_id, payload, submitted_at, error FROM dead_submission ORDER BY id'
+        )
+        return [
+            (spool_id, Submission(invitation_id, json.loads(payload), datetime.fromisoformat(submitted_at)), error)
+            for spool_id, invitation_id, payload, submitted_at, error in rows
+        ]
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM submission').fetchone()[0]
+
+
+def _jsonable(value: Any) -> Any:
+    return str(value) if isinstance(value, Decimal) else value
+
+
+@functools.lru_cache(maxsize=None)
+def _spool(path: str) -> SubmissionSpool:
+    return SubmissionSpool(path)
+
+
+def get_spool() -> SubmissionSpool:
+    return _spool(str(settings.SURVEY_SPOOL_PATH))
@@ -0,0 +1,156 @@
+"""Compact per-respondent answer storage and its read adapters.
+
+Surveys with ``answer_storage = packed`` keep one :class:`PackedResponse`
+per respondent instead of one :class:`Answer` row per question. The
+helpers below translate between the two shapes, so the results page, the
+CSV export and the tallies see the same ``(question_id, text, option_id,
+scale)`` tuples for both.
+"""
+from __future__ import annotations
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+from typing import Iterable, Iterator
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from .db import write_transaction
+from .models import Survey, Question, Answer, PackedResponse
+from .pagination import KeysetPage, keyset_page
+from .schema import SurveySchema, get_schema
+
+PACK_BATCH_SIZE = 1000
+AnswerValues = tuple[int, str, int | None, Decimal | None]
+
+
+def pack(answers: Iterable[Answer]) -> dict[str, str | int]:
+    """Packed form of the answers of one respondent; scales go in tenths."""
+    packed: dict[str, str | int] = {}
+    for answer in answers:
+        if answer.option_id is not None:
+            packed[str(answer.question_id)] = answer.option_id
+        elif answer.scale is not None:
+            packed[str(answer.question_id)] = int(Decimal(answer.scale) * 10)
+        else:
+            packed[str(answer.question_id)] = answer.text
+    return packed
+
+
+def unpack(schema: SurveySchema, packed: dict[str, str | int]) -> Iterator[AnswerValues]:
+    """Answer columns stored in ``packed``, in question order.
+
+    Values of questions that no longer exist are skipped, just like answer
+    rows that were removed together with their question.
+    """
+    for q in schema.questions:
+        value = packed.get(str(q.id))
+        if value is None:
+            continue
+        if q.question_type == Question.OPEN:
+            yield q.id, value, None, None
+        elif q.question_type == Question.MULTIPLE_CHOICE:
+            yield q.id, '', value, None
+        else:
+            yield q.id, '', None, Decimal(value).scaleb(-1)
+
+
+def packed_responses(schema: SurveySchema, since: int = 0, until: int | None = None) -> QuerySet:
+    """Packed responses of the survey with ``since < id <= until``."""
+    responses = PackedResponse.objects.filter(survey_id=schema.survey_id)
+    if since:
+        responses = responses.filter(id__gt=since)
+    if until is not None:
+        responses = responses.filter(id__lte=until)
+    return responses
+
+
+def packed_answer_page(schema: SurveySchema, question_id: int | None, since: datetime | None,
+                       until: datetime | None, cursor: str | None, size: int) -> KeysetPage:
+    """A page of the answer browser for a packed survey.
+
+    Pages are cut per respondent, so a page holds roughly ``size`` answers
+    when all questions are shown and at most ``size`` for a single question.
+    """
+    responses = PackedResponse.objects.filter(survey_id=schema.survey_id)
+    if question_id:
+        responses = responses.filter(answers__has_key=str(question_id))
+    if since:
+        responses = responses.filter(created_at__gte=since)
+    if until:
+        responses = responses.filter(created_at__lt=until)
+    per_response = 1 if question_id else max(len(schema.questions), 1)
+    page = keyset_page(responses, cursor, max(size // per_response, 1), ('answers',))
+    rows = [
+        {'question_id': qid, 'text': text, 'option_id': option_id, 'scale': scale, 'created_at': row['created_at']}
+        for row in page.rows
+        for qid, text, option_id, scale in unpack(schema, row['answers'])
+        if not question_id or qid == question_id
+    ]
+    return KeysetPage(rows, page.next_cursor)
+
+
+def pack_survey(survey: Survey, batch_size: int = PACK_BATCH_SIZE) -> tuple[int, int]:
+    """Move the answer rows of ``survey`` into packed responses.
+
+    Runs in one write transaction and switches the survey to packed storage
+    at the end; returns the number of answer rows and packed responses.
+    Tallies are left alone, the answers themselves do not change. The
+    cached schema is dropped again on commit, so a reader that cached the
+    unpacked storage in the meantime does not keep it.
+    """
+    with write_transaction():
+        answers = (
+            Answer.objects.filter(question__survey=survey)
+            .order_by('invitation_id', 'id')
+            .only('invitation_id', 'question_id', 'text', 'option_id', 'scale', 'created_at')
+        )
+        rows = responses = 0
+        batch = []
+        for invitation_id, group in groupby(answers.iterator(chunk_size=batch_size), key=attrgetter('invitation_id')):
+            group = list(group)
+            rows += len(group)
+            batch.append(PackedResponse(
+                invitation_id=invitation_id, survey=survey,
+                answers=pack(group), created_at=min(a.created_at for a in group),
+            ))
+            if len(batch) >= batch_size:
+                PackedResponse.objects.bulk_create(batch)
+                responses += len(batch)
+                batch = []
+        PackedResponse.objects.bulk_create(batch)
+        responses += len(batch)
+        # Switch first, so the delete trigger leaves the tallies alone.
+        survey.answer_storage = Survey.PACKED
+        survey.save(update_fields=['answer_storage'])
+        Answer.objects.filter(question__survey=survey).delete()
+    return rows, responses
+
+
+def iter_packed_answers(survey: Survey) -> Iterator[AnswerValues]:
+    """All stored answers of a packed survey, for recomputing tallies."""
+    schema = get_schema(survey)
+    for packed in packed_responses(schema).values_list('answers', flat=True).iterator(chunk_size=PACK_BATCH_SIZE):
+        yield from unpack(schema, packed)
+
+
+def table_sizes(*models) -> dict[str, int] | None:
+    """Bytes used by the tables of ``models`` and their indexes.
+
+    Reads SQLite's ``dbstat`` table; returns ``None`` on other databases or
+    when SQLite was built without it.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    tables = [model._meta.db_table for model in models]
+    placeholders = ', '.join(['%s'] * len(tables))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT s.tbl_name, SUM(d.pgsize) FROM dbstat d JOIN sqlite_schema s ON s.name = d.name '
+                f'WHERE s.tbl_name IN ({placeholders}) GROUP BY s.tbl_name',
+                tables,
+            )
+            sizes = dict(cursor.fetchall())
+    except DatabaseError:
+        return None
+    return {table: sizes.get(table, 0) for table in tables}
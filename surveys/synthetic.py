@@ -0,0 +1,122 @@
+"""Synthetic surveys and responses for benchmarks and load tests."""
+from __future__ import annotations
+import random
+import uuid
+from datetime import date
+from decimal import Decimal
+from itertools import accumulate
+from typing import Callable, Iterator
+from django.utils import timezone
+from .db import write_transaction
+from .models import Survey, Question, Option, Invitation, Answer
+from .schema import SurveySchema, get_schema, invalidate_schema
+from .tallies import Tallies
+
+QUESTION_TYPES = (Question.OPEN, Question.MULTIPLE_CHOICE, Question.SCALE)
+WORDS = (
+    'goed', 'slecht', 'snel', 'traag', 'prijs', 'service', 'kwaliteit', 'levering',
+    'personeel', 'website', 'vriendelijk', 'duidelijk', 'product', 'wachttijd',
+)
+
+
+def create_synthetic_survey(questions: int, options: int, rng: random.Random, title: str = 'Synthetische enquête') -> Survey:
+    """Create a survey cycling through the question types, using bulk inserts."""
+    survey = Survey.objects.create(
+        title=title, description='Gegenereerd', start_date=date.today(), end_date=date.today(),
+    )
+    created = Question.objects.bulk_create([
+        Question(
+            survey=survey, number=i + 1, title=f'Vraag {i + 1}', text='Synthetische vraag',
+            question_type=QUESTION_TYPES[i % len(QUESTION_TYPES)],
+        )
+        for i in range(questions)
+    ])
+    Option.objects.bulk_create([
+        Option(question=q, text=f'Optie {chr(ord("A") + j)}')
+        for q in created if q.question_type == Question.MULTIPLE_CHOICE
+        for j in range(options)
+    ])
+    # bulk_create sends no signals, so drop any schema cached for a reused id.
+    invalidate_schema(survey.pk)
+    return survey
+
+
+def random_values(schema: SurveySchema, rng: random.Random) -> dict[str, str]:
+    """Valid POST data for the response form of ``schema``."""
+    values = {}
+    for q in schema.questions:
+        if q.question_type == Question.OPEN:
+            values[str(q.id)] = ' '.join(rng.choices(WORDS, k=rng.randint(1, 12)))
+        elif q.question_type == Question.MULTIPLE_CHOICE:
+            values[str(q.id)] = str(rng.choice(q.choices)[0])
+        else:
+            values[str(q.id)] = str(Decimal(rng.randint(0, 10)) / 10)
+    return values
+
+
+def answer_generators(schema: SurveySchema, rng: random.Random) -> list[Callable[[int], Answer]]:
+    """One answer factory per question, each with its own skewed distribution.
+
+    Multiple-choice questions get uneven option popularity, scale questions a
+    beta-distributed score with a per-question mean and spread, and open
+    answers a variable number of words.
+    """
+    factories = []
+    for q in schema.questions:
+        if q.question_type == Question.OPEN:
+            length = rng.randint(3, 15)
+            factories.append(lambda inv, q=q: Answer(
+                invitation_id=inv, question_id=q.id,
+                text=' '.join(rng.choices(WORDS, k=rng.randint(1, length))),
+            ))
+        elif q.question_type == Question.MULTIPLE_CHOICE:
+            option_ids = [option_id for option_id, _ in q.choices]
+            weights = list(accumulate(rng.random() ** 2 + 0.01 for _ in option_ids))
+            factories.append(lambda inv, q=q, ids=option_ids, w=weights: Answer(
+                invitation_id=inv, question_id=q.id, option_id=rng.choices(ids, cum_weights=w)[0],
+            ))
+        else:
+            alpha, beta = rng.uniform(1, 6), rng.uniform(1, 6)
+            factories.append(lambda inv, q=q, a=alpha, b=beta: Answer(
+                invitation_id=inv, question_id=q.id,
+                scale=Decimal(round(rng.betavariate(a, b) * 10)) / 10,
+            ))
+    return factories
+
+
+def generate_responses(survey: Survey, invitations: int, response_rate: float, rng: random.Random,
+                       chunk_size: int = 5000) -> Iterator[tuple[int, int]]:
+    """Create invitations and answers in chunked bulk inserts.
+
+    Every chunk is one transaction that also updates the tallies. Yields the
+    running totals ``(invitations, answers)`` after each chunk. All choices
+    come from ``rng``, so a fixed seed on a fresh database reproduces the
+    same data set.
+    """
+    factories = answer_generators(get_schema(survey), rng)
+    # Derived from the survey id as well, so re-running with the same seed
+    # against an existing database does not collide on Invitation.uuid.
+    namespace = uuid.UUID(int=rng.getrandbits(128))
+    done_invitations = done_answers = 0
+    while done_invitations < invitations:
+        size = min(chunk_size, invitations - done_invitations)
+        now = timezone.now()
+        chunk = [
+            Invitation(
+                survey=survey, uuid=uuid.uuid5(namespace, f'{survey.pk}:{done_invitations + i}'),
+                responded_at=now if rng.random() < response_rate else None,
+            )
+            for i in range(size)
+        ]
+        with write_transaction():
+            Invitation.objects.bulk_create(chunk)
+            answers = [
+                factory(inv.pk)
+                for inv in chunk if inv.responded_at
+                for factory in factories
+            ]
+            Answer.objects.bulk_create(answers)
+            Tallies.from_answers(answers).apply()
+        done_invitations += size
+        done_answers += len(answers)
+        yield done_invitations, done_answers
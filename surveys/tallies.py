@@ -0,0 +1,220 @@
+"""Incrementally maintained per-question result tallies."""
+from __future__ import annotations
+from collections import Counter
+from decimal import Decimal
+from typing import Iterable, Iterator
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from .models import Survey, Question, Answer, QuestionTally, TallyBucket
+from .archive import open_archive
+from .db import write_transaction
+from .schema import SurveySchema
+from .storage import iter_packed_answers
+
+SCALE_STEPS = 11  # 0.0, 0.1, ... 1.0
+UPDATE_BATCH = 200
+
+
+def scale_bucket(value: Decimal | str) -> int:
+    """Return the scale value in tenths."""
+    return int(Decimal(value) * 10)
+
+
+class Tallies:
+    """Counts accumulated in memory before they are written in bulk."""
+
+    def __init__(self) -> None:
+        self.counts: Counter[int] = Counter()
+        self.totals: Counter[int] = Counter()
+        self.squares: Counter[int] = Counter()
+        self.buckets: Counter[tuple[int, int]] = Counter()
+
+    def add(self, question_id: int, option_id: int | None, scale: Decimal | str | None, n: int = 1) -> None:
+        self.counts[question_id] += n
+        if option_id is not None:
+            self.buckets[question_id, option_id] += n
+        elif scale is not None:
+            tenths = scale_bucket(scale)
+            self.totals[question_id] += tenths * n
+            self.squares[question_id] += tenths * tenths * n
+            self.buckets[question_id, tenths] += n
+
+    @classmethod
+    def from_answers(cls, answers: Iterable[Answer]) -> Tallies:
+        tallies = cls()
+        for answer in answers:
+            tallies.add(answer.question_id, answer.option_id, answer.scale)
+        return tallies
+
+    @classmethod
+    def from_database(cls, survey: Survey) -> Tallies:
+        """Recompute the tallies of ``survey`` from the stored answers."""
+        tallies = cls()
+        rows = (
+            Answer.objects.filter(question__survey=survey)
+            .values_list('question_id', 'option_id', 'scale')
+            .order_by()
+            .annotate(n=Count('id'))
+        )
+        for question_id, option_id, scale, n in rows:
+            tallies.add(question_id, option_id, scale, n)
+        if survey.archived_at is not None:
+            with open_archive(survey.pk) as archive:
+                for _, _, answers in archive.respondents():
+                    for question_id, _, option_id, scale, _ in answers:
+                        tallies.add(question_id, option_id, scale)
+        elif survey.answer_storage == Survey.PACKED:
+            for question_id, _, option_id, scale in iter_packed_answers(survey):
+                tallies.add(question_id, option_id, scale)
+        return tallies
+
+    @classmethod
+    def from_stored(cls, survey: Survey) -> Tallies:
+        tallies = cls()
+        for t in QuestionTally.objects.filter(question__survey=survey):
+            if t.count:
+                tallies.counts[t.question_id] = t.count
+            if t.total:
+                tallies.totals[t.question_id] = t.total
+            if t.total_squares:
+                tallies.squares[t.question_id] = t.total_squares
+        for b in TallyBucket.objects.filter(question__survey=survey, count__gt=0):
+            tallies.buckets[b.question_id, b.bucket] = b.count
+        return tallies
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Tallies):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def as_dict(self) -> dict[str, dict]:
+        # Counter equality in 3.10+ ignores zero entries, dicts do not.
+        return {
+            'counts': +self.counts, 'totals': +self.totals,
+            'squares': +self.squares, 'buckets': +self.buckets,
+        }
+
+    def diff(self, other: Tallies) -> list[str]:
+        """Describe where ``other`` disagrees with these tallies."""
+        problems = []
+        mine, theirs = self.as_dict(), other.as_dict()
+        for name in mine:
+            for key in sorted(set(mine[name]) | set(theirs[name])):
+                if mine[name][key] != theirs[name][key]:
+                    problems.append(f'{name}[{key}]: {mine[name][key]} != {theirs[name][key]}')
+        return problems
+
+    def apply(self) -> None:
+        """Add the accumulated counts to the stored tallies.
+
+        Missing rows are created first and then incremented with one UPDATE
+        per table and batch of ``UPDATE_BATCH`` keys, which keeps the SQL
+        below SQLite's expression depth limit.
+        """
+        if self.counts:
+            QuestionTally.objects.bulk_create(
+                [QuestionTally(question_id=qid) for qid in self.counts], ignore_conflicts=True
+            )
+            for qids in _batches(list(self.counts)):
+                QuestionTally.objects.filter(question_id__in=qids).update(
+                    count=F('count') + _increments(self.counts, qids),
+                    total=F('total') + _increments(self.totals, qids),
+                    total_squares=F('total_squares') + _increments(self.squares, qids),
+                )
+        if self.buckets:
+            TallyBucket.objects.bulk_create(
+                [TallyBucket(question_id=qid, bucket=bucket) for qid, bucket in self.buckets],
+                ignore_conflicts=True,
+            )
+            for keys in _batches(list(self.buckets)):
+                matches = Q()
+                for qid, bucket in keys:
+                    matches |= Q(question_id=qid, bucket=bucket)
+                TallyBucket.objects.filter(matches).update(count=F('count') + Case(
+                    *[When(question_id=qid, bucket=bucket, then=Value(self.buckets[qid, bucket])) for qid, bucket in keys],
+                    default=Value(0),
+                ))
+
+    def replace(self, survey: Survey) -> None:
+        """Overwrite the stored tallies of ``survey`` with these counts."""
+        with transaction.atomic():
+            QuestionTally.objects.filter(question__survey=survey).delete()
+            TallyBucket.objects.filter(question__survey=survey).delete()
+            QuestionTally.objects.bulk_create([
+                QuestionTally(
+                    question_id=qid, count=n,
+                    total=self.totals[qid], total_squares=self.squares[qid],
+                )
+                for qid, n in self.counts.items()
+            ])
+            TallyBucket.objects.bulk_create([
+                TallyBucket(question_id=qid, bucket=bucket, count=n)
+                for (qid, bucket), n in self.buckets.items()
+            ])
+
+
+def _batches(keys: list, size: int = UPDATE_BATCH) -> Iterator[list]:
+    for start in range(0, len(keys), size):
+        yield keys[start:start + size]
+
+
+def _increments(values: Counter[int], question_ids: list[int]) -> Case | Value:
+    whens = [When(question_id=qid, then=Value(values[qid])) for qid in question_ids if values[qid]]
+    if not whens:
+        return Value(0)
+    return Case(*whens, default=Value(0))
+
+
+def rebuild_tallies(survey: Survey) -> list[str]:
+    """Recount the tallies of ``survey`` and overwrite the stored ones.
+
+    Counting and replacing share one write transaction, so answers stored
+    meanwhile cannot be added to the old tallies and then overwritten.
+    Returns the drift found, as described by :meth:`Tallies.diff`.
+    """
+    with write_transaction():
+        Survey.objects.filter(pk=survey.pk).update(tallies_stale=False)
+        survey.refresh_from_db(fields=['answer_storage', 'archived_at', 'tallies_stale'])
+        expected = Tallies.from_database(survey)
+        problems = expected.diff(Tallies.from_stored(survey))
+        expected.replace(survey)
+    return problems
+
+
+def record_answers(answers: Iterable[Answer]) -> None:
+    """Add freshly stored answers to the tallies of their questions."""
+    Tallies.from_answers(answers).apply()
+
+
+def survey_summary(schema: SurveySchema) -> list[dict]:
+    """Per-question summary rows for the results page.
+
+    Reads only the tally tables, so the cost grows with the number of
+    questions and options rather than with the number of respondents.
+    """
+    question_ids = [q.id for q in schema.questions]
+    tallies = {t.question_id: t for t in QuestionTally.objects.filter(question_id__in=question_ids)}
+    buckets: dict[int, dict[int, int]] = {}
+    for b in TallyBucket.objects.filter(question_id__in=question_ids):
+        buckets.setdefault(b.question_id, {})[b.bucket] = b.count
+    rows = []
+    for q in schema.questions:
+        tally = tallies.get(q.id) or QuestionTally(question_id=q.id)
+        counts = buckets.get(q.id, {})
+        row = {'question': q, 'count': tally.count, 'tally': tally}
+        if q.question_type == Question.MULTIPLE_CHOICE:
+            row['options'] = [
+                {'text': text, 'count': counts.get(option_id, 0), 'percentage': _percentage(counts.get(option_id, 0), tally.count)}
+                for option_id, text in q.choices
+            ]
+        elif q.question_type == Question.SCALE:
+            row['histogram'] = [
+                {'value': f'{step / 10:.1f}', 'count': counts.get(step, 0), 'percentage': _percentage(counts.get(step, 0), tally.count)}
+                for step in range(SCALE_STEPS)
+            ]
+        rows.append(row)
+    return rows
+
+
+def _percentage(part: int, whole: int) -> float:
+    return round(100 * part / whole, 1) if whole else 0.0
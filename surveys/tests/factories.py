@@ -0,0 +1,20 @@
+"""Shared helpers for building test surveys."""
+from datetime import date
+from surveys.models import Survey, Question, Option, Invitation
+
+
+def make_survey(size: int) -> tuple[Invitation, dict[str, str]]:
+    """Create a survey cycling through the question types plus valid POST data."""
+    survey = Survey.objects.create(title='s', description='d', start_date=date.today(), end_date=date.today())
+    data = {}
+    for i in range(size):
+        kind = (Question.OPEN, Question.MULTIPLE_CHOICE, Question.SCALE)[i % 3]
+        q = Question.objects.create(survey=survey, number=i + 1, title=f'q{i}', text='t', question_type=kind)
+        if kind == Question.OPEN:
+            data[str(q.id)] = f'antwoord {i}'
+        elif kind == Question.MULTIPLE_CHOICE:
+            Option.objects.create(question=q, text='A')
+            data[str(q.id)] = str(Option.objects.create(question=q, text='B').id)
+        else:
+            data[str(q.id)] = '0.5'
+    return Invitation.objects.create(survey=survey), data
@@ -0,0 +1,55 @@
+"""Tests for the admin of the large tables."""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from surveys.models import Answer, Invitation, Question
+from surveys.pagination import ESTIMATE_COUNT_LIMIT, EstimatedCountPaginator
+from surveys.tests.factories import make_survey
+
+
+class LargeTableAdminTests(TestCase):
+    # session, user, estimated count, page of rows, surveys for the filter
+    QUERIES = 5
+
+    def setUp(self) -> None:
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pass'))
+
+    def add_responses(self, n: int) -> None:
+        for _ in range(n):
+            invitation, _ = make_survey(3)
+            question = Question.objects.filter(survey=invitation.survey).first()
+            Answer.objects.create(invitation=invitation, question=question, text='x')
+
+    def changelist_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_have_a_fixed_query_budget(self) -> None:
+        for url in ('/admin/surveys/answer/', '/admin/surveys/invitation/',
+                    '/admin/surveys/answer/?created_at__gte=2000-01-01T00:00:00%2B00:00'):
+            with self.subTest(url=url):
+                self.add_responses(2)
+                small = self.changelist_queries(url)
+                self.add_responses(30)
+                self.assertEqual(self.changelist_queries(url), small)
+                self.assertLessEqual(small, self.QUERIES)
+
+    def test_survey_filter(self) -> None:
+        self.add_responses(3)
+        survey = Invitation.objects.first().survey
+        response = self.client.get(f'/admin/surveys/answer/?question__survey__id__exact={survey.pk}')
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_estimated_count(self) -> None:
+        self.add_responses(4)
+        answers = Answer.objects.order_by('-pk')
+        self.assertEqual(EstimatedCountPaginator(answers, 10).count, answers.first().pk)
+        today = answers.filter(created_at__date=timezone.now().date())
+        self.assertEqual(EstimatedCountPaginator(today, 10).count, 4)
+        with CaptureQueriesContext(connection) as queries:
+            EstimatedCountPaginator(today, 10).count
+        self.assertIn(f'LIMIT {ESTIMATE_COUNT_LIMIT}', queries[0]['sql'])
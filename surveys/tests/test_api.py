@@ -0,0 +1,96 @@
+"""Tests for the JSON respondent API."""
+import json
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from surveys.ingest import save_submissions, validate_batch
+from surveys.models import Invitation, Answer, PackedResponse
+from surveys.tallies import Tallies
+from surveys.tests.factories import make_survey
+
+# invitations, pending invitations, savepoint, answers, 4 tally statements, release; plus one claim per item
+QUERIES = 9
+
+
+class RespondentApiTests(TestCase):
+    def setUp(self) -> None:
+        self.invitation, data = make_survey(3)
+        self.survey = self.invitation.survey
+        self.open_id, self.mc_id, self.scale_id = data
+        self.answers = {self.open_id: 'prima', self.mc_id: int(data[self.mc_id]), self.scale_id: 0.7}
+
+    def post(self, responses) -> dict:
+        response = self.client.post('/api/responses/', json.dumps({'responses': responses}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def invitations(self, count: int) -> list[str]:
+        return [str(Invitation.objects.create(survey=self.survey).uuid) for _ in range(count)]
+
+    def test_schema_for_invitation(self) -> None:
+        self.client.get(f'/api/invitations/{self.invitation.uuid}/')
+        with self.assertNumQueries(1):
+            body = self.client.get(f'/api/invitations/{self.invitation.uuid}/').json()
+        self.assertEqual(body['survey']['id'], self.survey.pk)
+        self.assertFalse(body['responded'])
+        self.assertEqual([q['type'] for q in body['questions']], ['open', 'mc', 'scale'])
+        self.assertEqual([text for _, text in body['questions'][1]['options']], ['A', 'B'])
+
+    def test_batch_is_stored_with_per_item_status(self) -> None:
+        uuids = self.invitations(3)
+        earlier = (timezone.now() - timedelta(days=2)).isoformat()
+        body = self.post([
+            {'invitation': str(self.invitation.uuid), 'answers': self.answers, 'submitted_at': earlier},
+            {'invitation': uuids[0], 'answers': {**self.answers, self.scale_id: 0.75}},
+            {'invitation': uuids[1], 'answers': {**self.answers, self.mc_id: 0}},
+            {'invitation': uuids[2], 'answers': self.answers},
+            {'invitation': uuids[2], 'answers': self.answers},
+            {'invitation': 'geen-uuid', 'answers': self.answers},
+        ])
+        self.assertEqual(body['stored'], 2)
+        self.assertEqual(
+            [r['status'] for r in body['results']],
+            ['stored', 'invalid', 'invalid', 'stored', 'duplicate', 'unknown'],
+        )
+        self.assertEqual(set(body['results'][1]['errors']), {self.scale_id})
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.responded_at.isoformat(), earlier)
+        self.assertEqual(Answer.objects.count(), 6)
+        self.assertEqual(Tallies.from_database(self.survey), Tallies.from_stored(self.survey))
+        again = self.post([{'invitation': uuids[2], 'answers': self.answers}])
+        self.assertEqual(again['results'][0]['status'], 'duplicate')
+
+    def test_only_the_claims_grow_with_batch_size(self) -> None:
+        self.post([{'invitation': u, 'answers': self.answers} for u in self.invitations(1)])
+        for size in (2, 20):
+            items = [{'invitation': u, 'answers': self.answers} for u in self.invitations(size)]
+            with self.assertNumQueries(QUERIES + size):
+                self.assertEqual(self.post(items)['stored'], size)
+
+    def test_racing_batches_store_an_invitation_once(self) -> None:
+        # Both uploads pass validation before either one is stored.
+        items = [{'invitation': str(self.invitation.uuid), 'answers': self.answers}]
+        (_, first), (_, second) = validate_batch(items), validate_batch(items)
+        self.assertEqual(save_submissions(first), [self.invitation.pk])
+        self.assertEqual(save_submissions(second), [])
+        self.assertEqual(Answer.objects.count(), 3)
+        self.assertEqual(Tallies.from_database(self.survey), Tallies.from_stored(self.survey))
+
+    def test_racing_batches_on_packed_storage(self) -> None:
+        call_command('pack_answers', self.survey.pk, stdout=StringIO())
+        items = [{'invitation': str(self.invitation.uuid), 'answers': self.answers}]
+        (_, first), (_, second) = validate_batch(items), validate_batch(items)
+        save_submissions(first)
+        self.assertEqual(save_submissions(second), [])
+        self.assertEqual(PackedResponse.objects.count(), 1)
+
+    @override_settings(SURVEY_API_MAX_BATCH=2)
+    def test_malformed_and_oversized_bodies(self) -> None:
+        for body in ('nee', '{"responses": 1}', '[]', '{"responses": [1]}', json.dumps({'responses': [{}] * 3})):
+            response = self.client.post('/api/responses/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/responses/').status_code, 405)
+        self.assertEqual(self.post([{'invitation': str(self.invitation.uuid), 'answers': self.answers,
+                                     'submitted_at': '2999-01-01T00:00:00'}])['results'][0]['status'], 'invalid')
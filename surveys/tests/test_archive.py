@@ -0,0 +1,128 @@
+"""Tests for archiving closed surveys."""
+import csv
+import io
+import json
+import tempfile
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.test import TestCase, override_settings
+from surveys.archive import archive_path
+from surveys.models import Survey, Invitation, Answer, PackedResponse
+from surveys.schema import get_schema, schema_cache_key
+from surveys.tallies import Tallies
+from surveys.tests.factories import make_survey
+
+
+class ArchiveTests(TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(SURVEY_ARCHIVE_DIR=tmp.name, SURVEY_ANSWERS_PER_PAGE=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        invitation, self.data = make_survey(3)
+        self.survey = invitation.survey
+        self.survey.end_date = date.today() - timedelta(days=40)
+        self.survey.save()
+        for i in range(3):
+            self.client.post(f'/respond/{invitation.uuid}/', self.data)
+            invitation = Invitation.objects.create(survey=self.survey)
+        self.open_id = int(next(iter(self.data)))
+
+    def export(self, **params) -> list[list[str]]:
+        response = self.client.get(f'/survey/{self.survey.pk}/results/csv/', params)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def browse(self, query: str = '') -> list[tuple]:
+        rows = []
+        while query is not None:
+            response = self.client.get(f'/survey/{self.survey.pk}/results/?{query}')
+            rows += [(row['question'], row['value'], row['created_at']) for row in response.context['answers']]
+            query = response.context.get('next_query')
+        return rows
+
+    def snapshot(self) -> tuple:
+        self.survey.refresh_from_db()
+        return self.export(), self.export(layout='wide'), self.browse(), self.browse(f'question={self.open_id}')
+
+    def archive(self, days: int = 30) -> str:
+        out = io.StringIO()
+        call_command('archive_surveys', days=days, stdout=out)
+        self.survey.refresh_from_db()
+        return out.getvalue()
+
+    def test_archived_survey_reads_back_transparently(self) -> None:
+        before = self.snapshot()
+        since = Answer.objects.order_by('id')[4].id
+        incremental = self.export(since=since)
+        self.assertIn('4 uitnodigingen en 9 antwoorden gearchiveerd', self.archive())
+        self.assertIsNotNone(self.survey.archived_at)
+        self.assertTrue(archive_path(self.survey.pk).exists())
+        self.assertFalse(Invitation.objects.exists() or Answer.objects.exists())
+        self.assertEqual(len(self.browse()), 9)
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(self.export(since=since), incremental)
+        self.assertEqual(Tallies.from_database(self.survey), Tallies.from_stored(self.survey))
+
+    def test_restore_brings_rows_back_unchanged(self) -> None:
+        invitations = list(Invitation.objects.order_by('id').values_list('id', 'uuid', 'created_at', 'responded_at'))
+        answers = list(Answer.objects.order_by('id').values())
+        self.archive()
+        call_command('restore_survey', self.survey.pk, stdout=io.StringIO())
+        self.survey.refresh_from_db()
+        self.assertIsNone(self.survey.archived_at)
+        self.assertFalse(archive_path(self.survey.pk).exists())
+        self.assertEqual(list(Invitation.objects.order_by('id').values_list('id', 'uuid', 'created_at', 'responded_at')), invitations)
+        self.assertEqual(list(Answer.objects.order_by('id').values()), answers)
+
+    def test_packed_surveys_round_trip(self) -> None:
+        call_command('pack_answers', self.survey.pk, stdout=io.StringIO())
+        before = self.snapshot()
+        self.archive()
+        self.assertFalse(PackedResponse.objects.exists())
+        self.assertEqual(self.snapshot()[:2], before[:2])
+        call_command('restore_survey', self.survey.pk, stdout=io.StringIO())
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(PackedResponse.objects.count(), 3)
+
+    def test_archived_survey_refuses_new_rows(self) -> None:
+        self.archive()
+        self.assertEqual(self.client.get(f'/survey/{self.survey.pk}/invite/').status_code, 404)
+        self.assertEqual(self.client.post(f'/survey/{self.survey.pk}/invite/bulk/', {'count': 5, 'format': 'csv'}).status_code, 404)
+        # An invitation left over from before archiving, or written behind Django's back.
+        invitation = Invitation.objects.create(survey=self.survey)
+        self.assertEqual(self.client.get(f'/respond/{invitation.uuid}/').status_code, 410)
+        self.assertEqual(self.client.post(f'/respond/{invitation.uuid}/', self.data).status_code, 410)
+        body = {'responses': [{'invitation': str(invitation.uuid), 'answers': self.data}]}
+        response = self.client.post('/api/responses/', json.dumps(body), content_type='application/json')
+        self.assertEqual(response.json()['results'][0]['status'], 'closed')
+        self.assertFalse(Answer.objects.exists())
+        invitation.refresh_from_db()
+        self.assertIsNone(invitation.responded_at)
+
+    def test_schema_read_before_commit_is_dropped(self) -> None:
+        stale = [get_schema(self.survey)]
+
+        def read_old_rows(sender, instance, **kwargs) -> None:
+            # Another process still sees the survey as it was before the commit.
+            caches['surveys'].set(schema_cache_key(instance.pk), stale[0])
+        post_save.connect(read_old_rows, sender=Survey)
+        self.addCleanup(post_save.disconnect, read_old_rows, sender=Survey)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.archive()
+        stale[0] = get_schema(self.survey)
+        self.assertTrue(stale[0].archived)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('restore_survey', self.survey.pk, stdout=io.StringIO())
+        self.survey.refresh_from_db()
+        self.assertFalse(get_schema(self.survey).archived)
+
+    def test_recent_surveys_are_kept(self) -> None:
+        self.assertEqual(self.archive(days=60), '')
+        self.assertIsNone(self.survey.archived_at)
+        self.assertEqual(Answer.objects.count(), 9)
@@ -0,0 +1,92 @@
+"""Tests for the async views served by the ASGI entry point."""
+import asyncio
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from surveys.models import Answer
+from surveys.tests.factories import make_survey
+
+
+async def read_body(response) -> str:
+    return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+
+@override_settings(ROOT_URLCONF='surveypro.urls_async')
+class AsyncViewTests(TestCase):
+    def setUp(self) -> None:
+        self.invitation, self.data = make_survey(4)
+        self.survey = self.invitation.survey
+        self.user = User.objects.create_user('admin', 'a@example.com', 'pass', is_staff=True)
+
+    async def test_respond_stores_answers(self) -> None:
+        url = f'/respond/{self.invitation.uuid}/'
+        self.assertContains(await self.async_client.get(url), 'Verstuur')
+        response = await self.async_client.post(url, self.data)
+        self.assertTemplateUsed(response, 'surveys/thanks.html')
+        await self.invitation.arefresh_from_db()
+        self.assertIsNotNone(self.invitation.responded_at)
+        self.assertEqual(await Answer.objects.filter(invitation=self.invitation).acount(), 4)
+
+    async def test_archived_survey_refuses_responses(self) -> None:
+        self.survey.archived_at = timezone.now()
+        await self.survey.asave(update_fields=['archived_at'])
+        response = await self.async_client.post(f'/respond/{self.invitation.uuid}/', self.data)
+        self.assertEqual(response.status_code, 410)
+        self.assertFalse(await Answer.objects.aexists())
+
+    async def test_paged_survey(self) -> None:
+        self.survey.questions_per_page = 2
+        await self.survey.asave()
+        url = f'/respond/{self.invitation.uuid}/'
+        ids = list(self.data)
+        response = await self.async_client.post(url, {'page': '0', **{key: self.data[key] for key in ids[:2]}})
+        self.assertEqual(response.status_code, 302)
+        response = await self.async_client.post(url, {'page': '1', **{key: self.data[key] for key in ids[2:]}})
+        self.assertTemplateUsed(response, 'surveys/thanks.html')
+        self.assertEqual(await Answer.objects.filter(invitation=self.invitation).acount(), 4)
+
+    async def test_results_require_login(self) -> None:
+        response = await self.async_client.get(f'/survey/{self.survey.pk}/results/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/admin/login/', response['Location'])
+
+    async def test_results_and_csv_match_the_sync_views(self) -> None:
+        await self.async_client.post(f'/respond/{self.invitation.uuid}/', self.data)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f'/survey/{self.survey.pk}/results/')
+        self.assertContains(response, 'antwoord 0')
+        self.assertContains(response, 'Zoek in open antwoorden')
+
+        url = f'/survey/{self.survey.pk}/results/csv/?layout=wide'
+        response = await self.async_client.get(url)
+        self.assertTrue(response.is_async)
+        body = await read_body(response)
+        self.assertEqual(body, await sync_to_async(self.sync_csv)(url))
+        self.assertEqual(len(body.splitlines()), 2)
+
+        not_modified = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['X-Next-Cursor'], response['X-Next-Cursor'])
+
+    async def test_query_report_under_asgi(self) -> None:
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f'/survey/{self.survey.pk}/results/', headers={'x-debug-queries': '1'})
+        self.assertGreater(int(response['X-Query-Count']), 0)
+
+    @override_settings(DEBUG=True)
+    async def test_no_query_report_for_anonymous_users(self) -> None:
+        response = await self.async_client.get(f'/respond/{self.invitation.uuid}/', headers={'x-debug-queries': '1'})
+        self.assertNotIn('X-Query-Count', response)
+
+    def sync_csv(self, url: str) -> str:
+        self.client.force_login(self.user)
+        with self.settings(ROOT_URLCONF='surveypro.urls'):
+            return b''.join(self.client.get(url).streaming_content).decode()
+
+    async def test_concurrent_downloads_share_the_event_loop(self) -> None:
+        await self.async_client.aforce_login(self.user)
+        url = f'/survey/{self.survey.pk}/results/csv/'
+        responses = await asyncio.gather(*(self.async_client.get(url) for _ in range(5)))
+        bodies = {await read_body(response) for response in responses}
+        self.assertEqual(len(bodies), 1)
@@ -0,0 +1,40 @@
+"""Smoke test for the bench command."""
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from surveys.bench import percentile
+from surveys.models import Survey
+
+
+class BenchCommandTests(TransactionTestCase):
+    def test_reports_every_endpoint_as_json(self) -> None:
+        out = StringIO()
+        call_command('bench', '--questions', 6, '--respondents', 4, '--invitations', 2500, '--reads', 2,
+                     '--concurrency', 1, '--json', '-', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['endpoints']), {'respond_get', 'respond_post', 'results', 'results_csv'})
+        self.assertEqual(report['invitations']['count'], 2500)
+        self.assertGreater(report['invitations']['per_second'], 0)
+        post = report['endpoints']['respond_post']
+        self.assertEqual((post['requests'], post['errors']), (4, 0))
+        self.assertGreater(post['queries']['mean'], 0)
+        self.assertFalse(Survey.objects.exists())
+
+    def test_asgi_mode_drives_the_async_views(self) -> None:
+        out = StringIO()
+        call_command('bench', '--asgi', '--questions', 6, '--respondents', 4, '--reads', 2,
+                     '--concurrency', 1, '--json', '-', stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['server'], 'asgi')
+        for name, row in report['endpoints'].items():
+            self.assertEqual(row['errors'], 0, name)
+        self.assertGreater(report['endpoints']['respond_post']['queries']['mean'], 0)
+        self.assertFalse(Survey.objects.exists())
+
+    def test_percentile(self) -> None:
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
@@ -0,0 +1,117 @@
+"""Concurrency tests for the production SQLite profile."""
+import sqlite3
+import threading
+import time
+from unittest import mock
+from django.db import connection, connections
+from django.test import Client, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from surveys.db import write_transaction
+from surveys.models import Survey, Invitation, Answer
+from surveys.tallies import Tallies, rebuild_tallies
+from surveys.tests.factories import make_survey
+
+
+class ConcurrentSubmissionTests(TransactionTestCase):
+    """Run with ``DB_PROFILE=production`` so the test database is a file."""
+    THREADS = 32
+    QUESTIONS = 12
+
+    def setUp(self) -> None:
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            self.skipTest('needs a file-based SQLite test database (DB_PROFILE=production)')
+
+    def test_parallel_submissions_without_lock_errors(self) -> None:
+        invitation, data = make_survey(self.QUESTIONS)
+        survey = invitation.survey
+        invitations = [invitation] + [Invitation.objects.create(survey=survey) for _ in range(self.THREADS - 1)]
+        barrier = threading.Barrier(self.THREADS)
+        statuses, errors = [], []
+
+        def submit(inv: Invitation) -> None:
+            try:
+                client = Client()
+                client.get(f'/respond/{inv.uuid}/')
+                barrier.wait()
+                statuses.append(client.post(f'/respond/{inv.uuid}/', data).status_code)
+            except Exception as exc:  # noqa: BLE001 - collected for the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(inv,)) for inv in invitations]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(statuses, [200] * self.THREADS)
+        self.assertEqual(Answer.objects.filter(invitation__survey=survey).count(), self.THREADS * self.QUESTIONS)
+        self.assertFalse(Invitation.objects.filter(survey=survey, responded_at__isnull=True).exists())
+        self.assertEqual(Tallies.from_stored(survey), Tallies.from_database(survey))
+
+
+class WriteTransactionTests(TransactionTestCase):
+    def test_starts_with_the_write_lock(self) -> None:
+        with CaptureQueriesContext(connection) as queries, write_transaction():
+            with write_transaction():
+                Survey.objects.count()
+        self.assertEqual(queries.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+        self.assertNotIn('_start_transaction_under_autocommit', vars(connections['default']))
+
+    def test_read_then_write_survives_a_commit_from_another_process(self) -> None:
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            self.skipTest('needs a file-based SQLite test database (DB_PROFILE=production)')
+        invitation, _ = make_survey(1)
+        survey = invitation.survey
+        started = threading.Event()
+
+        def other_process() -> None:
+            started.wait()
+            # A separate connection that does not share this process's write lock.
+            with sqlite3.connect(connection.settings_dict['NAME'], timeout=30) as other:
+                other.execute('UPDATE surveys_survey SET title = ? WHERE id = ?', ['ander proces', survey.pk])
+            other.close()
+
+        thread = threading.Thread(target=other_process)
+        thread.start()
+        try:
+            with write_transaction():
+                Survey.objects.count()
+                started.set()
+                time.sleep(0.3)
+                Survey.objects.filter(pk=survey.pk).update(description='dit proces')
+        finally:
+            started.set()
+            thread.join()
+        survey.refresh_from_db()
+        self.assertEqual((survey.title, survey.description), ('ander proces', 'dit proces'))
+
+    def test_answers_stored_during_a_rebuild_are_kept(self) -> None:
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            self.skipTest('needs a file-based SQLite test database (DB_PROFILE=production)')
+        invitation, data = make_survey(3)
+        survey = invitation.survey
+        Client().post(f'/respond/{invitation.uuid}/', data)
+        late = Invitation.objects.create(survey=survey)
+        from_database = Tallies.from_database
+        threads = []
+
+        def submit() -> None:
+            Client().post(f'/respond/{late.uuid}/', data)
+            connection.close()
+
+        def count_then_submit(survey: Survey) -> Tallies:
+            counted = from_database(survey)
+            threads.append(threading.Thread(target=submit))
+            threads[0].start()
+            time.sleep(0.3)
+            return counted
+
+        with mock.patch.object(Tallies, 'from_database', count_then_submit):
+            rebuild_tallies(survey)
+        threads[0].join()
+        late.refresh_from_db()
+        self.assertIsNotNone(late.responded_at)
+        self.assertEqual(Tallies.from_stored(survey), Tallies.from_database(survey))
@@ -0,0 +1,90 @@
+"""Tests for the per-survey question, invitation and response counters."""
+import tempfile
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from surveys.archive import archive_survey, restore_survey
+from surveys.counters import counter_drift
+from surveys.ingest import Submission, save_submissions
+from surveys.models import Survey, Question, Invitation
+from surveys.tests.factories import make_survey
+
+
+class CounterTests(TestCase):
+    def setUp(self) -> None:
+        invitation, self.data = make_survey(3)
+        self.survey = invitation.survey
+        self.client.post(f'/respond/{invitation.uuid}/', self.data)
+
+    def counts(self) -> tuple[int, int, int]:
+        self.survey.refresh_from_db()
+        return self.survey.question_count, self.survey.invitation_count, self.survey.response_count
+
+    def test_counts_follow_questions_invitations_and_responses(self) -> None:
+        self.assertEqual(self.counts(), (3, 1, 1))
+        Invitation.objects.bulk_create([Invitation(survey=self.survey) for _ in range(4)])
+        Question.objects.filter(survey=self.survey, number=1).delete()
+        self.assertEqual(self.counts(), (2, 5, 1))
+        self.assertEqual(self.survey.response_rate, 20.0)
+        pending = Invitation.objects.filter(survey=self.survey, responded_at__isnull=True)[:2]
+        save_submissions(Submission(i.pk, self.data, timezone.now()) for i in pending)
+        Invitation.objects.filter(survey=self.survey, responded_at__isnull=True).first().delete()
+        self.assertEqual(self.counts(), (2, 4, 3))
+        self.assertEqual(counter_drift(self.survey), {})
+
+    def test_moving_rows_to_another_survey(self) -> None:
+        invitation, _ = make_survey(2)
+        other = invitation.survey
+        question = self.survey.questions.get(number=1)
+        question.survey = other
+        question.save()
+        responded = Invitation.objects.get(survey=self.survey)
+        Invitation.objects.filter(pk=responded.pk).update(survey=other, responded_at=None)
+        self.assertEqual(self.counts(), (2, 0, 0))
+        other.refresh_from_db()
+        self.assertEqual((other.question_count, other.invitation_count, other.response_count), (3, 2, 0))
+        self.assertEqual(counter_drift(other), {})
+
+    def test_saving_a_stale_instance_keeps_the_counters(self) -> None:
+        stale = Survey.objects.get(pk=self.survey.pk)
+        Invitation.objects.create(survey=self.survey)
+        stale.title = 'nieuw'
+        stale.save()
+        self.assertEqual(self.counts(), (3, 2, 1))
+
+    def test_publish_rule_uses_question_count(self) -> None:
+        self.survey.is_published = True
+        with self.assertNumQueries(1):
+            self.assertRaises(ValidationError, self.survey.full_clean)
+
+    def test_archive_round_trip_keeps_counts(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SURVEY_ARCHIVE_DIR=tmp):
+            archive_survey(self.survey)
+            self.assertEqual(self.counts(), (3, 1, 1))
+            self.assertEqual(counter_drift(self.survey), {})
+            restore_survey(self.survey)
+        self.assertEqual(self.counts(), (3, 1, 1))
+
+    def test_reconcile_repairs_drift(self) -> None:
+        Survey.objects.filter(pk=self.survey.pk).update(invitation_count=7, response_count=0)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_counters', '--check', stdout=StringIO())
+        out = StringIO()
+        call_command('reconcile_counters', self.survey.pk, stdout=out)
+        self.assertIn('invitation_count 7 != 1', out.getvalue())
+        self.assertEqual(self.counts(), (3, 1, 1))
+        call_command('reconcile_counters', '--check', stdout=StringIO())
+
+    def test_list_shows_counters_in_one_query(self) -> None:
+        for _ in range(5):
+            make_survey(2)
+        self.client.force_login(User.objects.create_user('admin', 'a@example.com', 'pass'))
+        self.client.get('/surveys/')
+        # Session, user and the survey list itself.
+        with self.assertNumQueries(3):
+            response = self.client.get('/surveys/')
+        self.assertContains(response, '<td>100,0%</td>', html=True)
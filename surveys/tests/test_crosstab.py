@@ -0,0 +1,81 @@
+"""Tests for cross-tab reports."""
+import io
+import pickle
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from surveys.crosstab import RespondentSets, get_respondent_sets
+from surveys.models import Survey, Invitation, Answer, Option
+from surveys.schema import get_schema
+from surveys.tests.factories import make_survey
+
+
+class CrossTabTests(TestCase):
+    def setUp(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        invitation, self.data = make_survey(3)
+        self.survey = invitation.survey
+        self.open_id, self.mc_id, self.scale_id = (int(k) for k in self.data)
+        self.a, self.b = Option.objects.filter(question_id=self.mc_id).order_by('id').values_list('id', flat=True)
+        for option, scale in [(self.a, '0.2'), (self.a, '0.4'), (self.b, '1.0'), (self.b, '0.5'), (self.b, '0.5')]:
+            self.respond(option, scale)
+
+    def respond(self, option: int, scale: str) -> None:
+        invitation = Invitation.objects.create(survey=self.survey)
+        self.client.post(f'/respond/{invitation.uuid}/', {**self.data, str(self.mc_id): option, str(self.scale_id): scale})
+
+    def report(self, target: int) -> dict:
+        response = self.client.get(f'/survey/{self.survey.pk}/crosstab/json/', {'segment': self.mc_id, 'target': target})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_scale_by_option(self) -> None:
+        report = self.report(self.scale_id)
+        self.assertEqual(report['columns'][0], '0.0')
+        a, b, total = report['rows']
+        self.assertEqual((a['label'], a['respondents'], a['mean']), ('A', 2, 0.3))
+        self.assertEqual((b['label'], b['respondents'], b['mean']), ('B', 3, 0.67))
+        self.assertEqual(b['counts'][5], 2)
+        self.assertEqual((total['option_id'], total['respondents']), (None, 5))
+
+    def test_sets_are_updated_incrementally(self) -> None:
+        self.report(self.open_id)
+        with self.assertNumQueries(4):  # session, user, survey, answers after the watermark
+            self.report(self.open_id)
+        self.respond(self.a, '0.9')
+        a = self.report(self.scale_id)['rows'][0]
+        self.assertEqual((a['respondents'], a['counts'][9]), (3, 1))
+        self.assertEqual(self.report(self.open_id)['rows'][2]['counts'], [6])
+
+    def test_matches_a_fresh_build_after_conversions(self) -> None:
+        expected = self.report(self.scale_id)
+        call_command('pack_answers', self.survey.pk, stdout=io.StringIO())
+        self.assertEqual(self.report(self.scale_id), expected)
+        fresh = RespondentSets(self.survey.pk)
+        fresh.update(get_schema(self.survey))
+        self.assertEqual(get_respondent_sets(get_schema(self.survey), 0).bitmaps, fresh.bitmaps)
+
+    def test_bitmaps_are_as_wide_as_the_respondents(self) -> None:
+        sets = RespondentSets(1)
+        sets.add(1, 1, [10**9, 12])
+        sets.add(1, 2, [7, 12])
+        self.assertEqual((sets.members(1, 1), sets.members(1, 2)), (0b011, 0b110))
+        restored = pickle.loads(pickle.dumps(sets))
+        restored.add(1, 1, [7])
+        self.assertEqual((restored.members(1, 1), len(restored.invitations)), (0b111, 3))
+
+    def test_deleted_answers_leave_the_sets(self) -> None:
+        self.report(self.scale_id)
+        Invitation.objects.filter(answers__option=self.a).first().delete()
+        Answer.objects.filter(option=self.b).first().delete()
+        a, b, total = self.report(self.scale_id)['rows']
+        self.assertEqual((a['respondents'], b['respondents'], total['respondents']), (1, 2, 4))
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).answer_deletions, 4)
+
+    def test_invalid_selection(self) -> None:
+        url = f'/survey/{self.survey.pk}/crosstab/json/'
+        self.assertEqual(self.client.get(url, {'segment': self.scale_id, 'target': self.mc_id}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'segment': self.mc_id, 'target': self.mc_id}).status_code, 400)
+        page = self.client.get(f'/survey/{self.survey.pk}/crosstab/', {'segment': self.mc_id, 'target': self.scale_id})
+        self.assertContains(page, 'Alle respondenten')
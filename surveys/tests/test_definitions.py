@@ -0,0 +1,120 @@
+"""Tests for importing and cloning survey definitions."""
+import json
+import tempfile
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from surveys.definitions import build_definition, clone_survey, import_survey
+from surveys.models import Survey, Question, Option
+from surveys.schema import get_schema
+from surveys.tests.factories import make_survey
+
+
+def definition(questions: int = 3, **survey) -> dict:
+    return {
+        'title': 'Jaarenquête', 'description': 'd', 'start_date': '2025-01-01', 'end_date': '2025-12-31',
+        **survey,
+        'questions': [
+            {'title': f'v{i}', 'text': 't', 'type': 'mc', 'options': ['Ja', 'Nee']} if i % 2
+            else {'title': f'v{i}', 'text': 't', 'type': 'open'}
+            for i in range(questions)
+        ],
+    }
+
+
+class ImportTests(TestCase):
+    def test_import_json_definition(self) -> None:
+        survey = import_survey(definition(4))
+        self.assertEqual(survey.start_date, date(2025, 1, 1))
+        schema = get_schema(survey)
+        self.assertEqual([q.number for q in schema.questions], [1, 2, 3, 4])
+        self.assertEqual([text for _, text in schema.questions[1].choices], ['Ja', 'Nee'])
+
+    def test_errors_are_reported_before_writing(self) -> None:
+        data = definition(3)
+        data['questions'][0]['type'] = 'foto'
+        data['questions'][1]['options'] = []
+        data['questions'][2]['number'] = 2
+        with self.assertRaises(ValidationError) as raised:
+            import_survey(data)
+        self.assertEqual(len(raised.exception.messages), 3)
+        self.assertTrue(all(m.startswith('Vraag ') for m in raised.exception.messages))
+        self.assertFalse(Survey.objects.exists())
+
+    def test_options_as_separated_string(self) -> None:
+        data = definition(2)
+        data['questions'][1]['options'] = 'Ja|Nee'
+        schema = get_schema(import_survey(data))
+        self.assertEqual([text for _, text in schema.questions[1].choices], ['Ja', 'Nee'])
+        data['questions'][1]['options'] = {'Ja': 1}
+        with self.assertRaisesMessage(ValidationError, 'opties moeten een lijst zijn'):
+            build_definition(data)
+
+    def test_publication_rule_checked_up_front(self) -> None:
+        with self.assertRaisesMessage(ValidationError, 'minimaal 10 vragen'):
+            build_definition(definition(9, is_published=True))
+        self.assertTrue(import_survey(definition(10, is_published=True)).is_published)
+
+    def test_command_imports_csv(self) -> None:
+        csv = 'number,title,text,type,options\n1,Leeftijd,t,mc,jong|oud\n2,Toelichting,t,open,\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'vragen.csv'
+            path.write_text(csv)
+            out = StringIO()
+            call_command('import_survey', str(path), '--title', 'CSV', '--description', 'd',
+                         '--start-date', '2025-01-01', '--end-date', '2025-02-01', stdout=out)
+            self.assertIn('2 vragen', out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command('import_survey', str(path), stdout=StringIO())
+        self.assertEqual(Option.objects.filter(question__survey__title='CSV').count(), 2)
+
+    def test_staff_view(self) -> None:
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        upload = SimpleUploadedFile('enquete.json', json.dumps(definition(2)).encode())
+        response = self.client.post('/survey/import/', {'definition': upload, 'title': 'Nieuw'})
+        survey = Survey.objects.get()
+        self.assertRedirects(response, f'/survey/{survey.pk}/questions/', fetch_redirect_response=False)
+        self.assertEqual(survey.title, 'Nieuw')
+
+
+class CloneTests(TestCase):
+    def test_clone_copies_questions_and_options(self) -> None:
+        invitation, _ = make_survey(6)
+        copy = clone_survey(invitation.survey)
+        self.assertEqual(copy.title, 's (kopie)')
+        original, cloned = get_schema(invitation.survey), get_schema(copy)
+        self.assertEqual(
+            [(q.number, q.title, [t for _, t in q.choices]) for q in original.questions],
+            [(q.number, q.title, [t for _, t in q.choices]) for q in cloned.questions],
+        )
+        self.assertFalse(copy.invitations.exists())
+
+    def test_clone_query_count_is_constant(self) -> None:
+        counts = []
+        for size in (6, 60):
+            invitation, _ = make_survey(size)
+            with CaptureQueriesContext(connection) as queries:
+                clone_survey(invitation.survey)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_clone_of_published_survey_is_unpublished(self) -> None:
+        invitation, _ = make_survey(3)
+        Survey.objects.filter(pk=invitation.survey_id).update(is_published=True)
+        invitation.survey.refresh_from_db()
+        self.assertFalse(clone_survey(invitation.survey).is_published)
+
+    def test_clone_view(self) -> None:
+        self.client.force_login(User.objects.create_user('admin'))
+        invitation, _ = make_survey(3)
+        response = self.client.post(f'/survey/{invitation.survey_id}/clone/')
+        copy = Survey.objects.latest('pk')
+        self.assertRedirects(response, f'/survey/{copy.pk}/edit/', fetch_redirect_response=False)
+        self.assertEqual(Question.objects.filter(survey=copy).count(), 3)
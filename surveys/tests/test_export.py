@@ -0,0 +1,98 @@
+"""Tests for the CSV export."""
+import csv
+import io
+from django.contrib.auth.models import User
+from django.test import TestCase
+from surveys.models import Invitation, Answer
+from surveys.tests.factories import make_survey
+
+
+class ResultsCsvTests(TestCase):
+    def setUp(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        invitation, self.data = make_survey(3)
+        self.survey = invitation.survey
+        self.open_id = str(self.survey.questions.get(number=1).id)
+        self.client.post(f'/respond/{invitation.uuid}/', {**self.data, self.open_id: 'ja, "zeker"\nnieuwe regel'})
+        self.url = f'/survey/{self.survey.pk}/results/csv/'
+
+    def download(self, **params) -> list[list[str]]:
+        response = self.client.get(self.url, params)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def respond(self, count: int) -> None:
+        for _ in range(count):
+            invitation = Invitation.objects.create(survey=self.survey)
+            self.client.post(f'/respond/{invitation.uuid}/', self.data)
+
+    def test_long_layout_quotes_values(self) -> None:
+        rows = self.download()
+        self.assertEqual(rows[0], ['question', 'answer', 'timestamp'])
+        self.assertEqual(rows[1][:2], ['q0', 'ja, "zeker"\nnieuwe regel'])
+        self.assertEqual(rows[2][:2], ['q1', 'B'])
+        self.assertEqual(rows[3][:2], ['q2', '0.5'])
+
+    def test_wide_layout_has_one_row_per_respondent(self) -> None:
+        self.respond(2)
+        rows = self.download(layout='wide')
+        self.assertEqual(rows[0][2:], ['1. q0', '2. q1', '3. q2'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][2:], ['ja, "zeker"\nnieuwe regel', 'B', '0.5'])
+        self.assertEqual(rows[2][2:], ['antwoord 0', 'B', '0.5'])
+
+    def test_query_count_does_not_grow_with_answers(self) -> None:
+        def export(layout: str) -> None:
+            self.client.get(self.url)
+            with self.assertNumQueries(5):  # session, user, survey, watermark, answers
+                response = self.client.get(self.url, {'layout': layout})
+                b''.join(response.streaming_content)
+        for layout in ('long', 'wide'):
+            with self.subTest(layout=layout):
+                export(layout)
+                self.respond(5)
+                export(layout)
+
+    def test_unknown_layout(self) -> None:
+        self.assertEqual(self.client.get(self.url, {'layout': 'pivot'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'since': 'gisteren'}).status_code, 400)
+
+    def test_incremental_pull(self) -> None:
+        first = self.client.get(self.url)
+        cursor = first['X-Next-Cursor']
+        self.assertEqual(len(self.download()), 4)
+        self.respond(2)
+        rows = self.download(since=cursor)
+        self.assertEqual([row[:2] for row in rows[1:]], [['q0', 'antwoord 0'], ['q1', 'B'], ['q2', '0.5']] * 2)
+        wide = self.download(since=cursor, layout='wide')
+        self.assertEqual(len(wide), 3)
+        nothing_new = self.client.get(self.url, {'since': self.client.get(self.url)['X-Next-Cursor']})
+        self.assertEqual(len(b''.join(nothing_new.streaming_content).splitlines()), 1)
+
+    def test_unchanged_window_is_not_modified(self) -> None:
+        response = self.client.get(self.url)
+        tag, cursor = response['ETag'], response['X-Next-Cursor']
+        repeat = self.client.get(self.url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['X-Next-Cursor'], cursor)
+        self.respond(1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=tag).status_code, 200)
+        question = self.survey.questions.get(number=1)
+        question.title = 'Hernoemd'
+        question.save()
+        tag = self.client.get(self.url)['ETag']
+        question.title = 'Nog eens'
+        question.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=tag).status_code, 200)
+
+    def test_deleted_or_edited_answers_change_the_tag(self) -> None:
+        self.respond(1)
+        tag = self.client.get(self.url)['ETag']
+        Answer.objects.filter(question_id=self.open_id).order_by('id').first().delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 200)
+        answer = Answer.objects.get(question_id=self.open_id)
+        answer.text = 'gewijzigd'
+        answer.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
@@ -0,0 +1,85 @@
+"""Tests for bulk invitation creation."""
+import csv
+import io
+import json
+from datetime import date
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from surveys.invitations import create_invitations
+from surveys.models import Survey, Invitation
+
+
+class BulkInvitationTests(TestCase):
+    def setUp(self) -> None:
+        self.survey = Survey.objects.create(title='s', description='d', start_date=date.today(), end_date=date.today())
+
+    def test_command_writes_links(self) -> None:
+        out, err = io.StringIO(), io.StringIO()
+        call_command('create_invitations', self.survey.pk, 25, '--chunk-size', 10,
+                     '--base-url', 'https://enquete.example/', stdout=out, stderr=err)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['uuid', 'link'])
+        self.assertEqual(len(rows), 26)
+        self.assertEqual(Invitation.objects.filter(survey=self.survey).count(), 25)
+        uuid, link = rows[1]
+        self.assertTrue(Invitation.objects.filter(uuid=uuid).exists())
+        self.assertEqual(link, f'https://enquete.example/respond/{uuid}/')
+        self.assertIn('per seconde', err.getvalue())
+
+    def test_view_streams_jsonl_in_chunks(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        response = self.client.post(f'/survey/{self.survey.pk}/invite/bulk/', {'count': 2500, 'format': 'jsonl'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        # The whole campaign exists before the first line is sent.
+        self.assertEqual(Invitation.objects.filter(survey=self.survey).count(), 2500)
+        with CaptureQueriesContext(connection) as queries:
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        # Only reads, one per chunk of INVITATION_CHUNK_SIZE invitations.
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(all(q['sql'].startswith('SELECT') for q in queries.captured_queries))
+        self.assertEqual(len(lines), 2500)
+        first = json.loads(lines[0])
+        self.assertEqual(first['link'], f"http://testserver/respond/{first['uuid']}/")
+        self.assertEqual(Invitation.objects.filter(survey=self.survey).count(), 2500)
+
+    def test_broken_download_keeps_the_campaign(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        response = self.client.post(f'/survey/{self.survey.pk}/invite/bulk/', {'count': 2500, 'format': 'csv'})
+        # Abandon the download. Closing the response would also close the
+        # test database connection when it is a file (DB_PROFILE=production).
+        next(iter(response.streaming_content))
+        del response
+        self.assertEqual(Invitation.objects.filter(survey=self.survey).count(), 2500)
+
+    def test_view_sends_large_campaigns_to_the_command(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        response = self.client.post(f'/survey/{self.survey.pk}/invite/bulk/', {'count': 10_001, 'format': 'csv'})
+        self.assertContains(response, 'create_invitations')
+        self.assertFalse(Invitation.objects.exists())
+
+    def test_failed_chunk_removes_the_committed_ones(self) -> None:
+        bulk_create = Invitation.objects.bulk_create
+        calls = []
+
+        def fail_third(chunk):
+            calls.append(len(chunk))
+            if len(calls) == 3:
+                raise RuntimeError('schijf vol')
+            return bulk_create(chunk)
+        other = Invitation.objects.create(survey=self.survey)
+        with mock.patch.object(Invitation.objects, 'bulk_create', fail_third), self.assertRaises(RuntimeError):
+            create_invitations(self.survey, 25, chunk_size=10)
+        self.assertEqual(calls, [10, 10, 5])
+        self.assertEqual(list(Invitation.objects.all()), [other])
+
+    def test_view_requires_login(self) -> None:
+        response = self.client.post(f'/survey/{self.survey.pk}/invite/bulk/', {'count': 1, 'format': 'csv'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Invitation.objects.exists())
@@ -0,0 +1,64 @@
+"""Tests for request metrics and the Prometheus endpoint."""
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from surveys.metrics import Histogram, QueryRecorder, registry
+from surveys.models import Question
+from surveys.tests.factories import make_survey
+
+
+class MetricsTests(TestCase):
+    def setUp(self) -> None:
+        registry.reset()
+        self.invitation, self.data = make_survey(6)
+        self.staff = User.objects.create_user('staff', 'a@example.com', 'pass', is_staff=True)
+
+    def test_histogram_buckets_are_cumulative(self) -> None:
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 7):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [('1', 2), ('5', 3), ('+Inf', 4)])
+        self.assertEqual((histogram.count, histogram.sum), (4, 11.0))
+
+    def test_recorder_reports_duplicated_statements(self) -> None:
+        recorder = QueryRecorder(keep_sql=True)
+        with connection.execute_wrapper(recorder):
+            for question in Question.objects.filter(survey=self.invitation.survey):
+                list(question.options.all())
+        self.assertEqual(recorder.count, 7)
+        [(sql, n)] = recorder.duplicates()
+        self.assertEqual(n, 6)
+        self.assertIn('surveys_option', sql)
+
+    def test_metrics_endpoint_exposes_per_view_histograms(self) -> None:
+        self.client.get(f'/respond/{self.invitation.uuid}/')
+        self.client.post(f'/respond/{self.invitation.uuid}/', self.data)
+        self.client.login(username='staff', password='pass')
+        response = self.client.get('/metrics/')
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE surveypro_request_latency_seconds histogram', body)
+        self.assertIn('surveypro_request_latency_seconds_count{view="respond"} 2', body)
+        self.assertIn('surveypro_request_sql_queries_bucket{view="respond",le="+Inf"} 2', body)
+        self.assertIn('surveypro_request_sql_seconds_sum{view="respond"}', body)
+
+    def test_metrics_endpoint_requires_login(self) -> None:
+        self.assertEqual(self.client.get('/metrics/').status_code, 302)
+
+    def test_streaming_response_is_measured_when_exhausted(self) -> None:
+        self.client.login(username='staff', password='pass')
+        response = self.client.get(f'/survey/{self.invitation.survey_id}/results/csv/')
+        self.assertNotIn('view="results_csv"', registry.render())
+        b''.join(response.streaming_content)
+        self.assertIn('surveypro_request_latency_seconds_count{view="results_csv"} 1', registry.render())
+
+    @override_settings(DEBUG=True)
+    def test_duplicate_query_report_for_staff(self) -> None:
+        self.client.login(username='staff', password='pass')
+        response = self.client.get('/surveys/', HTTP_X_DEBUG_QUERIES='1')
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIsInstance(json.loads(response['X-Duplicate-Queries']), list)
+        self.client.logout()
+        anonymous = self.client.get(f'/respond/{self.invitation.uuid}/', HTTP_X_DEBUG_QUERIES='1')
+        self.assertNotIn('X-Query-Count', anonymous)
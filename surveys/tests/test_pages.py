@@ -0,0 +1,99 @@
+"""Tests for paged response forms."""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from surveys.models import Answer, PartialResponse
+from surveys.pages import load_progress, save_page
+from surveys.tests.factories import make_survey
+
+
+def page_data(data: dict[str, str], question_ids: list[str], page: int, **extra: str) -> dict[str, str]:
+    return {'page': str(page), **{key: data[key] for key in question_ids}, **extra}
+
+
+class PagedResponseTests(TestCase):
+    def setUp(self) -> None:
+        self.invitation, self.data = make_survey(7)
+        self.survey = self.invitation.survey
+        self.survey.questions_per_page = 3
+        self.survey.save()
+        self.url = f'/respond/{self.invitation.uuid}/'
+        self.ids = list(self.data)
+
+    def test_pages_are_answered_in_turn(self) -> None:
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Pagina 1 van 3')
+        self.assertEqual(list(response.context['form'].fields), self.ids[:3])
+
+        response = self.client.post(self.url, page_data(self.data, self.ids[:3], 0))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        progress = PartialResponse.objects.get(invitation=self.invitation)
+        self.assertEqual((progress.page, sorted(progress.values)), (1, sorted(self.ids[:3])))
+
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Pagina 2 van 3')
+        self.assertEqual(list(response.context['form'].fields), self.ids[3:6])
+        self.client.post(self.url, page_data(self.data, self.ids[3:6], 1))
+
+        response = self.client.post(self.url, page_data(self.data, self.ids[6:], 2))
+        self.assertTemplateUsed(response, 'surveys/thanks.html')
+        self.invitation.refresh_from_db()
+        self.assertIsNotNone(self.invitation.responded_at)
+        self.assertEqual(Answer.objects.filter(invitation=self.invitation).count(), 7)
+        self.assertFalse(PartialResponse.objects.exists())
+
+    def test_previous_page_shows_earlier_answers(self) -> None:
+        self.client.post(self.url, page_data(self.data, self.ids[:3], 0))
+        response = self.client.post(self.url, {'page': '1', 'previous': ''})
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        form = self.client.get(self.url).context['form']
+        self.assertEqual(form.initial[self.ids[0]], 'antwoord 0')
+
+    def test_stale_page_is_not_stored(self) -> None:
+        self.client.post(self.url, page_data(self.data, self.ids[:3], 0))
+        response = self.client.post(self.url, page_data(self.data, self.ids[:3], 0))
+        self.assertContains(response, 'Pagina 2 van 3')
+        self.assertEqual(PartialResponse.objects.get().page, 1)
+
+    def test_invalid_page_keeps_progress(self) -> None:
+        response = self.client.post(self.url, {'page': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertFalse(PartialResponse.objects.exists())
+
+    def test_double_submit_of_first_page(self) -> None:
+        values = {key: self.data[key] for key in self.ids[:3]}
+        first, second = load_progress(self.invitation), load_progress(self.invitation)
+        save_page(first, values)
+        save_page(second, values)
+        self.assertEqual(PartialResponse.objects.get().page, 1)
+
+    def test_questions_skipped_by_a_new_page_size_are_asked(self) -> None:
+        self.client.post(self.url, page_data(self.data, self.ids[:3], 0))
+        self.survey.questions_per_page = 5
+        self.survey.save()
+        # Page 2 now starts at the sixth question; the fourth and fifth were never shown.
+        response = self.client.post(self.url, page_data(self.data, self.ids[5:], 1))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertFalse(Answer.objects.exists())
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Pagina 1 van 2')
+        self.assertEqual(response.context['form'].initial[self.ids[0]], 'antwoord 0')
+        self.client.post(self.url, page_data(self.data, self.ids[:5], 0))
+        response = self.client.post(self.url, page_data(self.data, self.ids[5:], 1))
+        self.assertTemplateUsed(response, 'surveys/thanks.html')
+        self.assertEqual(Answer.objects.filter(invitation=self.invitation).count(), 7)
+
+    def test_page_cost_does_not_grow_with_survey_size(self) -> None:
+        counts = []
+        for size in (12, 150):
+            invitation, data = make_survey(size)
+            invitation.survey.questions_per_page = 6
+            invitation.survey.save()
+            url = f'/respond/{invitation.uuid}/'
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, page_data(data, list(data)[:6], 0))
+            self.assertEqual(response.status_code, 302)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,58 @@
+"""Tests for the on-demand request profiler."""
+import pstats
+import tempfile
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from surveys.profiling import list_profiles, profile_dir
+from surveys.tests.factories import make_survey
+
+
+class ProfilingTests(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        overrides = override_settings(SURVEY_PROFILE_DIR=self.tmp.name, SURVEY_PROFILE_KEEP=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.invitation, _ = make_survey(3)
+        self.survey = self.invitation.survey
+        User.objects.create_user('staff', 'a@example.com', 'pass', is_staff=True)
+        self.client.login(username='staff', password='pass')
+
+    def test_flagged_request_is_profiled(self) -> None:
+        response = self.client.get(f'/survey/{self.survey.pk}/results/', HTTP_X_PROFILE='1')
+        name = response['X-Profile-Id']
+        self.assertTrue(name.endswith('_results.pstats'))
+        stats = pstats.Stats(str(profile_dir() / name))
+        self.assertTrue(any(func[2] == 'results' for func in stats.stats))
+
+    def test_unflagged_and_non_staff_requests_are_not_profiled(self) -> None:
+        self.client.get(f'/survey/{self.survey.pk}/results/')
+        User.objects.create_user('user', 'b@example.com', 'pass')
+        self.client.login(username='user', password='pass')
+        self.client.get(f'/survey/{self.survey.pk}/results/?profile=1')
+        self.assertEqual(list_profiles(), [])
+
+    @override_settings(SURVEY_PROFILE_SAMPLE_RATE=0.0)
+    def test_sample_rate_skips_requests(self) -> None:
+        response = self.client.get(f'/survey/{self.survey.pk}/results/?profile=1')
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_streaming_export_is_profiled_once_consumed(self) -> None:
+        response = self.client.get(f'/survey/{self.survey.pk}/results/csv/?profile=1')
+        self.assertEqual(list_profiles(), [])
+        b''.join(response.streaming_content)
+        [profile] = list_profiles()
+        self.assertEqual(profile.view_name, 'results_csv')
+
+    def test_ring_buffer_and_admin_listing(self) -> None:
+        for _ in range(3):
+            self.client.get(f'/survey/{self.survey.pk}/results/?profile=1')
+        profiles = list_profiles()
+        self.assertEqual(len(profiles), 2)
+        page = self.client.get('/admin/profiles/')
+        self.assertContains(page, profiles[0].name)
+        download = self.client.get(f'/admin/profiles/{profiles[0].name}')
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="{profiles[0].name}"')
+        self.assertEqual(self.client.get('/admin/profiles/..%2Fdb.sqlite3').status_code, 404)
+        self.assertContains(self.client.get('/admin/'), '/admin/profiles/')
@@ -0,0 +1,73 @@
+"""Tests for full-text search over open answers."""
+import io
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from surveys.models import Invitation, Answer
+from surveys.search import FTS_TABLE, match_expression, search_answers
+from surveys.tests.factories import make_survey
+
+TEXTS = ['De koffie was koud', 'Te weinig parkeerplaatsen', 'Koffie prima, parkeren lastig', 'Geen opmerkingen']
+
+
+class SearchTests(TestCase):
+    def setUp(self) -> None:
+        invitation, self.data = make_survey(3)
+        self.survey = invitation.survey
+        self.open_id = next(iter(self.data))
+        for text in TEXTS:
+            self.client.post(f'/respond/{invitation.uuid}/', {**self.data, self.open_id: text})
+            invitation = Invitation.objects.create(survey=self.survey)
+        other, data = make_survey(3)
+        self.client.post(f'/respond/{other.uuid}/', {**data, next(iter(data)): 'koffie'})
+
+    def texts(self, terms: str, **kwargs) -> list[str]:
+        hits, _ = search_answers(terms, **kwargs)
+        return [Answer.objects.get(pk=hit.answer_id).text for hit in hits]
+
+    def test_ranked_matches_filtered_by_survey_and_question(self) -> None:
+        self.assertEqual(len(self.texts('koffie')), 3)
+        self.assertEqual(
+            sorted(self.texts('koffie', survey_id=self.survey.pk, question_id=int(self.open_id))),
+            ['De koffie was koud', 'Koffie prima, parkeren lastig'],
+        )
+        self.assertEqual(self.texts('parkeer*'), ['Te weinig parkeerplaatsen'])
+        self.assertEqual(self.texts('koffie parkeren'), ['Koffie prima, parkeren lastig'])
+
+    def test_user_input_cannot_break_the_query(self) -> None:
+        self.assertEqual(match_expression('NEAR( "x" OR'), '"NEAR(" """x""" "OR"')
+        self.assertEqual(self.texts('koud" OR "'), [])
+        self.assertEqual(search_answers('   '), ([], False))
+
+    def test_index_follows_updates_and_deletes(self) -> None:
+        answer = Answer.objects.get(text='De koffie was koud')
+        answer.text = 'De thee was koud'
+        answer.save()
+        self.assertEqual(self.texts('thee'), ['De thee was koud'])
+        Answer.objects.filter(question__survey=self.survey).delete()
+        self.assertEqual(self.texts('koffie'), ['koffie'])
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('integrity-check')")
+
+    def test_rebuild_command(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        self.assertEqual(self.texts('koffie'), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('5 open antwoorden', out.getvalue())
+        self.assertEqual(len(self.texts('koffie')), 3)
+
+    def test_search_view_is_staff_only_and_paginates(self) -> None:
+        User.objects.create_user('user', 'u@example.com', 'pass')
+        self.client.login(username='user', password='pass')
+        self.assertEqual(self.client.get('/search/', {'q': 'koffie'}).status_code, 302)
+        User.objects.create_user('staff', 's@example.com', 'pass', is_staff=True)
+        self.client.login(username='staff', password='pass')
+        with self.settings(DEBUG=False):
+            response = self.client.get('/search/', {'q': 'koffie', 'survey': self.survey.pk, 'question': self.open_id})
+        self.assertEqual(len(response.context['hits']), 2)
+        self.assertContains(response, '<mark>koffie</mark>', html=False)
+        first = self.client.get('/search/', {'q': 'koffie'})
+        self.assertNotIn('next_query', first.context)
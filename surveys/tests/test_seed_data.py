@@ -0,0 +1,38 @@
+"""Tests for the seed_data command."""
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from surveys.models import Survey, Invitation, Answer
+from surveys.tallies import Tallies
+
+
+class SeedDataTests(TestCase):
+    def seed(self, *args) -> str:
+        out = StringIO()
+        call_command('seed_data', *args, stdout=out)
+        return out.getvalue()
+
+    def test_demo_survey_only_once(self) -> None:
+        self.assertIn('Demo data aangemaakt', self.seed())
+        self.assertEqual(self.seed(), 'Data already exists.\n')
+        self.assertEqual(Survey.objects.get().questions.count(), 10)
+
+    def test_synthetic_data_is_deterministic(self) -> None:
+        args = ('--synthetic', '--questions', 7, '--invitations', 120, '--response-rate', 0.5,
+                '--chunk-size', 50, '--seed', 7)
+        out = self.seed(*args)
+        self.assertIn('rijen/s', out)
+        self.seed(*args)
+        first, second = Survey.objects.order_by('pk')
+        self.assertEqual(Invitation.objects.filter(survey=first).count(), 120)
+
+        def answers(survey: Survey) -> list[tuple]:
+            return list(
+                Answer.objects.filter(question__survey=survey).order_by('id')
+                .values_list('question__number', 'text', 'option__text', 'scale')
+            )
+        self.assertTrue(answers(first))
+        self.assertEqual(answers(first), answers(second))
+        self.assertEqual(len(answers(first)), 7 * Invitation.objects.filter(survey=first, responded_at__isnull=False).count())
+        for survey in (first, second):
+            self.assertEqual(Tallies.from_stored(survey), Tallies.from_database(survey))
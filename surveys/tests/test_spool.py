@@ -0,0 +1,96 @@
+"""Tests for the write-behind submission spool."""
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from surveys.ingest import Submission, save_response, save_submissions
+from surveys.models import Invitation, Answer, Option
+from surveys.schema import get_schema
+from surveys.spool import get_spool
+from surveys.tallies import Tallies
+from surveys.tests.factories import make_survey
+
+
+class SpoolTests(TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(SURVEY_INGEST_MODE='spool', SURVEY_SPOOL_PATH=Path(tmp.name) / 'spool.sqlite3')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.invitation, self.data = make_survey(6)
+        self.survey = self.invitation.survey
+
+    def test_submission_is_acknowledged_before_it_is_stored(self) -> None:
+        self.client.get(f'/respond/{self.invitation.uuid}/')
+        with self.assertNumQueries(1):
+            response = self.client.post(f'/respond/{self.invitation.uuid}/', self.data)
+        self.assertTemplateUsed(response, 'surveys/thanks.html')
+        self.assertFalse(Answer.objects.exists())
+        self.assertEqual(len(get_spool()), 1)
+
+    def test_drain_stores_each_invitation_once(self) -> None:
+        others = [Invitation.objects.create(survey=self.survey) for _ in range(4)]
+        for invitation in [self.invitation, *others, self.invitation]:
+            self.client.post(f'/respond/{invitation.uuid}/', self.data)
+        self.assertEqual(len(get_spool()), 5)
+        out = StringIO()
+        call_command('drain_spool', '--batch-size', 2, stdout=out)
+        self.assertIn('5 inzendingen verwerkt', out.getvalue())
+        self.assertEqual(len(get_spool()), 0)
+        self.assertEqual(Answer.objects.count(), 30)
+        self.assertFalse(Invitation.objects.filter(responded_at__isnull=True).exists())
+        self.assertEqual(Tallies.from_stored(self.survey), Tallies.from_database(self.survey))
+
+    def test_failing_submission_is_moved_aside(self) -> None:
+        scale_id = str(self.survey.questions.get(number=3).id)
+        get_spool().enqueue(self.invitation.pk, {**self.data, scale_id: 'geen getal'}, timezone.now())
+        others = [Invitation.objects.create(survey=self.survey) for _ in range(2)]
+        for invitation in others:
+            self.client.post(f'/respond/{invitation.uuid}/', self.data)
+        out, err = StringIO(), StringIO()
+        call_command('drain_spool', stdout=out, stderr=err)
+        self.assertIn('2 inzendingen verwerkt', out.getvalue())
+        self.assertIn('apart gezet', err.getvalue())
+        self.assertEqual(len(get_spool()), 0)
+        [(_, submission, error)] = get_spool().dead()
+        self.assertEqual(submission.invitation_id, self.invitation.pk)
+        self.assertTrue(error)
+        self.assertEqual(Answer.objects.count(), 12)
+        self.assertEqual(Tallies.from_stored(self.survey), Tallies.from_database(self.survey))
+
+    def test_replay_after_crash_is_deduplicated(self) -> None:
+        self.client.post(f'/respond/{self.invitation.uuid}/', self.data)
+        batch = [submission for _, submission in get_spool().peek(10)]
+        # The worker stored the batch but died before removing it from the spool.
+        self.assertEqual(save_submissions(batch), [self.invitation.pk])
+        call_command('drain_spool', stdout=StringIO())
+        self.assertEqual(Answer.objects.count(), 6)
+        self.assertEqual(len(get_spool()), 0)
+
+    def test_drain_skips_answers_to_options_removed_since(self) -> None:
+        self.client.post(f'/respond/{self.invitation.uuid}/', self.data)
+        mc_id = str(self.survey.questions.get(number=2).id)
+        Option.objects.filter(pk=self.data[mc_id]).delete()
+        call_command('drain_spool', stdout=StringIO())
+        self.assertEqual(Answer.objects.count(), 5)
+
+    def test_direct_submissions_fail_loudly(self) -> None:
+        mc_id = str(self.survey.questions.get(number=2).id)
+        questions = get_schema(self.survey).questions
+        with self.assertRaises(ValueError):
+            save_response(self.invitation, questions, {**self.data, mc_id: '0'})
+        with self.assertRaises(ValueError):
+            save_submissions([Submission(self.invitation.pk, {}, timezone.now())])
+        self.assertFalse(Answer.objects.exists())
+
+    def test_scale_values_round_trip(self) -> None:
+        self.client.post(f'/respond/{self.invitation.uuid}/', self.data)
+        _, submission = get_spool().peek(1)[0]
+        self.assertIsInstance(submission, Submission)
+        self.assertLessEqual(submission.submitted_at, timezone.now())
+        call_command('drain_spool', stdout=StringIO())
+        scale = Answer.objects.get(question__number=3).scale
+        self.assertEqual(str(scale), '0.5')
@@ -0,0 +1,106 @@
+"""Tests for packed per-respondent answer storage."""
+import csv
+import io
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.test import TestCase
+from surveys.models import Survey, Invitation, Answer, PackedResponse
+from surveys.schema import get_schema, schema_cache_key
+from surveys.tallies import Tallies
+from surveys.tests.factories import make_survey
+
+
+class PackedStorageTests(TestCase):
+    def setUp(self) -> None:
+        User.objects.create_user('staff', 'a@example.com', 'pass', is_staff=True, is_superuser=True)
+        self.client.login(username='staff', password='pass')
+        invitation, self.data = make_survey(3)
+        self.survey = invitation.survey
+        self.respond(invitation)
+        self.respond(Invitation.objects.create(survey=self.survey), **{next(iter(self.data)): 'tweede'})
+
+    def respond(self, invitation: Invitation, **overrides) -> None:
+        self.client.post(f'/respond/{invitation.uuid}/', {**self.data, **overrides})
+
+    def export(self, **params) -> list[list[str]]:
+        response = self.client.get(f'/survey/{self.survey.pk}/results/csv/', params)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def pack(self) -> str:
+        out = io.StringIO()
+        call_command('pack_answers', self.survey.pk, stdout=out)
+        self.survey.refresh_from_db()
+        return out.getvalue()
+
+    def test_resubmitted_form_is_not_stored_twice(self) -> None:
+        self.pack()
+        invitation = Invitation.objects.create(survey=self.survey)
+        for _ in range(2):
+            response = self.client.post(f'/respond/{invitation.uuid}/', self.data)
+            self.assertTemplateUsed(response, 'surveys/thanks.html')
+        self.assertEqual(PackedResponse.objects.filter(invitation=invitation).count(), 1)
+        self.assertEqual(Tallies.from_stored(self.survey), Tallies.from_database(self.survey))
+
+    def test_conversion_keeps_exports_results_and_tallies(self) -> None:
+        long_before, wide_before = self.export(), self.export(layout='wide')
+        page_before = self.client.get(f'/survey/{self.survey.pk}/results/').context['answers']
+        tallies_before = Tallies.from_stored(self.survey)
+        output = self.pack()
+        self.assertIn('6 antwoorden -> 2 respondenten', output)
+        self.assertIn('bespaard', output)
+        self.assertFalse(Answer.objects.exists())
+        self.assertEqual(PackedResponse.objects.count(), 2)
+        # Packed answers share one timestamp per respondent.
+        self.assertEqual([row[:2] for row in self.export()], [row[:2] for row in long_before])
+        self.assertEqual(self.export(layout='wide'), wide_before)
+        page = self.client.get(f'/survey/{self.survey.pk}/results/').context['answers']
+        values = lambda rows: sorted((row['question'], row['value']) for row in rows)
+        self.assertEqual(values(page), values(page_before))
+        self.assertEqual(Tallies.from_database(self.survey), tallies_before)
+
+    def test_schema_read_before_commit_is_dropped(self) -> None:
+        before = self.export()
+        stale = get_schema(self.survey)
+        read = []
+
+        def read_between(sender, instance, **kwargs) -> None:
+            # A reader in another process still sees the answer rows here.
+            caches['surveys'].set(schema_cache_key(instance.pk), stale)
+            read.append(get_schema(instance).packed)
+        post_save.connect(read_between, sender=Survey)
+        self.addCleanup(post_save.disconnect, read_between, sender=Survey)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pack()
+        self.assertEqual(read, [False])
+        self.assertTrue(get_schema(self.survey).packed)
+        self.assertEqual([row[:2] for row in self.export()], [row[:2] for row in before])
+
+    def test_new_responses_are_packed(self) -> None:
+        self.pack()
+        self.respond(Invitation.objects.create(survey=self.survey))
+        self.assertFalse(Answer.objects.exists())
+        packed = PackedResponse.objects.latest('id')
+        self.assertEqual(set(packed.answers), set(self.data))
+        self.assertEqual(len(self.export()), 10)
+        self.assertEqual(Tallies.from_database(self.survey).diff(Tallies.from_stored(self.survey)), [])
+        open_id = int(next(iter(self.data)))
+        page = self.client.get(f'/survey/{self.survey.pk}/results/', {'question': open_id}).context['answers']
+        self.assertEqual([row['value'] for row in page], ['antwoord 0', 'tweede', 'antwoord 0'])
+
+    def test_incremental_export_uses_packed_ids(self) -> None:
+        self.pack()
+        first = self.client.get(f'/survey/{self.survey.pk}/results/csv/')
+        cursor = first['X-Next-Cursor']
+        self.respond(Invitation.objects.create(survey=self.survey))
+        rows = self.export(since=cursor)
+        self.assertEqual(len(rows), 4)
+
+    def test_admin_renders_packed_answers(self) -> None:
+        self.pack()
+        packed = PackedResponse.objects.first()
+        response = self.client.get(f'/admin/surveys/packedresponse/{packed.pk}/change/')
+        self.assertContains(response, '<strong>q1</strong>: B')
+        self.assertEqual(self.pack().count('al compact opgeslagen'), 1)
+        self.assertEqual(Survey.objects.get().answer_storage, Survey.PACKED)
@@ -0,0 +1,72 @@
+"""Tests for the incrementally maintained result tallies."""
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from surveys.models import Survey, Invitation, Answer, QuestionTally, TallyBucket
+from surveys.tallies import Tallies
+from surveys.tests.factories import make_survey
+
+
+class TallyTests(TestCase):
+    def setUp(self) -> None:
+        self.invitation, self.data = make_survey(6)
+        self.survey = self.invitation.survey
+        self.scale_q = self.survey.questions.get(number=3)
+        self.mc_q = self.survey.questions.get(number=2)
+        for value in ('0.5', '1.0', '0.2'):
+            invitation = Invitation.objects.create(survey=self.survey)
+            self.client.post(f'/respond/{invitation.uuid}/', {**self.data, str(self.scale_q.id): value})
+
+    def test_submissions_update_tallies(self) -> None:
+        tally = QuestionTally.objects.get(question=self.scale_q)
+        self.assertEqual((tally.count, tally.total, tally.total_squares), (3, 17, 129))
+        self.assertAlmostEqual(tally.mean, 17 / 30)
+        self.assertEqual(
+            dict(TallyBucket.objects.filter(question=self.scale_q).values_list('bucket', 'count')),
+            {2: 1, 5: 1, 10: 1},
+        )
+        option_id = int(self.data[str(self.mc_q.id)])
+        self.assertEqual(TallyBucket.objects.get(question=self.mc_q, bucket=option_id).count, 3)
+        self.assertEqual(Tallies.from_stored(self.survey), Tallies.from_database(self.survey))
+
+    def test_rebuild_repairs_drift(self) -> None:
+        QuestionTally.objects.filter(question=self.scale_q).update(count=1)
+        TallyBucket.objects.filter(question=self.mc_q).delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_tallies', '--check', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_tallies', self.survey.pk, stdout=out)
+        self.assertIn('afwijking', out.getvalue())
+        call_command('rebuild_tallies', '--check', stdout=StringIO())
+        self.assertEqual(QuestionTally.objects.get(question=self.scale_q).count, 3)
+
+    def test_deleted_answers_leave_the_tallies(self) -> None:
+        Invitation.objects.filter(responded_at__isnull=False).first().delete()
+        Answer.objects.filter(question=self.mc_q).first().delete()
+        self.assertEqual(QuestionTally.objects.get(question=self.scale_q).count, 2)
+        self.assertEqual(Tallies.from_stored(self.survey), Tallies.from_database(self.survey))
+
+    def test_deleted_packed_answers_mark_tallies_stale(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        call_command('pack_answers', self.survey.pk, stdout=StringIO())
+        self.survey.refresh_from_db()
+        self.assertFalse(self.survey.tallies_stale)
+        Invitation.objects.filter(responded_at__isnull=False).first().delete()
+        self.assertContains(self.client.get(f'/survey/{self.survey.pk}/results/'), 'rebuild_tallies')
+        call_command('rebuild_tallies', self.survey.pk, stdout=StringIO())
+        self.assertFalse(Survey.objects.get(pk=self.survey.pk).tallies_stale)
+        self.assertEqual(Tallies.from_stored(self.survey), Tallies.from_database(self.survey))
+        self.assertNotContains(self.client.get(f'/survey/{self.survey.pk}/results/'), 'rebuild_tallies')
+
+    def test_results_page_reads_tallies(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        self.client.get(f'/survey/{self.survey.pk}/results/')
+        # session, user, survey, tallies, buckets, first answer page
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/survey/{self.survey.pk}/results/')
+        self.assertContains(response, 'B: 3 (100,0%)')
+        self.assertContains(response, '0.5: 1 (33,3%)')
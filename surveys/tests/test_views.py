@@ -1,8 +1,13 @@
 """View tests for surveys."""
 from datetime import date
 from django.contrib.auth.models import User
-from django.test import TestCase
-from surveys.models import Survey
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from surveys.models import Survey, Option, Invitation, Answer
+from surveys.tests.factories import make_survey
 
 
 class SurveyViewTests(TestCase):
@@ -28,3 +33,129 @@ class SurveyViewTests(TestCase):
     def test_login_required_for_surveys(self) -> None:
         response = self.client.get('/surveys/')
         self.assertEqual(response.status_code, 302)
+
+
+class RespondViewTests(TestCase):
+    # invitation+survey, savepoint, bulk insert, 2x2 tally upserts,
+    # invitation update, release savepoint; the schema comes from the cache
+    SUBMIT_QUERIES = 9
+
+    def test_submission_stores_answers(self) -> None:
+        invitation, data = make_survey(6)
+        response = self.client.post(f'/respond/{invitation.uuid}/', data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'surveys/thanks.html')
+        invitation.refresh_from_db()
+        self.assertIsNotNone(invitation.responded_at)
+        answers = {a.question.number: a for a in invitation.answers.select_related('question', 'option')}
+        self.assertEqual(len(answers), 6)
+        self.assertEqual(answers[1].text, 'antwoord 0')
+        self.assertEqual(answers[2].option.text, 'B')
+        self.assertEqual(str(answers[3].scale), '0.5')
+
+    def test_submission_query_count_is_constant(self) -> None:
+        for size in (3, 12, 45):
+            with self.subTest(size=size):
+                invitation, data = make_survey(size)
+                self.client.get(f'/respond/{invitation.uuid}/')
+                with self.assertNumQueries(self.SUBMIT_QUERIES):
+                    self.client.post(f'/respond/{invitation.uuid}/', data)
+                self.assertEqual(invitation.answers.count(), size)
+
+    def test_invalid_option_is_rejected(self) -> None:
+        invitation, data = make_survey(3)
+        other, _ = make_survey(3)
+        foreign = Option.objects.filter(question__survey=other.survey).first()
+        data[str(invitation.survey.questions.get(number=2).id)] = str(foreign.id)
+        response = self.client.post(f'/respond/{invitation.uuid}/', data)
+        self.assertTemplateUsed(response, 'surveys/response_form.html')
+        self.assertFalse(Answer.objects.exists())
+
+    def test_form_served_from_schema_cache(self) -> None:
+        invitation, _ = make_survey(9)
+        self.client.get(f'/respond/{invitation.uuid}/')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/respond/{invitation.uuid}/')
+        self.assertContains(response, 'q8')
+
+    def test_schema_invalidated_on_change(self) -> None:
+        invitation, _ = make_survey(3)
+        self.client.get(f'/respond/{invitation.uuid}/')
+        question = invitation.survey.questions.get(number=2)
+        question.title = 'Nieuwe titel'
+        question.save()
+        self.assertContains(self.client.get(f'/respond/{invitation.uuid}/'), 'Nieuwe titel')
+        Option.objects.create(question=question, text='Optie C')
+        self.assertContains(self.client.get(f'/respond/{invitation.uuid}/'), 'Optie C')
+        question.options.filter(text='Optie C').delete()
+        self.assertNotContains(self.client.get(f'/respond/{invitation.uuid}/'), 'Optie C')
+
+    def test_moved_question_and_option_leave_the_old_schema(self) -> None:
+        invitation, _ = make_survey(5)
+        other, _ = make_survey(3)
+        for uuid in (invitation.uuid, other.uuid):
+            self.client.get(f'/respond/{uuid}/')
+        question = invitation.survey.questions.get(number=2)
+        question.survey = other.survey
+        question.number = 4
+        question.save()
+        field = f'name="{question.id}"'
+        self.assertNotContains(self.client.get(f'/respond/{invitation.uuid}/'), field)
+        self.assertContains(self.client.get(f'/respond/{other.uuid}/'), field)
+        option = Option.objects.get(question__survey=invitation.survey, text='B')
+        option.question = question
+        option.save()
+        value = f'value="{option.id}"'
+        self.assertNotContains(self.client.get(f'/respond/{invitation.uuid}/'), value)
+        self.assertContains(self.client.get(f'/respond/{other.uuid}/'), value)
+
+class ResultsBrowserTests(TestCase):
+    def setUp(self) -> None:
+        User.objects.create_user('admin', 'a@example.com', 'pass')
+        self.client.login(username='admin', password='pass')
+        invitation, data = make_survey(3)
+        self.survey = invitation.survey
+        self.client.post(f'/respond/{invitation.uuid}/', data)
+        for _ in range(4):
+            other = Invitation.objects.create(survey=self.survey)
+            self.client.post(f'/respond/{other.uuid}/', data)
+        # Identical timestamps must be ordered by id.
+        Answer.objects.filter(invitation=invitation).update(created_at=timezone.now())
+        self.url = f'/survey/{self.survey.pk}/results/'
+
+    def walk(self, params: dict) -> list:
+        seen, query = [], dict(params)
+        while True:
+            response = self.client.get(self.url, query)
+            seen.extend(response.context['answers'])
+            if 'next_query' not in response.context:
+                return seen
+            query = QueryDict(response.context['next_query'])
+
+    @override_settings(SURVEY_ANSWERS_PER_PAGE=4)
+    def test_pages_cover_all_answers_once(self) -> None:
+        rows = self.walk({})
+        self.assertEqual(len(rows), 15)
+        times = [row['created_at'] for row in rows]
+        self.assertEqual(times, sorted(times, reverse=True))
+
+    @override_settings(SURVEY_ANSWERS_PER_PAGE=2)
+    def test_question_filter(self) -> None:
+        question = self.survey.questions.get(number=2)
+        rows = self.walk({'question': question.pk})
+        self.assertEqual([row['value'] for row in rows], ['B'] * 5)
+
+    @override_settings(SURVEY_ANSWERS_PER_PAGE=4)
+    def test_later_pages_cost_the_same(self) -> None:
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as later:
+            self.client.get(self.url, QueryDict(response.context['next_query']))
+        self.assertEqual(len(first), len(later))
+        self.assertFalse(any('COUNT(' in q['sql'] or 'OFFSET' in q['sql'] for q in later.captured_queries))
+
+    def test_invalid_cursor(self) -> None:
+        response = self.client.get(self.url, {'after': 'nonsense!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('answers', response.context)
@@ -6,12 +6,21 @@ urlpatterns = [
     path('survey/add/', views.SurveyCreateView.as_view(), name='survey_add'),
     path('survey/<int:pk>/edit/', views.SurveyUpdateView.as_view(), name='survey_edit'),
     path('survey/<int:pk>/delete/', views.SurveyDeleteView.as_view(), name='survey_delete'),
+    path('survey/import/', views.survey_import, name='survey_import'),
+    path('survey/<int:survey_id>/clone/', views.survey_clone, name='survey_clone'),
     path('survey/<int:survey_id>/questions/', views.question_list, name='question_list'),
     path('survey/<int:survey_id>/questions/add/', views.QuestionCreateView.as_view(), name='question_add'),
     path('question/<int:pk>/edit/', views.QuestionUpdateView.as_view(), name='question_edit'),
     path('question/<int:pk>/delete/', views.QuestionDeleteView.as_view(), name='question_delete'),
     path('survey/<int:survey_id>/invite/', views.create_invitation, name='invite'),
+    path('survey/<int:survey_id>/invite/bulk/', views.bulk_invitations, name='invite_bulk'),
     path('respond/<uuid_str>/', views.respond, name='respond'),
+    path('api/invitations/<uuid:invitation_uuid>/', views.api_invitation, name='api_invitation'),
+    path('api/responses/', views.api_responses, name='api_responses'),
     path('survey/<int:survey_id>/results/', views.results, name='results'),
     path('survey/<int:survey_id>/results/csv/', views.results_csv, name='results_csv'),
+    path('survey/<int:survey_id>/crosstab/', views.crosstab_report, name='crosstab'),
+    path('survey/<int:survey_id>/crosstab/json/', views.crosstab_json, name='crosstab_json'),
+    path('search/', views.answer_search, name='answer_search'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
@@ -1,19 +1,41 @@
 """Views for survey management and participation."""
 from __future__ import annotations
+import json
 from datetime import datetime
+from uuid import UUID
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_GET, require_POST
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.http import StreamingHttpResponse
-import csv
 
-from .forms import SurveyForm, QuestionForm, DynamicResponseForm
-from .models import Survey, Question, Option, Invitation, Answer
+from .archive import open_archive
+from .crosstab import crosstab
+from .definitions import clone_survey, import_survey, parse_definition
+from .forms import SurveyForm, SurveyImportForm, QuestionForm, DynamicResponseForm, AnswerFilterForm, AnswerSearchForm, BulkInvitationForm, CrossTabForm
+from .export import LAYOUTS, LONG, WIDE, export_etag, long_rows, stream_csv, watermark, wide_rows
+from .ingest import save_response, save_submissions, validate_batch
+from .metrics import registry
+from .invitations import CONTENT_TYPES, campaign_chunks, create_invitations, invitation_lines, respond_link
+from .pages import complete, go_back, initial_values, load_progress, page_count, page_questions, save_page
+from .pagination import KeysetPage, keyset_page
+from .profiling import list_profiles, profile_path
+from .search import search_answers
+from .schema import AnswerFormatter, SurveySchema, get_schema
+from .spool import get_spool
+from .storage import packed_answer_page
+from .tallies import survey_summary
+from .models import Survey, Question, Invitation, Answer
 
 
 def home(request: HttpRequest) -> HttpResponse:
@@ -46,6 +68,36 @@ class SurveyDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy('survey_list')
 
 
+@staff_member_required
+def survey_import(request: HttpRequest) -> HttpResponse:
+    """Create a survey with all its questions from an uploaded definition."""
+    form = SurveyImportForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data.pop('definition')
+        overrides = {**form.cleaned_data, 'is_published': form.cleaned_data['is_published'] or None}
+        try:
+            content = upload.read().decode('utf-8-sig')
+            survey = import_survey(parse_definition(upload.name, content, overrides))
+        except UnicodeDecodeError:
+            form.add_error('definition', 'Het bestand moet UTF-8 zijn.')
+        except ValidationError as exc:
+            form.add_error(None, exc)
+        else:
+            return HttpResponseRedirect(reverse('question_list', args=[survey.pk]))
+    return render(request, 'surveys/survey_import.html', {'form': form})
+
+
+@login_required
+@require_POST
+def survey_clone(request: HttpRequest, survey_id: int) -> HttpResponse:
+    survey = get_object_or_404(Survey, pk=survey_id)
+    try:
+        copy = clone_survey(survey)
+    except ValidationError as exc:
+        return HttpResponseBadRequest(' '.join(exc.messages))
+    return HttpResponseRedirect(reverse('survey_edit', args=[copy.pk]))
+
+
 @login_required
 def question_list(request: HttpRequest, survey_id: int) -> HttpResponse:
     survey = get_object_or_404(Survey, pk=survey_id)
@@ -85,59 +137,308 @@ class QuestionDeleteView(LoginRequiredMixin, DeleteView):
 
 @login_required
 def create_invitation(request: HttpRequest, survey_id: int) -> HttpResponse:
-    survey = get_object_or_404(Survey, pk=survey_id)
+    survey = get_object_or_404(Survey, pk=survey_id, archived_at__isnull=True)
     invitation = Invitation.objects.create(survey=survey)
     link = request.build_absolute_uri(reverse('respond', args=[invitation.uuid]))
     return render(request, 'surveys/invitation_form.html', {'link': link, 'survey': survey})
 
 
+@login_required
+def bulk_invitations(request: HttpRequest, survey_id: int) -> HttpResponse:
+    """Create many invitations at once and stream their links as a download.
+
+    The invitations are all committed before the response starts, so a
+    broken download never leaves half a campaign behind. The form caps the
+    count at ``WEB_INVITATION_LIMIT`` to keep the request short.
+    """
+    survey = get_object_or_404(Survey, pk=survey_id, archived_at__isnull=True)
+    form = BulkInvitationForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        fmt = form.cleaned_data['format']
+        ranges = create_invitations(survey, form.cleaned_data['count'])
+        lines = invitation_lines(campaign_chunks(survey, ranges), respond_link(request.build_absolute_uri('/')), fmt)
+        response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="survey_{survey_id}_invitations.{fmt}"'
+        return response
+    return render(request, 'surveys/bulk_invitation_form.html', {'form': form, 'survey': survey})
+
+
 @csrf_protect
 def respond(request: HttpRequest, uuid_str: str) -> HttpResponse:
-    invitation = get_object_or_404(Invitation, uuid=uuid_str)
+    invitation = get_object_or_404(Invitation.objects.select_related('survey'), uuid=uuid_str)
     survey = invitation.survey
-    questions = survey.questions.all()
+    if survey.archived_at is not None:
+        return survey_closed(request, survey)
+    schema = get_schema(survey)
+    if survey.questions_per_page:
+        return _respond_paged(request, invitation, schema)
+    questions = schema.questions
     if request.method == 'POST':
-        form = DynamicResponseForm(request.POST, questions=list(questions))
+        form = DynamicResponseForm(request.POST, questions=questions)
         if form.is_valid():
-            for q in questions:
-                field_value = form.cleaned_data[str(q.id)]
-                if q.question_type == Question.OPEN:
-                    Answer.objects.create(invitation=invitation, question=q, text=field_value)
-                elif q.question_type == Question.MULTIPLE_CHOICE:
-                    option = get_object_or_404(Option, pk=field_value)
-                    Answer.objects.create(invitation=invitation, question=q, option=option)
-                else:
-                    Answer.objects.create(invitation=invitation, question=q, scale=field_value)
-            invitation.responded_at = timezone.now()
-            invitation.save()
+            if settings.SURVEY_INGEST_MODE == 'spool':
+                get_spool().enqueue(invitation.pk, form.cleaned_data, timezone.now())
+            else:
+                save_response(invitation, questions, form.cleaned_data)
             return render(request, 'surveys/thanks.html', {'survey': survey})
     else:
-        form = DynamicResponseForm(questions=list(questions))
+        form = DynamicResponseForm(questions=questions)
     return render(request, 'surveys/response_form.html', {'form': form, 'survey': survey})
 
 
+def survey_closed(request: HttpRequest, survey: Survey) -> HttpResponse:
+    """Answer for an archived survey, which no longer accepts responses."""
+    return render(request, 'surveys/closed.html', {'survey': survey}, status=410)
+
+
+def _respond_paged(request: HttpRequest, invitation: Invitation, schema: SurveySchema) -> HttpResponse:
+    """One page of a paged survey; completed pages are kept per invitation.
+
+    A POST for another page than the stored one (a resubmitted or stale
+    form) is not validated but answered with the current page.
+    """
+    survey = invitation.survey
+    progress = load_progress(invitation)
+    pages = page_count(schema, survey.questions_per_page)
+    page = min(progress.page, pages - 1)
+    questions = page_questions(schema, survey.questions_per_page, page)
+    form = None
+    if request.method == 'POST' and request.POST.get('page') == str(page):
+        if 'previous' in request.POST:
+            go_back(progress)
+            return HttpResponseRedirect(request.path)
+        form = DynamicResponseForm(request.POST, questions=questions)
+        if form.is_valid():
+            if page + 1 < pages:
+                save_page(progress, form.cleaned_data)
+                return HttpResponseRedirect(request.path)
+            if not complete(progress, schema, survey.questions_per_page, form.cleaned_data):
+                return HttpResponseRedirect(request.path)
+            return render(request, 'surveys/thanks.html', {'survey': survey})
+    if form is None:
+        form = DynamicResponseForm(questions=questions, initial=initial_values(progress, questions))
+    return render(request, 'surveys/response_form.html', {
+        'form': form, 'survey': survey, 'page': page, 'pages': pages,
+    })
+
+
+@require_GET
+def api_invitation(request: HttpRequest, invitation_uuid: UUID) -> HttpResponse:
+    """Compact survey schema for one invitation, for clients that render it themselves."""
+    invitation = get_object_or_404(Invitation.objects.select_related('survey'), uuid=invitation_uuid)
+    schema = get_schema(invitation.survey)
+    return JsonResponse({
+        'invitation': str(invitation.uuid),
+        'survey': {'id': schema.survey_id, 'title': schema.title},
+        'responded': invitation.responded_at is not None,
+        'questions': [
+            {'id': q.id, 'number': q.number, 'title': q.title, 'type': q.question_type, 'options': q.choices}
+            for q in schema.questions
+        ],
+    })
+
+
+@csrf_exempt
+@require_POST
+def api_responses(request: HttpRequest) -> HttpResponse:
+    """Store a batch of completed responses posted as JSON.
+
+    The body is ``{"responses": [{"invitation": uuid, "answers": {question
+    id: value}, "submitted_at": ISO 8601 (optional)}, ...]}``. Every
+    response is validated first; the valid ones are then written together
+    and each one gets its own status in the reply.
+    """
+    try:
+        items = json.loads(request.body)['responses']
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Verwacht {"responses": [...]}.'}, status=400)
+    if len(items) > settings.SURVEY_API_MAX_BATCH:
+        return JsonResponse({'error': f'Maximaal {settings.SURVEY_API_MAX_BATCH} antwoorden per verzoek.'}, status=400)
+    results, submissions = validate_batch(items)
+    if settings.SURVEY_INGEST_MODE == 'spool':
+        spool = get_spool()
+        stored = {s.invitation_id for s in submissions if spool.enqueue(s.invitation_id, s.values, s.submitted_at)}
+    else:
+        stored = set(save_submissions(submissions))
+    for result in results:
+        if result['status'] == 'ok':
+            result['status'] = 'stored' if result.pop('invitation_id') in stored else 'duplicate'
+    return JsonResponse({'stored': len(stored), 'results': results})
+
+
 @login_required
 def results(request: HttpRequest, survey_id: int) -> HttpResponse:
     survey = get_object_or_404(Survey, pk=survey_id)
-    answers = Answer.objects.filter(invitation__survey=survey).select_related('question', 'option')
-    return render(request, 'surveys/results.html', {'survey': survey, 'answers': answers})
+    return render(request, 'surveys/results.html', _results_context(request, survey, get_schema(survey)))
+
+
+def _results_context(request: HttpRequest, survey: Survey, schema: SurveySchema) -> dict:
+    filters = AnswerFilterForm(request.GET, questions=schema.questions)
+    context = {'survey': survey, 'summary': survey_summary(schema), 'filters': filters}
+    if filters.is_valid():
+        page = _answer_page(schema, filters.cleaned_data)
+        formatter = AnswerFormatter(schema)
+        context['answers'] = [
+            {
+                'question': formatter.title(row['question_id']),
+                'value': formatter.value(row['question_id'], row['text'], row['option_id'], row['scale']),
+                'created_at': row['created_at'],
+            }
+            for row in page.rows
+        ]
+        query = request.GET.copy()
+        if query.pop('after', None):
+            context['first_query'] = query.urlencode()
+        if page.next_cursor:
+            query['after'] = page.next_cursor
+            context['next_query'] = query.urlencode()
+    return context
+
+
+def _answer_page(schema: SurveySchema, filters: dict) -> KeysetPage:
+    if schema.archived:
+        with open_archive(schema.survey_id) as archive:
+            return archive.answer_page(
+                filters['question'], filters['since'], filters['until'],
+                filters['after'], settings.SURVEY_ANSWERS_PER_PAGE,
+            )
+    if schema.packed:
+        return packed_answer_page(
+            schema, filters['question'], filters['since'], filters['until'],
+            filters['after'], settings.SURVEY_ANSWERS_PER_PAGE,
+        )
+    answers = Answer.objects.filter(question_id__in=[q.id for q in schema.questions])
+    if filters['question']:
+        answers = answers.filter(question_id=filters['question'])
+    if filters['since']:
+        answers = answers.filter(created_at__gte=filters['since'])
+    if filters['until']:
+        answers = answers.filter(created_at__lt=filters['until'])
+    return keyset_page(
+        answers, filters['after'], settings.SURVEY_ANSWERS_PER_PAGE,
+        ('question_id', 'text', 'option_id', 'scale'),
+    )
 
 
 @login_required
 def results_csv(request: HttpRequest, survey_id: int) -> HttpResponse:
+    """Stream the answers as CSV.
+
+    ``?since=<cursor>`` limits the export to answers added after a previous
+    pull; the cursor for the next pull is returned in ``X-Next-Cursor`` and
+    an unchanged window is answered with 304 Not Modified.
+    """
     survey = get_object_or_404(Survey, pk=survey_id)
+    export = _csv_export(request)
+    if isinstance(export, HttpResponse):
+        return export
+    layout, since = export
+    schema = get_schema(survey)
+    until = watermark(schema, since)
+    tag = export_etag(schema, layout, since, until, survey.answer_deletions)
+    not_modified = get_conditional_response(request, etag=tag)
+    if not_modified is not None:
+        not_modified['X-Next-Cursor'] = str(until)
+        return not_modified
+    rows = (wide_rows if layout == WIDE else long_rows)(survey, schema, since, until)
+    return _csv_response(StreamingHttpResponse(stream_csv(rows), content_type='text/csv'), survey_id, layout, since, until, tag)
+
+
+def _csv_export(request: HttpRequest) -> tuple[str, int] | HttpResponse:
+    """The ``layout`` and ``since`` of an export request, or a 400 response."""
+    layout = request.GET.get('layout', LONG)
+    if layout not in LAYOUTS:
+        return HttpResponseBadRequest('Onbekende layout.')
+    try:
+        return layout, int(request.GET.get('since', 0))
+    except ValueError:
+        return HttpResponseBadRequest('Ongeldige cursor.')
+
+
+def _csv_response(response: StreamingHttpResponse, survey_id: int, layout: str, since: int, until: int,
+                  tag: str) -> StreamingHttpResponse:
+    suffix = '_wide' if layout == WIDE else ''
+    if since:
+        suffix += f'_since_{since}'
+    response['Content-Disposition'] = f'attachment; filename="survey_{survey_id}_results{suffix}.csv"'
+    response['ETag'] = tag
+    response['X-Next-Cursor'] = str(until)
+    return response
 
-    def generate():
-        yield 'question,answer,timestamp\n'
-        for ans in Answer.objects.filter(invitation__survey=survey):
-            if ans.question.question_type == Question.OPEN:
-                value = ans.text
-            elif ans.question.question_type == Question.MULTIPLE_CHOICE:
-                value = ans.option.text if ans.option else ''
-            else:
-                value = str(ans.scale)
-            yield f'"{ans.question.title}","{value}",{ans.created_at.isoformat()}\n'
 
-    response = StreamingHttpResponse(generate(), content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="survey_{survey_id}_results.csv"'
-    return response
+@login_required
+def crosstab_report(request: HttpRequest, survey_id: int) -> HttpResponse:
+    survey = get_object_or_404(Survey, pk=survey_id)
+    schema = get_schema(survey)
+    form = CrossTabForm(request.GET or None, questions=schema.questions)
+    context = {'survey': survey, 'form': form}
+    if form.is_valid():
+        context['report'] = _crosstab(survey, schema, form.cleaned_data)
+    return render(request, 'surveys/crosstab.html', context)
+
+
+@login_required
+def crosstab_json(request: HttpRequest, survey_id: int) -> HttpResponse:
+    """The cross-tab of ``?segment=<mc question>&target=<question>`` as JSON."""
+    survey = get_object_or_404(Survey, pk=survey_id)
+    schema = get_schema(survey)
+    form = CrossTabForm(request.GET, questions=schema.questions)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    return JsonResponse(_crosstab(survey, schema, form.cleaned_data))
+
+
+def _crosstab(survey: Survey, schema: SurveySchema, cleaned: dict) -> dict:
+    questions = {q.id: q for q in schema.questions}
+    return crosstab(schema, questions[cleaned['segment']], questions[cleaned['target']], survey.answer_deletions)
+
+
+@login_required
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Per-view latency and SQL histograms of this process, for Prometheus."""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@staff_member_required
+def answer_search(request: HttpRequest) -> HttpResponse:
+    """Ranked full-text search over open answers."""
+    questions = ()
+    survey_id = request.GET.get('survey')
+    if survey_id and survey_id.isdigit():
+        survey = Survey.objects.filter(pk=survey_id).first()
+        if survey is not None:
+            questions = get_schema(survey).questions
+    form = AnswerSearchForm(request.GET or None, questions=questions)
+    context = {'form': form}
+    if form.is_valid():
+        survey = form.cleaned_data['survey']
+        page = form.cleaned_data['page'] or 1
+        hits, has_next = search_answers(
+            form.cleaned_data['q'], survey.pk if survey else None, form.cleaned_data['question'], page,
+        )
+        query = request.GET.copy()
+        if has_next:
+            query['page'] = page + 1
+            context['next_query'] = query.urlencode()
+        if page > 1:
+            query['page'] = page - 1
+            context['previous_query'] = query.urlencode()
+        context.update(hits=hits, page=page, unsearchable=bool(survey and (survey.archived_at or survey.answer_storage == Survey.PACKED)))
+    return render(request, 'surveys/answer_search.html', context)
+
+
+@staff_member_required
+def profile_list(request: HttpRequest) -> HttpResponse:
+    """Recent request profiles, linked from the admin index."""
+    context = {**admin.site.each_context(request), 'title': 'Profielen', 'profiles': list_profiles()}
+    return render(request, 'admin/profiles.html', context)
+
+
+@staff_member_required
+def profile_download(request: HttpRequest, name: str) -> HttpResponse:
+    path = profile_path(name)
+    if path is None:
+        raise Http404('Onbekend profiel.')
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name)